@@ -3,61 +3,60 @@
 import os
 import requests
 import time
+from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError
+from .utils.http_session import get_groq_session
+from .utils.rate_limiter import estimate_tokens, limiter_for_key, retry_after_seconds, backoff_delay, MAX_RETRY_DELAY
 
 # Verify at least one API key is set (single or numbered)
-# Fallback to hardcoded key if not set in environment
-HARDCODED_KEY = "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"
-has_single_key = os.getenv("GROQ_API_KEY") is not None or HARDCODED_KEY
-has_numbered_key = os.getenv("GROQ_API_KEY_1") is not None
+has_single_key = bool(os.getenv("GROQ_API_KEY"))
+has_numbered_key = bool(os.getenv("GROQ_API_KEY_1"))
 
 if not (has_single_key or has_numbered_key):
-    raise ValueError("No API keys found!")
+    raise ValueError("No API keys found! Set GROQ_API_KEY or GROQ_API_KEY_1, GROQ_API_KEY_2, ...")
 
-# Global request throttling to prevent rate limiting
-_last_request_time = 0
-_min_request_interval = 1.5
+# Errors worth retrying; anything else (auth, SSL, bad request) fails fast
+TRANSIENT = (ConnectionError, Timeout, ChunkedEncodingError)
 
 # Store original post method
 _original_post = requests.post
 
+# Shared connection pool for Groq calls so TCP+TLS handshakes are reused
+_groq_session = get_groq_session()
+
 def _throttled_post(*args, **kwargs):
-    """Wrapper around requests.post with throttling and exponential backoff"""
-    global _last_request_time
-    
+    """Wrapper around requests.post with throttling, exponential backoff and pooled connections"""
     # Only throttle Groq API requests
     url = args[0] if args else kwargs.get('url', '')
     is_groq = 'groq.com' in str(url)
     
     if is_groq:
-        # Apply global throttling
-        elapsed = time.time() - _last_request_time
-        if elapsed < _min_request_interval:
-            time.sleep(_min_request_interval - elapsed)
-        _last_request_time = time.time()
-        
         # Exponential backoff retry for rate limits
         max_retries = 5
         base_wait = 4
+        payload = kwargs.get('json') or {}
+        estimated = estimate_tokens(payload.get('messages', []), payload.get('max_tokens', 0))
+        authorization = (kwargs.get('headers') or {}).get('Authorization', '')
+        limiter = limiter_for_key(authorization[len('Bearer '):] or None)
         
         for attempt in range(max_retries):
             try:
-                response = _original_post(*args, **kwargs)
+                limiter.acquire(estimated)  # RPM/TPM budget of the key being used
+                response = _groq_session.post(*args, **kwargs)
                 if response.status_code != 429:
                     return response
                 
-                # 429 rate limit - wait and retry
+                # 429 rate limit - wait (server hint first) and retry
                 if attempt < max_retries - 1:
-                    wait_time = base_wait * (2 ** attempt)  # 4, 8, 16, 32, 64
-                    time.sleep(wait_time)
-                    _last_request_time = time.time()
+                    wait_time = retry_after_seconds(response.headers)
+                    if wait_time is None:
+                        wait_time = backoff_delay(attempt, base_wait)
+                    time.sleep(min(wait_time, MAX_RETRY_DELAY))
                 else:
                     return response  # Return last attempt even if 429
                     
-            except Exception as e:
+            except TRANSIENT:
                 if attempt < max_retries - 1:
-                    wait_time = base_wait * (2 ** attempt)
-                    time.sleep(wait_time)
-                    _last_request_time = time.time()
+                    time.sleep(backoff_delay(attempt, base_wait))
                 else:
                     raise
         
@@ -3,14 +3,31 @@ Action & Recommendation Agent
 Converts career paths into executable short-term actions
 """
 
+import functools
 import json
-import os
+import logging
+import re
 from typing import Dict, Any, List
-import requests
-from datetime import datetime
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
-from ..utils.api_key_manager import get_key_manager
+from ..utils.api_key_manager import APIKeyManager, get_key_manager
+from ..utils.json_utils import decode_first_json, dumps_compact, loads, stable_hash
+from ..utils.llm_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled once at import; reused for every LLM response
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+# Used when the LLM can't produce validation questions
+_DEFAULT_VALIDATION_QUESTIONS = (
+    "What is the main objective of this action?",
+    "What did you learn or accomplish?",
+    "How did you know when you succeeded?",
+    "What was the most challenging part?",
+    "What would you improve next time?"
+)
 
 
 class ActionRecommendationAgent:
@@ -25,16 +42,7 @@ class ActionRecommendationAgent:
         "Do NOT change the career path."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("ActionRecommendationAgent")
-    
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
+    OUTPUT_SCHEMA = """{
   "action_plan": {
     "current_focus": "What to focus on right now",
     "priority_actions": [
@@ -57,7 +65,8 @@ class ActionRecommendationAgent:
             "type": "course/article/video/tool"
           }
         ],
-        "tips": ["tip1", "tip2"]
+        "tips": ["tip1", "tip2"],
+        "validation_questions": ["Question 1?", "Question 2?", "Question 3?", "Question 4?", "Question 5?"]
       }
     ],
     "this_week": ["action_id_1", "action_id_2"],
@@ -69,15 +78,14 @@ class ActionRecommendationAgent:
     "motivation_boosters": ["tip1", "tip2"]
   }
 }"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Break down career path steps into concrete, actionable tasks
@@ -87,6 +95,8 @@ RESPONSIBILITIES:
 - Include resource recommendations
 - Do NOT modify the career path itself
 - Focus on what student can START DOING TODAY
+- For each action, write exactly 5 SHORT validation questions (1-2 sentences)
+  that someone who truly completed the action could answer
 
 ACTION CHARACTERISTICS:
 - Specific: "Complete Python course module 1-3" not "Learn Python"
@@ -115,51 +125,76 @@ EFFORT SCORE (1-10):
 - Consider: complexity, prerequisites, time investment
 
 OUTPUT_SCHEMA:
-{output_schema}
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    # Plans keyed on a hash of the LLM input, shared by all instances
+    _plan_cache = LRUCache(maxsize=32)
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+    
+    @functools.cached_property
+    def key_manager(self) -> APIKeyManager:
+        """Shared key manager, resolved on first use; keys are picked per call"""
+        return get_key_manager()
+    
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
+            # Streamed; returns as soon as the JSON object is complete
+            content = APIClient.call_groq_json(
+                api_key=self.key_manager.acquire_least_loaded(),
                 model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
+                messages=messages,
                 temperature=0.5,
                 max_tokens=3000
             )
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+            content = _FENCE_RE.sub("", content).strip()
+            return loads(content)
             
-        except Exception as e:
-            print(f"LLM call error: {e}")
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
             raise
     
-    def generate_actions(self, user_id: str) -> Dict[str, Any]:
-        """
-        Generate actionable tasks from career path
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
         
-        Args:
-            user_id: User identifier
-            
-        Returns:
-            Action plan with prioritized tasks
-        """
-        
-        # Load context
-        context = self.context_manager.load_context(user_id)
-        
-        # Check if there's an active path
-        if not context["active_path"].get("path_id"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "No active career path found. Generate path first."
-            }
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
         
-        # Prepare input
-        input_data = {
+        try:
+            result = await call_groq_async(
+                api_key=self.key_manager.acquire_least_loaded(),
+                model="llama-3.3-70b-versatile",
+                messages=messages,
+                temperature=0.5,
+                max_tokens=3000
+            )
+            
+            content = result["choices"][0]["message"]["content"]
+            content = _FENCE_RE.sub("", content).strip()
+            return loads(content)
+            
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
+            raise
+    
+    def _build_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the context slice the LLM plans from"""
+        return {
             "active_path": context["active_path"],
             "student_profile": context["student_profile"],
             "progress": context["progress"],
@@ -167,9 +202,17 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "current_step": context["progress"].get("current_step"),
             "active_stage": context["progress"].get("active_stage", 1)
         }
-        
-        # Call LLM
-        result = self._call_llm(input_data)
+    
+    def _no_path_error(self) -> Dict[str, Any]:
+        """Error returned when actions are requested before a path exists"""
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "error",
+            "message": "No active career path found. Generate path first."
+        }
+    
+    def _store_plan(self, user_id: str, context: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Tag the generated actions, persist them and build the agent response"""
         
         # Extract action plan
         action_plan = result["action_plan"]
@@ -180,28 +223,27 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             action["stage"] = current_stage
             action["status"] = "pending"
         
-        # Update context with pending actions
-        self.context_manager.update_actions(user_id, {
-            "pending_actions": action_plan["priority_actions"],
-            "priority_actions": [
-                a["action_id"] for a in action_plan["priority_actions"] 
-                if a["priority"] == "high"
-            ]
-        })
-        
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "actions_generated",
-            {
-                "actions_count": len(action_plan["priority_actions"]),
-                "high_priority_count": len([
-                    a for a in action_plan["priority_actions"] 
+        # Update context with pending actions and log interaction (one write)
+        self.context_manager.apply_updates(user_id, {
+            "current_actions": {
+                "pending_actions": action_plan["priority_actions"],
+                "priority_actions": [
+                    a["action_id"] for a in action_plan["priority_actions"] 
                     if a["priority"] == "high"
-                ])
+                ]
+            },
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "actions_generated",
+                "details": {
+                    "actions_count": len(action_plan["priority_actions"]),
+                    "high_priority_count": len([
+                        a for a in action_plan["priority_actions"] 
+                        if a["priority"] == "high"
+                    ])
+                }
             }
-        )
+        })
         
         return {
             "agent": self.AGENT_NAME,
@@ -210,6 +252,63 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "context_updated": True
         }
     
+    def generate_actions(self, user_id: str) -> Dict[str, Any]:
+        """
+        Generate actionable tasks from career path
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Action plan with prioritized tasks
+        """
+        
+        # Load context
+        context = self.context_manager.load_context(user_id)
+        
+        # Check if there's an active path
+        if not context["active_path"].get("path_id"):
+            return self._no_path_error()
+        
+        # Prepare input
+        input_data = self._build_input(context)
+        
+        # Call LLM (skipped when the same inputs were already planned)
+        cache_key = stable_hash(input_data)
+        result = self._plan_cache.get(cache_key)
+        if result is None:
+            result = self._call_llm(input_data)
+            self._plan_cache.set(cache_key, result)
+        
+        return self._store_plan(user_id, context, result)
+    
+    async def generate_actions_async(self, user_id: str) -> Dict[str, Any]:
+        """
+        Async variant of generate_actions, so several users/agents can be
+        planned concurrently on one event loop (see utils.async_client)
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Action plan with prioritized tasks
+        """
+        
+        context = self.context_manager.load_context(user_id)
+        
+        if not context["active_path"].get("path_id"):
+            return self._no_path_error()
+        
+        input_data = self._build_input(context)
+        
+        cache_key = stable_hash(input_data)
+        result = self._plan_cache.get(cache_key)
+        if result is None:
+            result = await self._call_llm_async(input_data)
+            self._plan_cache.set(cache_key, result)
+        
+        return self._store_plan(user_id, context, result)
+    
     def mark_action_complete(self,
                             user_id: str,
                             action_id: str,
@@ -227,12 +326,19 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         Returns:
             Updated action status
         """
+        from datetime import datetime  # only needed on completion
         
         context = self.context_manager.load_context(user_id)
         
-        # Find action in pending
+        # Find action in pending and build the remaining list in one pass
         pending = context["current_actions"].get("pending_actions", [])
-        action = next((a for a in pending if a["action_id"] == action_id), None)
+        action = None
+        updated_pending = []
+        for a in pending:
+            if a["action_id"] == action_id:
+                action = action or a
+            else:
+                updated_pending.append(a)
         
         if not action:
             return {
@@ -249,19 +355,16 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "notes": notes
         }
         
-        # Remove from pending
-        updated_pending = [a for a in pending if a["action_id"] != action_id]
-        
-        # Update context
-        self.context_manager.update_actions(user_id, {
-            "pending_actions": updated_pending,
-            "completed_action": completed_action
-        })
-        
-        # Update progress
-        self.context_manager.record_progress(user_id, {
-            "last_activity": datetime.now().isoformat(),
-            "time_spent_hours": context["progress"].get("time_spent_hours", 0) + (time_spent_hours or 0)
+        # Update actions and progress in one write
+        self.context_manager.apply_updates(user_id, {
+            "current_actions": {
+                "pending_actions": updated_pending,
+                "completed_action": completed_action
+            },
+            "progress": {
+                "last_activity": datetime.now().isoformat(),
+                "time_spent_hours": context["progress"].get("time_spent_hours", 0) + (time_spent_hours or 0)
+            }
         })
         
         return {
@@ -274,7 +377,10 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
     def generate_validation_questions(self, user_id: str, action: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate validation questions to verify action completion.
-        Uses ONE API call to generate targeted questions.
+        Reuses the questions generated alongside the action when present;
+        otherwise uses ONE API call to generate targeted questions and stores
+        them on the action, so re-opening the dialog for an action the caller
+        has saved back to context costs no further API calls.
         
         Args:
             user_id: User identifier
@@ -283,7 +389,17 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         Returns:
             Questions for user to answer
         """
-        print(f"\n🔑 [GENERATE_QUESTIONS] ActionRecommendationAgent → Using API Key #{self.api_key[-1]}")
+        # Questions produced with the action plan (or on an earlier call) - no API call needed
+        embedded_questions = action.get("validation_questions")
+        if isinstance(embedded_questions, list) and embedded_questions:
+            return {
+                "status": "success",
+                "questions": embedded_questions,
+                "message": f"Loaded {len(embedded_questions)} questions from action plan"
+            }
+        
+        api_key = self.key_manager.acquire_least_loaded()
+        logger.debug("[GENERATE_QUESTIONS] ActionRecommendationAgent → Using API Key #%s", self.key_manager.key_number(api_key))
         
         try:
             prompt = f"""You are evaluating if a student has truly completed this action. Generate exactly 5 validation questions.
@@ -302,65 +418,46 @@ Return ONLY a JSON array with NO markdown or extra text:
 ["Question 1?", "Question 2?", "Question 3?", "Question 4?", "Question 5?"]"""
             
             result = APIClient.call_groq_api(
-                api_key=self.api_key,
+                api_key=api_key,
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "system", "content": prompt}],
-                temperature=0.6,
-                max_tokens=800
+                temperature=0.3,
+                max_tokens=250
             )
             
             content = result["choices"][0]["message"]["content"]
-            print(f"[DEBUG] LLM Response: {content[:200]}...")
-            
-            import re
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM Response: %s...", content[:200])
             
             # Extract JSON array from response
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                try:
-                    questions_text = json_match.group()
-                    questions = json.loads(questions_text)
-                    if isinstance(questions, list) and len(questions) > 0:
-                        print(f"✓ Generated {len(questions)} validation questions")
-                        return {
-                            "status": "success",
-                            "questions": questions,
-                            "message": f"Generated {len(questions)} questions"
-                        }
-                except json.JSONDecodeError as je:
-                    print(f"JSON parse error: {je}")
+            try:
+                questions = decode_first_json(content, "[")
+                if isinstance(questions, list) and len(questions) > 0:
+                    logger.debug("Generated %d validation questions", len(questions))
+                    action["validation_questions"] = questions
+                    return {
+                        "status": "success",
+                        "questions": questions,
+                        "message": f"Generated {len(questions)} questions"
+                    }
+            except ValueError as je:
+                logger.debug("JSON parse error: %s", je)
             
             # Fallback questions if parsing fails
-            print(f"⚠️ Using fallback questions")
-            default_questions = [
-                f"What is the main objective of this action?",
-                f"What did you learn or accomplish?",
-                f"How did you know when you succeeded?",
-                f"What was the most challenging part?",
-                f"What would you improve next time?"
-            ]
+            logger.debug("Using fallback questions")
             return {
                 "status": "success",
-                "questions": default_questions,
+                "questions": list(_DEFAULT_VALIDATION_QUESTIONS),
                 "message": "Generated default questions"
             }
             
         except Exception as e:
-            print(f"❌ Error generating questions: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error generating questions: %s", e, exc_info=True)
             
             # Return fallback questions on error
-            default_questions = [
-                f"What is the main objective of this action?",
-                f"What did you learn or accomplish?",
-                f"How did you know when you succeeded?",
-                f"What was the most challenging part?",
-                f"What would you improve next time?"
-            ]
             return {
                 "status": "success",
-                "questions": default_questions,
+                "questions": list(_DEFAULT_VALIDATION_QUESTIONS),
                 "message": "Generated default questions (error occurred)"
             }
 
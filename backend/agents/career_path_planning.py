@@ -3,15 +3,23 @@ Career Path Planning Agent
 Generates step-by-step career paths with primary and fallback routes
 """
 
+import functools
 import json
-import os
-from typing import Dict, Any
-import requests
+import logging
+import re
 import uuid
-from datetime import datetime
+from typing import Dict, Any, Optional
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
-from ..utils.api_key_manager import get_key_manager
+from ..utils.api_key_manager import APIKeyManager, get_key_manager
+from ..utils.json_utils import dumps_compact, loads, stable_hash
+from ..utils.llm_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled once at import; reused for every LLM response
+_FENCE_RE = re.compile(r"```(?:json)?")
 
 
 class CareerPathPlanningAgent:
@@ -27,16 +35,7 @@ class CareerPathPlanningAgent:
         "Estimate success probability conservatively."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("CareerPathPlanningAgent")
-    
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
+    OUTPUT_SCHEMA = """{
   "career_path": {
     "path_id": "unique-path-id",
     "target_role": "Target Role",
@@ -71,15 +70,14 @@ class CareerPathPlanningAgent:
     "path_rationale": "Why this path was designed this way"
   }
 }"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Design a realistic, step-by-step career path to the target role
@@ -111,68 +109,93 @@ FALLBACK PATHS:
 - Roles student is better prepared for
 
 OUTPUT_SCHEMA:
-{output_schema}
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    # Paths keyed on a hash of the LLM input, shared by all instances
+    _path_cache = LRUCache(maxsize=32)
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+    
+    @functools.cached_property
+    def key_manager(self) -> APIKeyManager:
+        """Shared key manager, resolved on first use; keys are picked per call"""
+        return get_key_manager()
+    
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
+            # Streamed; returns as soon as the JSON object is complete
+            content = APIClient.call_groq_json(
+                api_key=self.key_manager.acquire_least_loaded(),
                 model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
+                messages=messages,
                 temperature=0.5,
                 max_tokens=3000
             )
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+            content = _FENCE_RE.sub("", content).strip()
+            return loads(content)
             
-        except Exception as e:
-            print(f"LLM call error: {e}")
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
             raise
     
-    def generate_path(self, 
-                     user_id: str,
-                     duration_weeks: int = 12) -> Dict[str, Any]:
-        """
-        Generate career path for user
-        
-        Args:
-            user_id: User identifier
-            duration_weeks: Available time for learning
-            
-        Returns:
-            Complete career path with primary and fallback routes
-        """
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
         
-        # Load context
-        context = self.context_manager.load_context(user_id)
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
         
-        # Validate prerequisites
+        try:
+            result = await call_groq_async(
+                api_key=self.key_manager.acquire_least_loaded(),
+                model="llama-3.3-70b-versatile",
+                messages=messages,
+                temperature=0.5,
+                max_tokens=3000
+            )
+            
+            content = result["choices"][0]["message"]["content"]
+            content = _FENCE_RE.sub("", content).strip()
+            return loads(content)
+            
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
+            raise
+    
+    def _missing_prerequisite(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Error response if an earlier agent has not run yet, else None"""
         if not context["career_goals"].get("interpreted_goal"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "Missing interpreted goal. Run Goal Interpretation Agent first."
-            }
-        
-        if not context["readiness"].get("confidence_score"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "Missing readiness assessment. Run Readiness Assessment Agent first."
-            }
-        
-        if not context["market_context"].get("target_role_analysis"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "Missing market analysis. Run Market Intelligence Agent first."
-            }
+            missing = "interpreted goal. Run Goal Interpretation Agent"
+        elif not context["readiness"].get("confidence_score"):
+            missing = "readiness assessment. Run Readiness Assessment Agent"
+        elif not context["market_context"].get("target_role_analysis"):
+            missing = "market analysis. Run Market Intelligence Agent"
+        else:
+            return None
         
-        # Prepare comprehensive input
-        input_data = {
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "error",
+            "message": f"Missing {missing} first."
+        }
+    
+    def _build_input(self, context: Dict[str, Any], duration_weeks: int) -> Dict[str, Any]:
+        """Profile, readiness and market context the path is planned from"""
+        return {
             "target_role": context["career_goals"]["interpreted_goal"],
             "student_profile": context["student_profile"],
             "readiness_assessment": context["readiness"],
@@ -180,9 +203,9 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "available_duration_weeks": duration_weeks,
             "previous_attempts": context["reroute_history"].get("failed_paths", [])
         }
-        
-        # Call LLM
-        result = self._call_llm(input_data)
+    
+    def _store_path(self, user_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the generated path as the active path and build the agent response"""
         
         # Extract career path
         career_path = result["career_path"]
@@ -220,6 +243,58 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "career_path": career_path,
             "context_updated": True
         }
+    
+    def generate_path(self, 
+                     user_id: str,
+                     duration_weeks: int = 12) -> Dict[str, Any]:
+        """
+        Generate career path for user
+        
+        Args:
+            user_id: User identifier
+            duration_weeks: Available time for learning
+            
+        Returns:
+            Complete career path with primary and fallback routes
+        """
+        
+        # Load context and prepare comprehensive input
+        context = self.context_manager.load_context(user_id)
+        error = self._missing_prerequisite(context)
+        if error is not None:
+            return error
+        input_data = self._build_input(context, duration_weeks)
+        
+        # Call LLM (skipped when the same inputs were already planned)
+        cache_key = stable_hash(input_data)
+        result = self._path_cache.get(cache_key)
+        if result is None:
+            result = self._call_llm(input_data)
+            self._path_cache.set(cache_key, result)
+        
+        return self._store_path(user_id, result)
+    
+    async def generate_path_async(self,
+                                  user_id: str,
+                                  duration_weeks: int = 12) -> Dict[str, Any]:
+        """
+        Async variant of generate_path, so onboarding can await it on the
+        same event loop as the other agents (see utils.async_client)
+        """
+        
+        context = self.context_manager.load_context(user_id)
+        error = self._missing_prerequisite(context)
+        if error is not None:
+            return error
+        input_data = self._build_input(context, duration_weeks)
+        
+        cache_key = stable_hash(input_data)
+        result = self._path_cache.get(cache_key)
+        if result is None:
+            result = await self._call_llm_async(input_data)
+            self._path_cache.set(cache_key, result)
+        
+        return self._store_path(user_id, result)
 
 
 # Example usage
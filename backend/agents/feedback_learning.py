@@ -4,13 +4,26 @@ Evaluates action effectiveness and updates confidence signals
 """
 
 import json
+import logging
 import os
-from typing import Dict, Any, List
+import re
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
 import requests
+from pydantic import ValidationError
 from datetime import datetime
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
 from ..utils.api_key_manager import get_key_manager
+from ..utils.json_utils import dumps_compact, extract_first_json_object, loads, stable_hash
+from .schemas import FeedbackAnalysisResult, repair_messages
+from ..utils.llm_cache import cached_llm
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled once at import; reused for every LLM response
+_FENCE_RE = re.compile(r"```(?:json)?")
 
 
 class FeedbackLearningAgent:
@@ -18,6 +31,9 @@ class FeedbackLearningAgent:
     Analyzes progress and provides feedback for continuous improvement
     """
     
+    # Agents are created per session; no per-instance __dict__
+    __slots__ = ("context_manager", "key_manager")
+    
     AGENT_NAME = "Feedback & Learning Agent"
     AGENT_OBJECTIVE = (
         "Evaluate effectiveness of prior actions. "
@@ -25,16 +41,7 @@ class FeedbackLearningAgent:
         "Provide feedback for future planning."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("FeedbackLearningAgent")
-    
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
+    OUTPUT_SCHEMA = """{
   "feedback_analysis": {
     "overall_progress_rating": "excellent/good/fair/poor",
     "progress_percentage": 45,
@@ -73,15 +80,14 @@ class FeedbackLearningAgent:
     "encouragement_message": "Personalized motivational message"
   }
 }"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Evaluate progress objectively based on completed actions
@@ -122,27 +128,217 @@ FEEDBACK PRINCIPLES:
 - Maintain motivation and momentum
 
 OUTPUT_SCHEMA:
-{output_schema}
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+        # Keys are picked per call (least loaded first), not pinned per agent
+        self.key_manager = get_key_manager()
+        for api_key in self.key_manager.get_all_keys():
+            APIClient.warmup(api_key)
+    
+    @cached_llm(maxsize=64, ttl=3600)
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.5,
-                max_tokens=2500
-            )
+            for attempt in range(2):
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.5,
+                    max_tokens=1500
+                )
+                
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return FeedbackAnalysisResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    # One targeted re-prompt instead of failing the whole flow
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
+            raise
+    
+    @cached_llm(cache=_call_llm.cache)
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
+        try:
+            for attempt in range(2):
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.5,
+                    max_tokens=1500
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return FeedbackAnalysisResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-        except Exception as e:
-            print(f"LLM call error: {e}")
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
             raise
     
+    # Caps on how much history is sent to the LLM
+    MAX_COMPLETED_ACTIONS = 20
+    MAX_PENDING_ACTIONS = 20
+    MAX_REROUTE_REASONS = 5
+    
+    def _build_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Project the context down to the fields the feedback prompt uses:
+        no personal info, no long history arrays, recent actions only
+        """
+        profile = context["student_profile"]
+        active_path = context["active_path"]
+        progress = context["progress"]
+        readiness = context["readiness"]
+        reroute_history = context["reroute_history"]
+        
+        completed_fields = ("action_id", "title", "type", "priority", "estimated_hours",
+                            "time_spent_hours", "completed_at", "notes")
+        pending_fields = ("action_id", "title", "type", "priority", "estimated_hours")
+        
+        return {
+            "student_profile": {
+                "experience_level": profile.get("experience_level"),
+                "technical_skills": profile.get("technical_skills", {}),
+                "strength_areas": profile.get("strength_areas", []),
+                "weakness_areas": profile.get("weakness_areas", []),
+                "learning_capacity": profile.get("learning_capacity")
+            },
+            "active_path": {
+                "target_role": active_path.get("target_role"),
+                "status": active_path.get("status"),
+                "success_probability": active_path.get("success_probability"),
+                "created_at": active_path.get("created_at")
+            },
+            "progress": {
+                key: progress.get(key)
+                for key in ("current_step", "blockers", "time_spent_hours", "completion_rate",
+                            "last_activity", "active_stage", "stage_completion_rate")
+            },
+            "completed_actions": [
+                {key: action.get(key) for key in completed_fields if key in action}
+                for action in context["current_actions"]["completed_actions"][-self.MAX_COMPLETED_ACTIONS:]
+            ],
+            "pending_actions": [
+                {key: action.get(key) for key in pending_fields if key in action}
+                for action in context["current_actions"].get("pending_actions", [])[:self.MAX_PENDING_ACTIONS]
+            ],
+            "current_readiness": {
+                "confidence_score": readiness.get("confidence_score"),
+                "deviation_risk": readiness.get("deviation_risk"),
+                "weak_areas": readiness.get("weak_areas", []),
+                "readiness_verdict": readiness.get("readiness_verdict")
+            },
+            "reroute_history": {
+                "reroute_count": reroute_history.get("reroute_count", 0),
+                "reroute_reasons": reroute_history.get("reroute_reasons", [])[-self.MAX_REROUTE_REASONS:]
+            }
+        }
+    
+    def _no_actions_info(self) -> Dict[str, Any]:
+        """Response when there is nothing to evaluate yet"""
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "info",
+            "message": "No completed actions yet. Complete some actions first."
+        }
+    
+    def _apply_feedback(self, user_id: str, result: Dict[str, Any], state_hash: str = None) -> Dict[str, Any]:
+        """Store the LLM feedback in the user context and build the agent response"""
+        self._persist_feedback(user_id, result["feedback_analysis"], state_hash)
+        return self._feedback_response(result["feedback_analysis"])
+    
+    def _feedback_response(self, feedback: Dict[str, Any]) -> Dict[str, Any]:
+        """Agent response for a successful evaluation"""
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "feedback_analysis": feedback,
+            "context_updated": True
+        }
+    
+    def _progress_state_hash(self, context: Dict[str, Any]) -> str:
+        """Hash of the progress state feedback depends on (recording a blocker changes it)"""
+        return stable_hash([
+            context["active_path"].get("path_id"),
+            context["current_actions"].get("completed_actions", []),
+            context["progress"].get("blockers", [])
+        ])
+    
+    def _cached_feedback(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Last stored feedback if progress hasn't changed since it was generated"""
+        last_feedback = context["metadata"].get("last_feedback") or {}
+        if last_feedback.get("state_hash") != self._progress_state_hash(context):
+            return None
+        
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "feedback_analysis": last_feedback["feedback_analysis"],
+            "context_updated": False,
+            "cached": True
+        }
+    
+    def _persist_feedback(self, user_id: str, feedback: Dict[str, Any], state_hash: str = None) -> None:
+        """Write feedback-derived readiness/progress updates to the user context"""
+        
+        # Update readiness scores, progress metrics and log interaction (one write)
+        self.context_manager.apply_updates(user_id, {
+            "readiness": {
+                "confidence_score": feedback["updated_confidence_score"],
+                "deviation_risk": feedback["updated_deviation_risk"]
+            },
+            "progress": {
+                "completion_rate": feedback["progress_percentage"] / 100.0,
+                "last_activity": datetime.now().isoformat()
+            },
+            "metadata": {
+                "last_feedback": {
+                    "state_hash": state_hash,
+                    "feedback_analysis": feedback
+                }
+            },
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "feedback_generated",
+                "details": {
+                    "progress_rating": feedback["overall_progress_rating"],
+                    "velocity": feedback["velocity_assessment"],
+                    "confidence_change": feedback["confidence_adjustment"]
+                }
+            }
+        })
+    
     def evaluate_progress(self, user_id: str) -> Dict[str, Any]:
         """
         Evaluate overall progress and provide feedback
@@ -159,59 +355,133 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         
         # Check if there's enough data to evaluate
         if not context["current_actions"].get("completed_actions"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "info",
-                "message": "No completed actions yet. Complete some actions first."
-            }
+            return self._no_actions_info()
+        
+        # Nothing changed since the last evaluation - reuse it
+        cached = self._cached_feedback(context)
+        if cached is not None:
+            return cached
         
         # Prepare input
-        input_data = {
-            "student_profile": context["student_profile"],
-            "active_path": context["active_path"],
-            "progress": context["progress"],
-            "completed_actions": context["current_actions"]["completed_actions"],
-            "pending_actions": context["current_actions"].get("pending_actions", []),
-            "current_readiness": context["readiness"],
-            "reroute_history": context["reroute_history"]
-        }
+        input_data = self._build_input(context)
         
         # Call LLM
         result = self._call_llm(input_data)
         
-        # Extract feedback
+        return self._apply_feedback(user_id, result, self._progress_state_hash(context))
+    
+    async def evaluate_progress_async(self, user_id: str) -> Dict[str, Any]:
+        """
+        Async variant of evaluate_progress, so it can be awaited alongside
+        other agents on one event loop (see utils.async_client)
+        """
+        
+        context = self.context_manager.load_context(user_id)
+        
+        if not context["current_actions"].get("completed_actions"):
+            return self._no_actions_info()
+        
+        cached = self._cached_feedback(context)
+        if cached is not None:
+            return cached
+        
+        state_hash = self._progress_state_hash(context)
+        result = await self._call_llm_async(self._build_input(context))
+        
+        return self._apply_feedback(user_id, result, state_hash)
+    
+    def evaluate_progress_deferred(self, user_id: str) -> Tuple[Dict[str, Any], Optional[Future]]:
+        """
+        Like evaluate_progress, but the context writes run on the context
+        manager's writer pool so the caller can start its next LLM call
+        immediately. Wait on the returned future (if any) before the end of
+        the request; load_context for this user waits for it automatically.
+        Inside UserContextManager.batch() the write happens synchronously
+        (see submit_write), so there is nothing to overlap there.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            (feedback result, future for the pending write or None)
+        """
+        
+        context = self.context_manager.load_context(user_id)
+        
+        if not context["current_actions"].get("completed_actions"):
+            return self._no_actions_info(), None
+        
+        cached = self._cached_feedback(context)
+        if cached is not None:
+            return cached, None
+        
+        result = self._call_llm(self._build_input(context))
         feedback = result["feedback_analysis"]
         
-        # Update readiness scores based on feedback
-        self.context_manager.update_readiness(user_id, {
-            "confidence_score": feedback["updated_confidence_score"],
-            "deviation_risk": feedback["updated_deviation_risk"]
-        })
+        write = self.context_manager.submit_write(
+            user_id, self._persist_feedback, user_id, feedback, self._progress_state_hash(context)
+        )
+        return self._feedback_response(feedback), write
+    
+    async def evaluate_many_async(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Evaluate progress for several users with their LLM calls in flight
+        concurrently (bounded by the async client's semaphore)
         
-        # Update progress metrics
-        self.context_manager.record_progress(user_id, {
-            "completion_rate": feedback["progress_percentage"] / 100.0,
-            "last_activity": datetime.now().isoformat()
-        })
+        Args:
+            user_ids: User identifiers
+            
+        Returns:
+            Feedback result per user_id
+        """
+        import asyncio
         
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "feedback_generated",
-            {
-                "progress_rating": feedback["overall_progress_rating"],
-                "velocity": feedback["velocity_assessment"],
-                "confidence_change": feedback["confidence_adjustment"]
-            }
+        results = {}
+        pending = {}
+        state_hashes = {}
+        
+        for user_id in user_ids:
+            context = self.context_manager.load_context(user_id)
+            if not context["current_actions"].get("completed_actions"):
+                results[user_id] = self._no_actions_info()
+                continue
+            
+            cached = self._cached_feedback(context)
+            if cached is not None:
+                results[user_id] = cached
+            else:
+                pending[user_id] = self._build_input(context)
+                state_hashes[user_id] = self._progress_state_hash(context)
+        
+        responses = await asyncio.gather(
+            *[self._call_llm_async(input_data) for input_data in pending.values()],
+            return_exceptions=True
         )
         
-        return {
-            "agent": self.AGENT_NAME,
-            "status": "success",
-            "feedback_analysis": feedback,
-            "context_updated": True
-        }
+        for user_id, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                results[user_id] = {
+                    "agent": self.AGENT_NAME,
+                    "status": "error",
+                    "message": str(response)
+                }
+            else:
+                results[user_id] = self._apply_feedback(user_id, response, state_hashes[user_id])
+        
+        return results
+    
+    def evaluate_many(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Sync entry point for evaluate_many_async (runs one event loop for the batch)"""
+        import asyncio
+        from ..utils.async_client import close_async_client
+        
+        async def run():
+            try:
+                return await self.evaluate_many_async(user_ids)
+            finally:
+                await close_async_client()
+        
+        return asyncio.run(run())
     
     def record_blocker(self,
                       user_id: str,
@@ -238,21 +508,20 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "timestamp": datetime.now().isoformat()
         }
         
-        # Record in context
-        self.context_manager.record_progress(user_id, {
-            "blocker": blocker_entry
-        })
-        
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "blocker_recorded",
-            {
-                "action_id": action_id,
-                "blocker_count": len(self.context_manager.load_context(user_id)["progress"]["blockers"])
+        # Record in context and log interaction (one load, one write)
+        self.context_manager.apply_updates(user_id, {
+            "progress": {
+                "blocker": blocker_entry
+            },
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "blocker_recorded",
+                "details": lambda context: {
+                    "action_id": action_id,
+                    "blocker_count": len(context["progress"]["blockers"])
+                }
             }
-        )
+        })
         
         return {
             "agent": self.AGENT_NAME,
@@ -274,7 +543,8 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         Returns:
             Evaluation with relevance_score (0-1) and feedback
         """
-        print(f"\n🔑 [EVALUATE_ANSWERS] FeedbackLearningAgent → Using API Key #{self.api_key[-1]}")
+        api_key = self.key_manager.acquire_least_loaded()
+        logger.debug("[EVALUATE_ANSWERS] FeedbackLearningAgent → Using API Key #%s", self.key_manager.key_number(api_key))
         
         try:
             # Format questions and answers for evaluation
@@ -316,36 +586,34 @@ Return ONLY JSON (no markdown):
   "next_steps": "What to do if not satisfied"
 }}"""
             
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
+            # Streamed; returns as soon as the JSON object is complete
+            content = APIClient.call_groq_json(
+                api_key=api_key,
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "system", "content": prompt}],
                 temperature=0.6,
-                max_tokens=500
+                max_tokens=250
             )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Evaluation Response: %s...", content[:200])
             
-            content = result["choices"][0]["message"]["content"]
-            print(f"[DEBUG] Evaluation Response: {content[:200]}...")
-            
-            import re
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
+            # Extract the first complete JSON object from response
+            json_text = extract_first_json_object(content)
+            if json_text:
                 try:
-                    evaluation = json.loads(json_match.group())
+                    evaluation = loads(json_text)
                     score = evaluation.get("relevance_score", 0)
                     
                     # Threshold: >= 0.5 = satisfied (50% passing)
                     evaluation["agent_satisfied"] = score >= 0.5
                     
-                    print(f"✓ Evaluated answers: Score {score:.2f}, Satisfied: {evaluation['agent_satisfied']}")
+                    logger.debug("Evaluated answers: Score %.2f, Satisfied: %s", score, evaluation["agent_satisfied"])
                     return evaluation
                 except json.JSONDecodeError as je:
-                    print(f"JSON parse error: {je}")
+                    logger.debug("JSON parse error: %s", je)
             
             # Fallback evaluation
-            print(f"⚠️ Using fallback evaluation")
+            logger.debug("Using fallback evaluation")
             return {
                 "relevance_score": 0.5,
                 "agent_satisfied": False,
@@ -354,9 +622,7 @@ Return ONLY JSON (no markdown):
             }
             
         except Exception as e:
-            print(f"❌ Error evaluating answers: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error evaluating answers: %s", e, exc_info=True)
             
             # Return safe fallback on error
             return {
@@ -3,19 +3,57 @@ Goal Interpretation Agent
 Converts vague career aspirations into concrete, well-defined roles
 """
 
+import copy
+import difflib
+import functools
 import json
+import logging
 import os
-from typing import Dict, Any
+import re
+from pathlib import Path
+from typing import Dict, Any, Optional
 import requests
+from pydantic import ValidationError
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
 from ..utils.api_key_manager import get_key_manager
+from ..utils.json_utils import dumps_compact
+from .schemas import InterpretedGoalResult, repair_messages
+from ..utils.llm_cache import cached_llm, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled once at import; reused for every LLM response
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+# Well-known role titles resolved without an LLM call
+_ROLES_CATALOG_PATH = Path(__file__).with_name("roles_catalog.json")
+_GOAL_PREFIX_RE = re.compile(r"^(?:i (?:want|would like|wish) to (?:be|become|work as) )?(?:an? )?")
+_CATALOG_FUZZY_CUTOFF = 0.92
+
+
+@functools.lru_cache(maxsize=1)
+def _load_roles_catalog() -> Dict[str, Dict[str, Any]]:
+    """Map each normalized alias in roles_catalog.json to its interpreted goal"""
+    with open(_ROLES_CATALOG_PATH, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    
+    return {
+        normalize_text(alias): entry["interpreted_goal"]
+        for entry in catalog["roles"]
+        for alias in entry["aliases"]
+    }
+
 
 class GoalInterpretationAgent:
     """
     Converts vague career goals into specific, actionable role definitions
     """
     
+    # Agents are created per session; no per-instance __dict__
+    __slots__ = ("context_manager", "key_manager")
+    
     AGENT_NAME = "Goal Interpretation Agent"
     AGENT_OBJECTIVE = (
         "Convert vague aspirations into concrete, well-defined career roles. "
@@ -23,16 +61,7 @@ class GoalInterpretationAgent:
         "Estimate goal clarity and required commitment."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("GoalInterpretationAgent")
-    
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
+    OUTPUT_SCHEMA = """{
   "interpreted_goal": {
     "role_title": "Specific Job Title",
     "role_category": "Category (e.g., Software Development, Data Science)",
@@ -46,15 +75,14 @@ class GoalInterpretationAgent:
     "interpretation_notes": "Why this interpretation was chosen"
   }
 }"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI–Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Convert vague or ambiguous career goals into specific role titles
@@ -69,27 +97,150 @@ EXAMPLES:
 - "Tech" -> "Software Developer" (low clarity, needs more info)
 
 OUTPUT_SCHEMA:
-{output_schema}
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+        # Keys are picked per call (least loaded first), not pinned per agent
+        self.key_manager = get_key_manager()
+        for api_key in self.key_manager.get_all_keys():
+            APIClient.warmup(api_key)
+    
+    # Same goal text + background -> same interpretation, for any user
+    @cached_llm(
+        maxsize=256,
+        ttl=24 * 3600,
+        key_fn=lambda data: {**data, "desired_role": normalize_text(data.get("desired_role"))}
+    )
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.3,
-                max_tokens=1500
-            )
+            for attempt in range(2):
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=700
+                )
+                
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return InterpretedGoalResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    # One targeted re-prompt instead of failing the whole flow
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
+            raise
+    
+    @cached_llm(
+        cache=_call_llm.cache,
+        key_fn=lambda data: {**data, "desired_role": normalize_text(data.get("desired_role"))}
+    )
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
+        try:
+            for attempt in range(2):
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=700
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return InterpretedGoalResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-        except Exception as e:
-            print(f"LLM call error: {e}")
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
             raise
     
+    def _lookup_catalog(self, desired_role: str) -> Optional[Dict[str, Any]]:
+        """Return a catalog interpretation for common role titles (exact or near-exact match)"""
+        query = _GOAL_PREFIX_RE.sub("", normalize_text(desired_role) or "").strip(" .!")
+        if not query:
+            return None
+        
+        catalog = _load_roles_catalog()
+        match = catalog.get(query)
+        if match is None:
+            close = difflib.get_close_matches(query, catalog.keys(), n=1, cutoff=_CATALOG_FUZZY_CUTOFF)
+            match = catalog[close[0]] if close else None
+        
+        return copy.deepcopy(match) if match is not None else None
+    
+    def _build_input(self, user_id: str, desired_role: str) -> Dict[str, Any]:
+        """Goal text plus the student background the interpretation may use"""
+        context = self.context_manager.load_context(user_id)
+        return {
+            "desired_role": desired_role,
+            "student_background": {
+                "education": context["student_profile"]["personal_info"].get("education"),
+                "experience_level": context["student_profile"].get("experience_level"),
+                "current_skills": context["student_profile"].get("technical_skills", {})
+            },
+            "previous_goals": context["career_goals"].get("goal_history", [])[-5:]
+        }
+    
+    def _store_goal(self, user_id: str, desired_role: str, interpreted_goal: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the interpreted goal and build the agent response"""
+        
+        # Update context and log interaction (one write)
+        with self.context_manager.batch(user_id):
+            self.context_manager.update_career_goals(user_id, {
+                "current_goal": desired_role,
+                "interpreted_goal": interpreted_goal,
+                "goal_clarity_score": interpreted_goal["goal_clarity_score"],
+                "commitment_level": interpreted_goal["commitment_level"]
+            })
+            
+            # Log interaction
+            self.context_manager.log_agent_interaction(
+                user_id,
+                self.AGENT_NAME,
+                "goal_interpreted",
+                {
+                    "original_goal": desired_role,
+                    "interpreted_role": interpreted_goal["role_title"],
+                    "clarity_score": interpreted_goal["goal_clarity_score"]
+                }
+            )
+        
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "interpreted_goal": interpreted_goal,
+            "context_updated": True
+        }
+    
     def interpret_goal(self, 
                       user_id: str,
                       desired_role: str) -> Dict[str, Any]:
@@ -104,52 +255,31 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             Interpreted goal with clarity assessment
         """
         
-        # Load context to understand student background
-        context = self.context_manager.load_context(user_id)
-        
-        # Prepare input
-        input_data = {
-            "desired_role": desired_role,
-            "student_background": {
-                "education": context["student_profile"]["personal_info"].get("education"),
-                "experience_level": context["student_profile"].get("experience_level"),
-                "current_skills": context["student_profile"].get("technical_skills", {})
-            },
-            "previous_goals": context["career_goals"].get("goal_history", [])
-        }
+        # Common, unambiguous role titles don't need the LLM
+        interpreted_goal = self._lookup_catalog(desired_role)
         
-        # Call LLM
-        result = self._call_llm(input_data)
+        if interpreted_goal is None:
+            # Call LLM with the student's background
+            result = self._call_llm(self._build_input(user_id, desired_role))
+            interpreted_goal = result["interpreted_goal"]
         
-        # Extract interpreted goal
-        interpreted_goal = result["interpreted_goal"]
+        return self._store_goal(user_id, desired_role, interpreted_goal)
+    
+    async def interpret_goal_async(self,
+                                   user_id: str,
+                                   desired_role: str) -> Dict[str, Any]:
+        """
+        Async variant of interpret_goal, so onboarding can await it on the
+        same event loop as the other agents (see utils.async_client)
+        """
         
-        # Update context
-        self.context_manager.update_career_goals(user_id, {
-            "current_goal": desired_role,
-            "interpreted_goal": interpreted_goal,
-            "goal_clarity_score": interpreted_goal["goal_clarity_score"],
-            "commitment_level": interpreted_goal["commitment_level"]
-        })
+        interpreted_goal = self._lookup_catalog(desired_role)
         
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "goal_interpreted",
-            {
-                "original_goal": desired_role,
-                "interpreted_role": interpreted_goal["role_title"],
-                "clarity_score": interpreted_goal["goal_clarity_score"]
-            }
-        )
+        if interpreted_goal is None:
+            result = await self._call_llm_async(self._build_input(user_id, desired_role))
+            interpreted_goal = result["interpreted_goal"]
         
-        return {
-            "agent": self.AGENT_NAME,
-            "status": "success",
-            "interpreted_goal": interpreted_goal,
-            "context_updated": True
-        }
+        return self._store_goal(user_id, desired_role, interpreted_goal)
 
 
 # Example usage
@@ -4,18 +4,43 @@ Assesses market demand and feasibility for target roles
 """
 
 import json
+import logging
 import os
+import re
+from datetime import date
 from typing import Dict, Any, List
 import requests
+from pydantic import ValidationError
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
 from ..utils.api_key_manager import get_key_manager
+from ..utils.json_utils import dumps_compact
+from .schemas import MarketAnalysisResult, repair_messages
+from ..utils.llm_cache import cached_llm, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+# Compiled once at import; reused for every LLM response
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+
+def _market_cache_key(input_data: Dict[str, Any]) -> List[str]:
+    """Cache market analyses per normalized role title and day"""
+    return [
+        normalize_text(input_data["target_role"].get("role_title")),
+        date.today().isoformat()
+    ]
+
 
 class MarketIntelligenceAgent:
     """
     Evaluates market demand, competition, and identifies adjacent roles
     """
     
+    # Agents are created per session; no per-instance __dict__
+    __slots__ = ("context_manager", "key_manager")
+    
     AGENT_NAME = "Market Intelligence Agent"
     AGENT_OBJECTIVE = (
         "Assess external feasibility of the target role. "
@@ -24,16 +49,7 @@ class MarketIntelligenceAgent:
         "Do NOT personalize advice."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("MarketIntelligenceAgent")
-    
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
+    OUTPUT_SCHEMA = """{
   "market_analysis": {
     "role_title": "Target Role",
     "demand_score": 75,
@@ -58,15 +74,14 @@ class MarketIntelligenceAgent:
     "last_updated": "2026-01-23"
   }
 }"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Assess current market demand for the target role (demand_score 0-100)
@@ -95,27 +110,144 @@ ADJACENT SAFER ROLES:
 - Roles that use similar skills but less specialized
 
 OUTPUT_SCHEMA:
-{output_schema}
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+        # Keys are picked per call (least loaded first), not pinned per agent
+        self.key_manager = get_key_manager()
+        for api_key in self.key_manager.get_all_keys():
+            APIClient.warmup(api_key)
+    
+    # Market analysis depends only on the target role, so one call per role per
+    # day serves every user asking about it
+    @cached_llm(maxsize=256, ttl=24 * 3600, key_fn=_market_cache_key)
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.4,
-                max_tokens=2000
-            )
+            for attempt in range(2):
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.4,
+                    max_tokens=1200
+                )
+                
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return MarketAnalysisResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    # One targeted re-prompt instead of failing the whole flow
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
+            raise
+    
+    @cached_llm(cache=_call_llm.cache, key_fn=_market_cache_key)
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+        
+        try:
+            for attempt in range(2):
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    temperature=0.4,
+                    max_tokens=1200
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                content = _FENCE_RE.sub("", content).strip()
+                try:
+                    return MarketAnalysisResult.model_validate_json(content).model_dump()
+                except ValidationError as ve:
+                    if attempt:
+                        raise
+                    messages = repair_messages(messages, content, ve, self.OUTPUT_SCHEMA)
             
-        except Exception as e:
-            print(f"LLM call error: {e}")
+        except Exception:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": "llama-3.3-70b-versatile"})
             raise
     
+    def _no_goal_error(self) -> Dict[str, Any]:
+        """Error returned when the market is analyzed before a goal exists"""
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "error",
+            "message": "No interpreted goal found. Run Goal Interpretation Agent first."
+        }
+    
+    def _build_input(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Target role only (no student profile - pure market analysis)"""
+        interpreted_goal = context["career_goals"]["interpreted_goal"]
+        return {
+            "target_role": {
+                "role_title": interpreted_goal.get("role_title"),
+                "required_skills": interpreted_goal.get("required_skills", [])
+            },
+            "analysis_date": "2026-01-23"
+        }
+    
+    def _store_analysis(self, user_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the market analysis and build the agent response"""
+        
+        # Extract market analysis
+        market_analysis = result["market_analysis"]
+        
+        # Update context and log interaction (one write)
+        with self.context_manager.batch(user_id):
+            self.context_manager.update_market_context(user_id, {
+                "target_role_analysis": market_analysis,
+                "market_trends": [
+                    {
+                        "role": market_analysis["role_title"],
+                        "demand_score": market_analysis["demand_score"],
+                        "trend": market_analysis["market_trend"],
+                        "timestamp": market_analysis["last_updated"]
+                    }
+                ]
+            })
+            
+            # Log interaction
+            self.context_manager.log_agent_interaction(
+                user_id,
+                self.AGENT_NAME,
+                "market_analyzed",
+                {
+                    "role": market_analysis["role_title"],
+                    "demand_score": market_analysis["demand_score"],
+                    "trend": market_analysis["market_trend"]
+                }
+            )
+        
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "market_analysis": market_analysis,
+            "context_updated": True
+        }
+    
     def analyze_market(self, user_id: str) -> Dict[str, Any]:
         """
         Analyze market conditions for target role
@@ -132,55 +264,32 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         
         # Check if we have interpreted goal
         if not context["career_goals"].get("interpreted_goal"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "No interpreted goal found. Run Goal Interpretation Agent first."
-            }
-        
-        # Prepare input (no student profile - pure market analysis)
-        input_data = {
-            "target_role": context["career_goals"]["interpreted_goal"],
-            "analysis_date": "2026-01-23"
-        }
+            return self._no_goal_error()
+        
+        # Prepare input
+        input_data = self._build_input(context)
         
         # Call LLM
         result = self._call_llm(input_data)
         
-        # Extract market analysis
-        market_analysis = result["market_analysis"]
+        return self._store_analysis(user_id, result)
+    
+    async def analyze_market_async(self, user_id: str) -> Dict[str, Any]:
+        """
+        Async variant of analyze_market, so the analysis can be awaited
+        alongside other agents on one event loop (see utils.async_client)
+        """
         
-        # Update context
-        self.context_manager.update_market_context(user_id, {
-            "target_role_analysis": market_analysis,
-            "market_trends": [
-                {
-                    "role": market_analysis["role_title"],
-                    "demand_score": market_analysis["demand_score"],
-                    "trend": market_analysis["market_trend"],
-                    "timestamp": market_analysis["last_updated"]
-                }
-            ]
-        })
-        
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "market_analyzed",
-            {
-                "role": market_analysis["role_title"],
-                "demand_score": market_analysis["demand_score"],
-                "trend": market_analysis["market_trend"]
-            }
-        )
+        context = self.context_manager.load_context(user_id)
         
-        return {
-            "agent": self.AGENT_NAME,
-            "status": "success",
-            "market_analysis": market_analysis,
-            "context_updated": True
-        }
+        if not context["career_goals"].get("interpreted_goal"):
+            return self._no_goal_error()
+        
+        input_data = self._build_input(context)
+        
+        result = await self._call_llm_async(input_data)
+        
+        return self._store_analysis(user_id, result)
 
 
 # Example usage
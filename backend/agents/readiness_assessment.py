@@ -3,13 +3,27 @@ Goal Readiness & Confidence Assessment Agent
 Generates diagnostic questions and assesses readiness for target role
 """
 
+import functools
 import json
+import logging
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import requests
+from pydantic import ValidationError
+from .. import config
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
-from ..utils.api_key_manager import get_key_manager
+from ..utils.api_key_manager import APIKeyManager, get_key_manager
+from ..utils.json_utils import dumps_compact, loads, JSONArrayItemScanner
+from ..utils.question_bank import get_question_bank, sample_questions
+from .schemas import ReadinessAssessmentResult, validate_or_repair
+from ..utils.llm_cache import cached_llm
+
+logger = logging.getLogger(__name__)
+
+# Context sections the assessment reads
+_SECTIONS = ("career_goals", "student_profile", "readiness")
+
 
 class ReadinessAssessmentAgent:
     """
@@ -25,48 +39,16 @@ class ReadinessAssessmentAgent:
         "Do NOT change the goal directly."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("ReadinessAssessmentAgent")
+    # Compact type summary; Groq JSON mode guarantees a bare JSON object
+    OUTPUT_SCHEMA = '{"readiness_assessment":{"diagnostic_questions":[{"question_number":int,"question":str,"purpose":str,"category":"technical|conceptual|practical"}],"evaluation":{"answers_evaluated":bool,"correct_count":int,"weak_areas":[str],"strong_areas":[str]},"confidence_score":float,"deviation_risk":"low|medium|high","readiness_verdict":"ready|needs_preparation|not_ready","preparation_time_estimate_weeks":int,"key_gaps":[str],"assessment_notes":str}}'
     
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
-  "readiness_assessment": {
-    "diagnostic_questions": [
-      {
-        "question_number": 1,
-        "question": "Question text here",
-        "purpose": "What this question tests",
-        "category": "technical/conceptual/practical"
-      }
-    ],
-    "evaluation": {
-      "answers_evaluated": true/false,
-      "correct_count": 0,
-      "weak_areas": ["area1", "area2"],
-      "strong_areas": ["area1", "area2"]
-    },
-    "confidence_score": 0.65,
-    "deviation_risk": "low/medium/high",
-    "readiness_verdict": "ready/needs_preparation/not_ready",
-    "preparation_time_estimate_weeks": 8,
-    "key_gaps": ["gap1", "gap2"],
-    "assessment_notes": "Overall assessment summary"
-  }
-}"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Calculate confidence score (0.0-1.0) based on profile and target role
@@ -74,15 +56,18 @@ RESPONSIBILITIES:
 - Identify specific weak areas that need work
 - Do NOT change or suggest different goals
 
-{f'''QUESTION GENERATION (ONLY IF GENERATE_QUESTIONS = true):
+QUESTION GENERATION (ONLY IF OPERATION = generate or both):
 - Generate EXACTLY 5 diagnostic questions relevant to the target role
 - Questions should test: technical knowledge, conceptual understanding, practical awareness
-''' if input_data.get('generate_questions') else ''}
+- Do not repeat existing_questions
+- Otherwise return an empty diagnostic_questions list
 
-{f'''ANSWER EVALUATION (IF ANSWERS PROVIDED):
-- Evaluate answers objectively
+ANSWER EVALUATION (ONLY IF OPERATION = evaluate or both):
+- Evaluate answers_provided against answered_questions (same order) objectively
 - Calculate accuracy of responses
-''' if input_data.get('answers_provided') else ''}
+- Otherwise set evaluation.answers_evaluated to false
+
+OPERATION = both: evaluate the answers first, then aim the new questions at the weak areas found.
 
 CONFIDENCE SCORE CALCULATION:
 - 0.8-1.0: Strong match, ready to start
@@ -97,55 +82,108 @@ DEVIATION RISK FACTORS:
 - Strong foundation = lower risk
 - Relevant experience = lower risk
 
-OUTPUT_SCHEMA:
-{output_schema}
+OUTPUT_SCHEMA (a|b = one of the values; scores are floats 0.0-1.0):
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+    
+    @functools.cached_property
+    def key_manager(self) -> APIKeyManager:
+        """Shared key manager, resolved on first use; keys are picked per call"""
+        return get_key_manager()
+    
+    def _build_messages(self, input_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Static system prompt + compact INPUT_JSON user message"""
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+    
+    # Same input -> same response (UI retries, page refreshes, re-runs)
+    @cached_llm(maxsize=128, ttl=24 * 3600)
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.4,
-                max_tokens=2000
-            )
+            while True:
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0.4,
+                    max_tokens=config.MAX_TOKENS_BY_OP[f"readiness_{input_data['operation']}"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                try:
+                    return validate_or_repair(ReadinessAssessmentResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception as e:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
+            raise
+    
+    @cached_llm(cache=_call_llm.cache)
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
+        try:
+            while True:
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0.4,
+                    max_tokens=config.MAX_TOKENS_BY_OP[f"readiness_{input_data['operation']}"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                try:
+                    return validate_or_repair(ReadinessAssessmentResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
         except Exception as e:
-            print(f"LLM call error: {e}")
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
             raise
     
-    def assess_readiness(self,
-                        user_id: str,
-                        answers: List[str] = None,
-                        generate_questions: bool = False) -> Dict[str, Any]:
+    def _build_input(self,
+                     user_id: str,
+                     context: Dict[str, Any],
+                     answers: Optional[List[str]],
+                     generate_questions: bool) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
         """
-        Generate diagnostic questions or evaluate answers
+        Collect the context slice the assessment needs
         
-        Args:
-            user_id: User identifier
-            answers: Optional list of answers to diagnostic questions
-            generate_questions: Whether to generate questions (default: False)
-                               Set to True only during action completion phase
-            
         Returns:
-            Assessment with questions and/or evaluation
+            (input_data, None), or (None, error response) when there is no goal
         """
         
-        # Load context
-        context = self.context_manager.load_context(user_id)
-        
         # Check if we have interpreted goal
         interpreted_goal = context.get("career_goals", {}).get("interpreted_goal")
         if not interpreted_goal:
-            print(f"⚠️ Warning: No interpreted goal found for {user_id}. Using current goal instead.")
+            logger.warning("interpreted_goal_missing", extra={"user_id": user_id})
             current_goal = context.get("career_goals", {}).get("current_goal")
             if not current_goal:
-                return {
+                return None, {
                     "agent": self.AGENT_NAME,
                     "status": "error",
                     "message": "No goal found. Run Goal Interpretation Agent first.",
@@ -159,32 +197,107 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
                 }
             interpreted_goal = current_goal
         
-        # Prepare input
+        stored_questions = context["readiness"].get("diagnostic_questions", [])
         input_data = {
+            "operation": self._operation(answers, generate_questions),
             "target_role": interpreted_goal if isinstance(interpreted_goal, str) else interpreted_goal.get("role_title", "Unknown Role"),
-            "student_profile": context["student_profile"],
-            "existing_questions": context["readiness"].get("diagnostic_questions", []) if generate_questions else [],
-            "answers_provided": answers if answers else None,
-            "generate_questions": generate_questions
+            # Experience and skill names are enough to pitch the questions
+            "student_profile": {
+                "experience_level": context["student_profile"].get("experience_level"),
+                "technical_skills": list(context["student_profile"].get("technical_skills") or {})
+            },
+            # Recent questions suffice to avoid repeats
+            "existing_questions": stored_questions[-5:] if generate_questions else [],
+            "answered_questions": stored_questions if answers else [],
+            "answers_provided": answers if answers else None
         }
+        return input_data, None
+    
+    @staticmethod
+    def _operation(answers: Optional[List[str]], generate_questions: bool) -> str:
+        """
+        What one assessment call does: "generate" questions, "evaluate"
+        answers, "both" in a single round-trip, or just "score" the profile
+        """
+        if answers and generate_questions:
+            return "both"
+        if generate_questions:
+            return "generate"
+        if answers:
+            return "evaluate"
+        return "score"
+    
+    def _from_bank(self,
+                   context: Dict[str, Any],
+                   input_data: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+        """
+        Take the diagnostic questions from the target role's question bank,
+        when there is one, so the LLM no longer writes them: input_data's
+        operation is narrowed to "score" (or "evaluate" for answers)
         
-        # Call LLM
-        try:
-            result = self._call_llm(input_data)
-        except Exception as e:
-            print(f"❌ Error calling LLM in readiness assessment: {e}")
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": f"LLM error: {str(e)}",
-                "readiness_assessment": {
-                    "readiness_verdict": "needs_preparation",
-                    "confidence_score": 0.5,
-                    "deviation_risk": "medium",
-                    "key_gaps": ["Unable to assess due to technical error"],
-                    "assessment_notes": f"Technical error during assessment: {str(e)}"
-                }
+        Returns:
+            (questions, result): questions is None if the bank can't be used;
+            result is set when no LLM call is needed at all (questions only,
+            for a profile that has already been scored)
+        """
+        if input_data["operation"] not in ("generate", "both"):
+            return None, None
+        
+        bank = get_question_bank(input_data["target_role"])
+        if bank is None:
+            return None, None
+        
+        readiness = context["readiness"]
+        asked = [
+            question.get("question")
+            for question in readiness.get("diagnostic_questions", [])
+            if isinstance(question, dict)
+        ]
+        questions = sample_questions(bank, 5, asked)
+        if len(questions) < 5:
+            return None, None  # Student has seen most of the bank; let the LLM write new ones
+        
+        input_data["operation"] = "evaluate" if input_data["operation"] == "both" else "score"
+        input_data["existing_questions"] = []
+        
+        if input_data["operation"] == "evaluate" or not readiness.get("readiness_verdict"):
+            return questions, None
+        
+        # Keep the current scores; only the questions change
+        return questions, {
+            "readiness_assessment": {
+                "diagnostic_questions": questions,
+                "evaluation": {"answers_evaluated": False},
+                "confidence_score": readiness.get("confidence_score", 0.0),
+                "deviation_risk": readiness.get("deviation_risk") or "medium",
+                "readiness_verdict": readiness["readiness_verdict"],
+                "key_gaps": readiness.get("weak_areas", []),
+                "assessment_notes": f"Questions drawn from the {bank['role_title']} question bank"
+            }
+        }
+    
+    def _llm_error(self, e: Exception) -> Dict[str, Any]:
+        """Neutral assessment returned when the LLM call fails"""
+        logger.error("readiness_llm_failed: %s", e, extra={"agent": self.AGENT_NAME})
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "error",
+            "message": f"LLM error: {str(e)}",
+            "readiness_assessment": {
+                "readiness_verdict": "needs_preparation",
+                "confidence_score": 0.5,
+                "deviation_risk": "medium",
+                "key_gaps": ["Unable to assess due to technical error"],
+                "assessment_notes": f"Technical error during assessment: {str(e)}"
             }
+        }
+    
+    def _store_assessment(self,
+                          user_id: str,
+                          result: Dict[str, Any],
+                          answers: Optional[List[str]],
+                          generate_questions: bool) -> Dict[str, Any]:
+        """Persist the assessment and build the agent response"""
         
         # Extract assessment
         assessment = result["readiness_assessment"]
@@ -204,21 +317,21 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
         if answers:
             readiness_update["diagnostic_answers"] = answers
         
-        self.context_manager.update_readiness(user_id, readiness_update)
-        print(f"✓ Readiness assessment saved to context for {user_id}")
-        
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "readiness_assessed" if answers else "readiness_scored",
-            {
-                "confidence_score": assessment["confidence_score"],
-                "readiness": assessment["readiness_verdict"],
-                "answers_evaluated": bool(answers),
-                "questions_generated": generate_questions
+        # Readiness update and interaction log in a single write
+        self.context_manager.apply_updates(user_id, {
+            "readiness": readiness_update,
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "readiness_assessed" if answers else "readiness_scored",
+                "details": {
+                    "confidence_score": assessment["confidence_score"],
+                    "readiness": assessment["readiness_verdict"],
+                    "answers_evaluated": bool(answers),
+                    "questions_generated": generate_questions
+                }
             }
-        )
+        })
+        logger.info("readiness_saved", extra={"user_id": user_id, "confidence": assessment["confidence_score"]})
         
         return {
             "agent": self.AGENT_NAME,
@@ -226,7 +339,121 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             "readiness_assessment": assessment,
             "context_updated": True
         }
+    
+    def assess_readiness(self,
+                        user_id: str,
+                        answers: List[str] = None,
+                        generate_questions: bool = False) -> Dict[str, Any]:
+        """
+        Generate diagnostic questions or evaluate answers
+        
+        Passing answers together with generate_questions=True evaluates the
+        answers and generates the next set of questions in one LLM call.
+        
+        Args:
+            user_id: User identifier
+            answers: Optional list of answers to diagnostic questions
+            generate_questions: Whether to generate questions (default: False)
+                               Set to True only during action completion phase
+            
+        Returns:
+            Assessment with questions and/or evaluation
+        """
+        
+        # Load only the sections the assessment reads
+        context = self.context_manager.get_sections(user_id, *_SECTIONS)
+        
+        # Prepare input
+        input_data, error = self._build_input(user_id, context, answers, generate_questions)
+        if error:
+            return error
+        
+        # Common roles take their questions from a pre-built bank
+        questions, result = self._from_bank(context, input_data)
+        
+        # Call LLM
+        if result is None:
+            try:
+                result = self._call_llm(input_data)
+            except Exception as e:
+                return self._llm_error(e)
+        
+        if questions is not None:
+            result["readiness_assessment"]["diagnostic_questions"] = questions
+        
+        return self._store_assessment(user_id, result, answers, generate_questions)
+    
+    async def assess_readiness_async(self,
+                                     user_id: str,
+                                     answers: List[str] = None,
+                                     generate_questions: bool = False) -> Dict[str, Any]:
+        """
+        Async variant of assess_readiness, so the assessment can be awaited
+        alongside other agents on one event loop (see utils.async_client)
+        """
+        
+        context = self.context_manager.get_sections(user_id, *_SECTIONS)
+        
+        input_data, error = self._build_input(user_id, context, answers, generate_questions)
+        if error:
+            return error
+        
+        questions, result = self._from_bank(context, input_data)
+        
+        if result is None:
+            try:
+                result = await self._call_llm_async(input_data)
+            except Exception as e:
+                return self._llm_error(e)
+        
+        if questions is not None:
+            result["readiness_assessment"]["diagnostic_questions"] = questions
+        
+        return self._store_assessment(user_id, result, answers, generate_questions)
 
+    
+    def stream_diagnostic_questions(self, user_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Generate diagnostic questions, yielding each one as soon as it has
+        streamed in (for UIs that show questions progressively). Once the
+        stream ends the full assessment is stored, exactly as
+        assess_readiness(user_id, generate_questions=True) would.
+        
+        Args:
+            user_id: User identifier
+            
+        Yields:
+            Diagnostic question dicts
+        """
+        
+        context = self.context_manager.get_sections(user_id, *_SECTIONS)
+        
+        input_data, error = self._build_input(user_id, context, None, True)
+        if error:
+            return
+        
+        questions, result = self._from_bank(context, input_data)
+        if questions is not None:
+            yield from questions
+            if result is None:
+                result = self._call_llm(input_data)
+            result["readiness_assessment"]["diagnostic_questions"] = questions
+            self._store_assessment(user_id, result, None, True)
+            return
+        
+        scanner = JSONArrayItemScanner("diagnostic_questions")
+        for delta in APIClient.stream_groq_api(
+            api_key=self.key_manager.acquire_least_loaded(),
+            model=config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL),
+            messages=self._build_messages(input_data),
+            temperature=0.4,
+            max_tokens=config.MAX_TOKENS_BY_OP["readiness_generate"]
+        ):
+            for question in scanner.feed(delta):
+                yield loads(question)
+        
+        result = validate_or_repair(ReadinessAssessmentResult, scanner.text)
+        self._store_assessment(user_id, result, None, True)
 
 # Example usage
 if __name__ == "__main__":
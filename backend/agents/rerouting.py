@@ -3,14 +3,73 @@ Re-Routing & Failure Detection Agent
 Detects path failures and proposes alternative routes
 """
 
+import functools
 import json
+import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 import requests
+from pydantic import ValidationError
 from datetime import datetime
+from .. import config
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
-from ..utils.api_key_manager import get_key_manager
+from ..utils.api_key_manager import APIKeyManager, get_key_manager
+from ..utils.json_utils import dumps_compact
+from .schemas import ReroutingAnalysisResult, validate_or_repair
+from ..utils.llm_cache import cached_llm
+
+
+logger = logging.getLogger(__name__)
+
+# Context sections the reroute analysis reads
+_SECTIONS = ("active_path", "student_profile", "progress", "readiness", "market_context", "reroute_history")
+
+
+def _first(items: Any, n: int) -> Any:
+    """First n entries of a list or dict (other values pass through)"""
+    if isinstance(items, dict):
+        return dict(list(items.items())[:n])
+    if isinstance(items, list):
+        return items[:n]
+    return items
+
+
+def _project_for_reroute(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deterministic summary of the context for the reroute prompt: the current
+    path, failure signals and a few top skills instead of every full section,
+    which grow with each completed step and reroute
+    """
+    active_path = context["active_path"]
+    profile = context["student_profile"]
+    progress = context["progress"]
+    readiness = context["readiness"]
+    market = context["market_context"].get("target_role_analysis") or {}
+    reroute_history = context["reroute_history"]
+    
+    return {
+        "role": active_path.get("target_role"),
+        "status": active_path.get("status"),
+        "success_probability": active_path.get("success_probability"),
+        "completion_rate": progress.get("completion_rate", 0.0),
+        "blockers_top3": progress.get("blockers", [])[-3:],
+        "experience_level": profile.get("experience_level"),
+        "top_skills": _first(profile.get("technical_skills") or {}, 5),
+        "strength_areas": _first(profile.get("strength_areas") or [], 3),
+        "weakness_areas": _first(profile.get("weakness_areas") or [], 3),
+        "readiness": {
+            "confidence_score": readiness.get("confidence_score"),
+            "deviation_risk": readiness.get("deviation_risk"),
+            "readiness_verdict": readiness.get("readiness_verdict")
+        },
+        "market": {
+            key: market.get(key)
+            for key in ("demand_score", "competition_level", "market_trend")
+        } if isinstance(market, dict) else None,
+        "reroute_count": reroute_history.get("reroute_count", 0),
+        "last_reroutes": reroute_history.get("failed_paths", [])[-2:]
+    }
 
 
 class ReroutingAgent:
@@ -26,53 +85,16 @@ class ReroutingAgent:
         "Preserve past progress where possible."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """Initialize agent"""
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("ReroutingAgent")
+    # Compact type summary; Groq JSON mode guarantees a bare JSON object
+    OUTPUT_SCHEMA = '{"reroute_analysis":{"failure_detected":bool,"failure_type":"skill_gap|time_constraint|motivation_loss|market_changed|unrealistic_expectations","failure_reasons":[str],"progress_salvageable":bool,"salvageable_skills":[str],"recommended_action":"adjust_timeline|change_path|take_break|seek_mentor","alternative_paths":[{"new_target_role":str,"why_better_fit":str,"leverages_existing_progress":bool,"existing_skills_applicable":[str],"additional_skills_needed":[str],"success_probability":float,"estimated_duration_months":int}],"adjusted_original_path":{"keep_original_goal":bool,"modifications":[str],"extended_timeline_months":int,"additional_support_needed":[str]},"confidence_in_recommendation":float,"next_steps":[str]}}'
     
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
-  "reroute_analysis": {
-    "failure_detected": true,
-    "failure_type": "skill_gap/time_constraint/motivation_loss/market_changed",
-    "failure_reasons": ["reason1", "reason2"],
-    "progress_salvageable": true,
-    "salvageable_skills": ["skill1", "skill2"],
-    "recommended_action": "adjust_timeline/change_path/take_break/seek_mentor",
-    "alternative_paths": [
-      {
-        "new_target_role": "Alternative Role",
-        "why_better_fit": "Explanation",
-        "leverages_existing_progress": true,
-        "existing_skills_applicable": ["skill1", "skill2"],
-        "additional_skills_needed": ["skill3", "skill4"],
-        "success_probability": 0.75,
-        "estimated_duration_months": 6
-      }
-    ],
-    "adjusted_original_path": {
-      "keep_original_goal": true,
-      "modifications": ["change1", "change2"],
-      "extended_timeline_months": 16,
-      "additional_support_needed": ["support1", "support2"]
-    },
-    "confidence_in_recommendation": 0.80,
-    "next_steps": ["step1", "step2", "step3"]
-  }
-}"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
-
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
-
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
+
+AGENT_NAME: {AGENT_NAME}
+
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Detect if student is deviating from path or repeatedly failing
@@ -101,29 +123,149 @@ ALTERNATIVE PATH CRITERIA:
 - Should leverage existing skills/progress
 - Must be market-viable
 - Should align with student's strengths
+- Propose at most 3 alternative paths
 
-OUTPUT_SCHEMA:
-{output_schema}
+OUTPUT_SCHEMA (a|b = one of the values; scores are floats 0.0-1.0):
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """Initialize agent"""
+        self.context_manager = context_manager
+    
+    @functools.cached_property
+    def key_manager(self) -> APIKeyManager:
+        """Shared key manager, resolved on first use; keys are picked per call"""
+        return get_key_manager()
+    
+    def _build_messages(self, input_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Static system prompt + compact INPUT_JSON user message"""
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+    
+    # Same input -> same response (UI retries, page refreshes, re-runs)
+    @cached_llm(maxsize=64, ttl=24 * 3600)
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.5,
-                max_tokens=3000
-            )
+            while True:
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0.5,
+                    max_tokens=config.MAX_TOKENS_BY_OP["rerouting"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                try:
+                    return validate_or_repair(ReroutingAnalysisResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception as e:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
+            raise
+    
+    @cached_llm(cache=_call_llm.cache)
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
+        try:
+            while True:
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0.5,
+                    max_tokens=config.MAX_TOKENS_BY_OP["rerouting"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                try:
+                    return validate_or_repair(ReroutingAnalysisResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
         except Exception as e:
-            print(f"LLM call error: {e}")
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
             raise
     
+    def _no_path_error(self) -> Dict[str, Any]:
+        """Error returned when there is no active path to reroute"""
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "error",
+            "message": "No active path found. Nothing to reroute."
+        }
+    
+    def _build_input(self, context: Dict[str, Any], failure_evidence: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Collect the context summary the reroute analysis needs"""
+        return {
+            "current_path": _project_for_reroute(context),
+            "failure_evidence": failure_evidence or {
+                "blockers_count": len(context["progress"].get("blockers", [])),
+                "completion_rate": context["progress"].get("completion_rate", 0.0),
+                "time_spent": context["progress"].get("time_spent_hours", 0)
+            }
+        }
+    
+    def _store_reroute(self, user_id: str, context: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the reroute, fail the active path and build the agent response"""
+        
+        # Extract reroute analysis
+        reroute_analysis = result["reroute_analysis"]
+        
+        # Reroute event, failed path status and interaction log in a single write
+        self.context_manager.apply_updates(user_id, {
+            "reroute": {
+                "failed_path": {
+                    "path_id": context["active_path"]["path_id"],
+                    "target_role": context["active_path"]["target_role"],
+                    "failure_type": reroute_analysis["failure_type"],
+                    "timestamp": datetime.now().isoformat()
+                },
+                "reason": reroute_analysis["failure_reasons"],
+                "alternatives": reroute_analysis["alternative_paths"]
+            },
+            "active_path": {
+                "status": "failed"
+            },
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "reroute_performed",
+                "details": {
+                    "failure_type": reroute_analysis["failure_type"],
+                    "alternatives_count": len(reroute_analysis["alternative_paths"]),
+                    "reroute_number": context["reroute_history"]["reroute_count"] + 1
+                }
+            }
+        })
+        
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "reroute_analysis": reroute_analysis,
+            "context_updated": True
+        }
+    
     def detect_and_reroute(self,
                           user_id: str,
                           failure_evidence: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -139,73 +281,39 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             Rerouting analysis with alternatives
         """
         
-        # Load context
-        context = self.context_manager.load_context(user_id)
+        # Load only the sections the analysis reads
+        context = self.context_manager.get_sections(user_id, *_SECTIONS)
         
         # Check if there's an active path
         if not context["active_path"].get("path_id"):
-            return {
-                "agent": self.AGENT_NAME,
-                "status": "error",
-                "message": "No active path found. Nothing to reroute."
-            }
+            return self._no_path_error()
         
         # Prepare input
-        input_data = {
-            "current_path": context["active_path"],
-            "student_profile": context["student_profile"],
-            "progress": context["progress"],
-            "readiness": context["readiness"],
-            "market_context": context["market_context"],
-            "reroute_history": context["reroute_history"],
-            "failure_evidence": failure_evidence or {
-                "blockers_count": len(context["progress"].get("blockers", [])),
-                "completion_rate": context["progress"].get("completion_rate", 0.0),
-                "time_spent": context["progress"].get("time_spent_hours", 0)
-            }
-        }
+        input_data = self._build_input(context, failure_evidence)
         
         # Call LLM
         result = self._call_llm(input_data)
         
-        # Extract reroute analysis
-        reroute_analysis = result["reroute_analysis"]
+        return self._store_reroute(user_id, context, result)
+    
+    async def detect_and_reroute_async(self,
+                                       user_id: str,
+                                       failure_evidence: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async variant of detect_and_reroute, so the analysis can be awaited
+        alongside other agents on one event loop (see utils.async_client)
+        """
         
-        # Update context with reroute event
-        self.context_manager.record_reroute(user_id, {
-            "failed_path": {
-                "path_id": context["active_path"]["path_id"],
-                "target_role": context["active_path"]["target_role"],
-                "failure_type": reroute_analysis["failure_type"],
-                "timestamp": datetime.now().isoformat()
-            },
-            "reason": reroute_analysis["failure_reasons"],
-            "alternatives": reroute_analysis["alternative_paths"]
-        })
+        context = self.context_manager.get_sections(user_id, *_SECTIONS)
         
-        # Update active path status
-        self.context_manager.update_active_path(user_id, {
-            "status": "failed"
-        })
+        if not context["active_path"].get("path_id"):
+            return self._no_path_error()
         
-        # Log interaction
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "reroute_performed",
-            {
-                "failure_type": reroute_analysis["failure_type"],
-                "alternatives_count": len(reroute_analysis["alternative_paths"]),
-                "reroute_number": context["reroute_history"]["reroute_count"] + 1
-            }
-        )
+        input_data = self._build_input(context, failure_evidence)
         
-        return {
-            "agent": self.AGENT_NAME,
-            "status": "success",
-            "reroute_analysis": reroute_analysis,
-            "context_updated": True
-        }
+        result = await self._call_llm_async(input_data)
+        
+        return self._store_reroute(user_id, context, result)
 
 
 # Example usage
@@ -0,0 +1,195 @@
+"""
+Typed models for agent LLM output
+Validated and coerced in one pass by pydantic's compiled core
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Type, Union
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from ..utils.json_utils import repair_json
+
+
+class _LLMModel(BaseModel):
+    """Base for LLM output: unknown keys are kept so callers see the full response"""
+    model_config = ConfigDict(extra="allow")
+
+
+class InterpretedGoal(_LLMModel):
+    role_title: str
+    role_category: str = ""
+    role_description: str = ""
+    required_skills: List[str] = Field(default_factory=list)
+    typical_requirements: List[str] = Field(default_factory=list)
+    typical_responsibilities: List[str] = Field(default_factory=list)
+    goal_clarity_score: float = Field(ge=0, le=1)
+    commitment_level: str
+    time_to_competency_months: Union[int, float] = 6
+    interpretation_notes: str = ""
+
+
+class InterpretedGoalResult(_LLMModel):
+    interpreted_goal: InterpretedGoal
+
+
+class MarketAnalysis(_LLMModel):
+    role_title: str
+    demand_score: Union[int, float] = Field(ge=0, le=100)
+    competition_level: str = "medium"
+    entry_barrier: str = "medium"
+    market_trend: str
+    in_demand_skills: List[str] = Field(default_factory=list)
+    adjacent_safer_roles: List[Dict[str, Any]] = Field(default_factory=list)
+    market_notes: str = ""
+    last_updated: str = Field(default_factory=lambda: date.today().isoformat())
+
+
+class MarketAnalysisResult(_LLMModel):
+    market_analysis: MarketAnalysis
+
+
+class FeedbackAnalysis(_LLMModel):
+    overall_progress_rating: str
+    progress_percentage: Union[int, float] = Field(ge=0, le=100)
+    velocity_assessment: str
+    confidence_adjustment: float = 0.0
+    updated_confidence_score: float = Field(ge=0, le=1)
+    risk_adjustment: str = "stable"
+    updated_deviation_risk: str
+    strengths_observed: List[str] = Field(default_factory=list)
+    areas_of_concern: List[str] = Field(default_factory=list)
+    learning_insights: List[Dict[str, Any]] = Field(default_factory=list)
+    action_effectiveness: List[Dict[str, Any]] = Field(default_factory=list)
+    recommended_adjustments: List[Dict[str, Any]] = Field(default_factory=list)
+    encouragement_message: str = ""
+
+
+class FeedbackAnalysisResult(_LLMModel):
+    feedback_analysis: FeedbackAnalysis
+
+
+class ReadinessAssessment(_LLMModel):
+    diagnostic_questions: List[Dict[str, Any]] = Field(default_factory=list)
+    evaluation: Dict[str, Any] = Field(default_factory=dict)
+    confidence_score: float = Field(ge=0, le=1)
+    deviation_risk: str
+    readiness_verdict: str
+    preparation_time_estimate_weeks: Union[int, float, None] = None
+    key_gaps: List[str] = Field(default_factory=list)
+    assessment_notes: str = ""
+
+
+class ReadinessAssessmentResult(_LLMModel):
+    readiness_assessment: ReadinessAssessment
+
+
+class ReroutingAnalysis(_LLMModel):
+    failure_detected: bool = True
+    failure_type: str
+    failure_reasons: List[str]
+    progress_salvageable: bool = True
+    salvageable_skills: List[str] = Field(default_factory=list)
+    recommended_action: str = ""
+    alternative_paths: List[Dict[str, Any]] = Field(default_factory=list)
+    adjusted_original_path: Dict[str, Any] = Field(default_factory=dict)
+    confidence_in_recommendation: float = Field(default=0.5, ge=0, le=1)
+    next_steps: List[str] = Field(default_factory=list)
+
+
+class ReroutingAnalysisResult(_LLMModel):
+    reroute_analysis: ReroutingAnalysis
+
+
+class StudentProfile(_LLMModel):
+    experience_level: str
+    technical_skills: Dict[str, Any] = Field(default_factory=dict)
+    soft_skills: List[str] = Field(default_factory=list)
+    strength_areas: List[str] = Field(default_factory=list)
+    weakness_areas: List[str] = Field(default_factory=list)
+    learning_capacity: Optional[str] = None
+    risk_factors: List[str] = Field(default_factory=list)
+    profile_confidence: float = Field(default=0.0, ge=0, le=1)
+
+
+class StudentProfileResult(_LLMModel):
+    student_profile: StudentProfile
+
+
+class RoadmapAction(_LLMModel):
+    action_id: str
+    title: str
+    description: str = ""
+    success_criteria: str = ""
+
+
+class RoadmapStep(_LLMModel):
+    step_number: int
+    title: str
+    description: str = ""
+    actions: List[RoadmapAction] = Field(default_factory=list)
+
+
+class Roadmap(_LLMModel):
+    total_steps: Optional[int] = None
+    steps: List[RoadmapStep] = Field(min_length=1)
+
+
+class RoadmapResult(_LLMModel):
+    roadmap: Roadmap
+
+
+def validate_or_repair(model: Type[BaseModel], content: str) -> Dict[str, Any]:
+    """
+    Validate LLM output against model; on failure, retry once on a locally
+    repaired copy (see json_utils.repair_json) before giving up
+    
+    Returns:
+        Validated output as a plain dict, without defaults for fields the
+        model left out (so partial updates don't overwrite stored values)
+        
+    Raises:
+        ValidationError: If neither the raw nor the repaired text validates
+    """
+    try:
+        return model.model_validate_json(content).model_dump(exclude_unset=True)
+    except ValidationError:
+        repaired = repair_json(content)
+        if repaired is None or repaired == content:
+            raise
+    return model.model_validate_json(repaired).model_dump(exclude_unset=True)
+
+
+def repair_messages(
+    messages: List[Dict[str, str]],
+    content: str,
+    error: ValidationError,
+    schema: str
+) -> List[Dict[str, str]]:
+    """
+    Build a follow-up conversation asking the model to fix its own output
+
+    Args:
+        messages: Messages of the original call
+        content: The rejected response text
+        error: Validation error raised for that response
+        schema: JSON schema text the response must match
+
+    Returns:
+        Messages for a single re-prompt
+    """
+    problems = "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or '<root>'}: {err['msg']}"
+        for err in error.errors()[:10]
+    )
+    return messages + [
+        {"role": "assistant", "content": content},
+        {
+            "role": "user",
+            "content": (
+                f"Your JSON failed validation ({problems}). "
+                f"Fix the JSON to match this schema:\n{schema}\n"
+                "Return ONLY the corrected JSON."
+            )
+        }
+    ]
@@ -3,13 +3,22 @@ Student Profiling Agent
 Analyzes student background to create comprehensive profile
 """
 
-import json
+import functools
+import logging
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import requests
+from pydantic import ValidationError
+from .. import config
 from ..user_context import UserContextManager
 from ..utils.api_client import APIClient
-from ..utils.api_key_manager import get_key_manager
+from ..utils.api_key_manager import APIKeyManager, get_key_manager
+from ..utils.json_utils import dumps_compact
+from .schemas import StudentProfileResult, validate_or_repair
+from ..utils.llm_cache import cached_llm
+
+
+logger = logging.getLogger(__name__)
 
 
 class StudentProfilingAgent:
@@ -25,46 +34,16 @@ class StudentProfilingAgent:
         "Do NOT suggest careers or actions."
     )
     
-    def __init__(self, context_manager: UserContextManager):
-        """
-        Initialize agent
-        
-        Args:
-            context_manager: User context manager instance
-        """
-        self.context_manager = context_manager
-        key_manager = get_key_manager()
-        self.api_key = key_manager.get_key_for_agent("StudentProfilingAgent")
+    # Compact type summary; Groq JSON mode guarantees a bare JSON object
+    OUTPUT_SCHEMA = '{"student_profile":{"experience_level":"beginner|intermediate|advanced","technical_skills":{"programming":[str],"web_development":[str],"data_science":[str],"tools":[str]},"soft_skills":[str],"strength_areas":[str],"weakness_areas":[str],"learning_capacity":"slow|moderate|fast","risk_factors":[str],"profile_confidence":float}}'
     
-    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Call Groq LLM with agent-specific prompt"""
-        
-        output_schema = """{
-  "student_profile": {
-    "experience_level": "beginner/intermediate/advanced",
-    "technical_skills": {
-      "programming": ["skill1", "skill2"],
-      "web_development": ["skill1", "skill2"],
-      "data_science": ["skill1", "skill2"],
-      "tools": ["tool1", "tool2"]
-    },
-    "soft_skills": ["communication", "problem_solving"],
-    "strength_areas": ["area1", "area2"],
-    "weakness_areas": ["area1", "area2"],
-    "learning_capacity": "slow/moderate/fast",
-    "risk_factors": ["risk1", "risk2"],
-    "profile_confidence": 0.0
-  }
-}"""
-        
-        system_prompt = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
-
-AGENT_NAME: {self.AGENT_NAME}
+    # Static prompt prefix, built once at class load so every call sends a
+    # byte-identical system message; only INPUT_JSON changes between calls
+    SYSTEM_PROMPT = f"""You are an autonomous agent operating inside an Agentic AI-Powered Career Navigation System.
 
-AGENT_OBJECTIVE: {self.AGENT_OBJECTIVE}
+AGENT_NAME: {AGENT_NAME}
 
-INPUT_JSON:
-{json.dumps(input_data, indent=2)}
+AGENT_OBJECTIVE: {AGENT_OBJECTIVE}
 
 RESPONSIBILITIES:
 - Analyze academic, aptitude, skill, engagement, and experience features
@@ -73,28 +52,154 @@ RESPONSIBILITIES:
 - Do NOT suggest careers or actions
 - Focus on factual analysis only
 
-OUTPUT_SCHEMA:
-{output_schema}
+OUTPUT_SCHEMA (a|b = one of the values; scores are floats 0.0-1.0):
+{OUTPUT_SCHEMA}
 
 Return ONLY valid JSON matching the schema. No markdown, no explanations."""
-
+    
+    def __init__(self, context_manager: UserContextManager):
+        """
+        Initialize agent
+        
+        Args:
+            context_manager: User context manager instance
+        """
+        self.context_manager = context_manager
+    
+    @functools.cached_property
+    def key_manager(self) -> APIKeyManager:
+        """Shared key manager, resolved on first use; keys are picked per call"""
+        return get_key_manager()
+    
+    def _build_messages(self, input_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Static system prompt + compact INPUT_JSON user message"""
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": f"INPUT_JSON:\n{dumps_compact(input_data)}"}
+        ]
+    
+    # Same input -> same response (UI retries, page refreshes, re-runs)
+    @cached_llm(maxsize=128, ttl=24 * 3600)
+    def _call_llm(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Call Groq LLM with agent-specific prompt"""
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
         try:
-            result = APIClient.call_groq_api(
-                api_key=self.api_key,
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "system", "content": system_prompt}],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            while True:
+                # Streamed; returns as soon as the JSON object is complete
+                content = APIClient.call_groq_json(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0,
+                    max_tokens=config.MAX_TOKENS_BY_OP["profiling"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                try:
+                    return validate_or_repair(StudentProfileResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
-            content = result["choices"][0]["message"]["content"]
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+        except Exception as e:
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
+            raise
+    
+    @cached_llm(cache=_call_llm.cache)
+    async def _call_llm_async(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _call_llm for concurrent fan-out"""
+        from ..utils.async_client import call_groq_async
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
+        try:
+            while True:
+                result = await call_groq_async(
+                    api_key=self.key_manager.acquire_least_loaded(),
+                    model=model,
+                    messages=self._build_messages(input_data),
+                    temperature=0,
+                    max_tokens=config.MAX_TOKENS_BY_OP["profiling"],
+                    response_format=APIClient.JSON_MODE
+                )
+                
+                content = result["choices"][0]["message"]["content"]
+                try:
+                    return validate_or_repair(StudentProfileResult, content)
+                except ValidationError:
+                    if model == config.LLM_MODEL:
+                        raise
+                    # Smaller tier broke the schema; retry on the default model
+                    model = config.LLM_MODEL
             
         except Exception as e:
-            print(f"LLM call error: {e}")
+            logger.exception("llm_call_failed", extra={"agent": self.AGENT_NAME, "model": model})
             raise
     
+    def _build_input(self,
+                     context: Dict[str, Any],
+                     skills_text: str = None,
+                     education: str = None,
+                     experience: str = None,
+                     projects: list = None,
+                     resume_text: str = None) -> Dict[str, Any]:
+        """Combine the new background input with the existing profile"""
+        return {
+            "new_input": {
+                "skills_text": skills_text,
+                "education": education,
+                "experience": experience,
+                "projects": projects or [],
+                "resume_text": resume_text
+            },
+            "existing_profile": context["student_profile"]
+        }
+    
+    def _store_profile(self,
+                       user_id: str,
+                       existing_profile: Dict[str, Any],
+                       result: Dict[str, Any],
+                       education: str = None,
+                       experience: str = None,
+                       projects: list = None) -> Dict[str, Any]:
+        """Persist the analyzed profile and build the agent response"""
+        
+        student_profile = result["student_profile"]
+        
+        # Background fields go in the same update as the analyzed profile
+        profile_update = dict(student_profile)
+        if education:
+            personal_info = existing_profile.get("personal_info") or {}
+            profile_update["personal_info"] = {**personal_info, "education": education}
+        if experience:
+            profile_update["experience"] = experience
+        if projects:
+            profile_update["projects"] = projects
+        
+        # Profile and interaction log in a single write
+        self.context_manager.apply_updates(user_id, {
+            "student_profile": profile_update,
+            "agent_interaction": {
+                "agent_name": self.AGENT_NAME,
+                "event_type": "profile_analyzed",
+                "details": {
+                    "experience_level": student_profile.get("experience_level"),
+                    "skills_count": len(student_profile.get("technical_skills", {}))
+                }
+            }
+        })
+        
+        return {
+            "agent": self.AGENT_NAME,
+            "status": "success",
+            "student_profile": student_profile,
+            "context_updated": True
+        }
+    
     def analyze_profile(self, 
                        user_id: str,
                        skills_text: str = None,
@@ -117,55 +222,98 @@ Return ONLY valid JSON matching the schema. No markdown, no explanations."""
             Analysis result with student profile
         """
         
-        context = self.context_manager.load_context(user_id)
+        context = self.context_manager.get_sections(user_id, "student_profile")
         
-        input_data = {
-            "new_input": {
-                "skills_text": skills_text,
-                "education": education,
-                "experience": experience,
-                "projects": projects or [],
-                "resume_text": resume_text
-            },
-            "existing_profile": context["student_profile"]
-        }
+        input_data = self._build_input(context, skills_text, education, experience, projects, resume_text)
         
         result = self._call_llm(input_data)
         
-        student_profile = result["student_profile"]
+        return self._store_profile(user_id, context["student_profile"], result, education, experience, projects)
+    
+    async def analyze_profile_async(self,
+                                    user_id: str,
+                                    skills_text: str = None,
+                                    education: str = None,
+                                    experience: str = None,
+                                    projects: list = None,
+                                    resume_text: str = None) -> Dict[str, Any]:
+        """
+        Async variant of analyze_profile, so several profiles can be
+        analyzed concurrently on one event loop (see utils.async_client)
+        """
         
-        self.context_manager.update_student_profile(user_id, student_profile)
+        context = self.context_manager.get_sections(user_id, "student_profile")
         
-        if education:
-            self.context_manager.update_student_profile(user_id, {
-                "personal_info": {
-                    "education": education
-                }
-            })
+        input_data = self._build_input(context, skills_text, education, experience, projects, resume_text)
         
-        if experience:
-            self.context_manager.update_student_profile(user_id, {
-                "experience": experience
-            })
+        result = await self._call_llm_async(input_data)
         
-        if projects:
-            self.context_manager.update_student_profile(user_id, {
-                "projects": projects
-            })
-        
-        self.context_manager.log_agent_interaction(
-            user_id,
-            self.AGENT_NAME,
-            "profile_analyzed",
+        return self._store_profile(user_id, context["student_profile"], result, education, experience, projects)
+    
+    def analyze_profile_batch(self,
+                              user_inputs: List[Dict[str, Any]],
+                              poll_interval: float = 30,
+                              timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze many profiles through the Groq batch API (cohort onboarding).
+        Trades latency for throughput: the batch does not use the live rate
+        limits, so it suits background runs rather than interactive use.
+        
+        Args:
+            user_inputs: One dict per student with user_id plus the keyword
+                         arguments of analyze_profile (skills_text, education, ...)
+            poll_interval: Seconds between batch status checks
+            timeout: Optional limit on the wait for the batch, in seconds
+            
+        Returns:
+            user_id -> analyze_profile-style result
+        """
+        from ..utils.groq_batch import run_batch
+        
+        model = config.AGENT_MODEL.get(type(self).__name__, config.LLM_MODEL)
+        
+        jobs = {}
+        for user_input in user_inputs:
+            user_input = dict(user_input)
+            user_id = user_input.pop("user_id")
+            context = self.context_manager.get_sections(user_id, "student_profile")
+            jobs[user_id] = (context["student_profile"], user_input, self._build_input(context, **user_input))
+        
+        responses = run_batch(
+            self.key_manager.acquire_least_loaded(),
             {
-                "experience_level": student_profile.get("experience_level"),
-                "skills_count": len(student_profile.get("technical_skills", {}))
-            }
+                user_id: {
+                    "model": model,
+                    "messages": self._build_messages(input_data),
+                    "temperature": 0,
+                    "max_tokens": config.MAX_TOKENS_BY_OP["profiling"],
+                    "response_format": APIClient.JSON_MODE
+                }
+                for user_id, (_, _, input_data) in jobs.items()
+            },
+            poll_interval=poll_interval,
+            timeout=timeout
         )
         
-        return {
-            "agent": self.AGENT_NAME,
-            "status": "success",
-            "student_profile": student_profile,
-            "context_updated": True
-        }
+        results = {}
+        for user_id, (existing_profile, user_input, input_data) in jobs.items():
+            try:
+                response = responses[user_id]
+                if response is None:
+                    raise ValueError("no batch output")
+                result = validate_or_repair(StudentProfileResult, response["choices"][0]["message"]["content"])
+            except (ValueError, KeyError) as e:
+                # Failed or malformed batch item: redo this one profile live
+                logger.warning("batch_item_failed", extra={"user_id": user_id, "error": str(e)})
+                result = self._call_llm(input_data)
+            
+            results[user_id] = self._store_profile(
+                user_id,
+                existing_profile,
+                result,
+                user_input.get("education"),
+                user_input.get("experience"),
+                user_input.get("projects")
+            )
+        
+        return results
@@ -9,17 +9,36 @@ from pathlib import Path
 # API Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Validate API key
-if not GROQ_API_KEY:
+# Validate API key (a single key or numbered GROQ_API_KEY_1, _2, ... keys)
+if not GROQ_API_KEY and not os.getenv("GROQ_API_KEY_1"):
     raise ValueError("GROQ_API_KEY environment variable not set")
 
 # LLM Configuration
 LLM_MODEL = "llama-3.3-70b-versatile"
 LLM_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
+# Model tier per agent class; agents not listed use LLM_MODEL.
+# Structural extraction runs on the fast 8B model; reasoning-heavy agents stay
+# on 70B. Agents fall back to LLM_MODEL if the smaller model breaks the schema.
+AGENT_MODEL = {
+    "StudentProfilingAgent": "llama-3.1-8b-instant",
+    "ReadinessAssessmentAgent": LLM_MODEL,
+    "ReroutingAgent": LLM_MODEL
+}
+
+# Completion budget per operation: typical JSON output (~500-800 tokens)
+# plus headroom, instead of one 2000-3000 token cap for every call
+MAX_TOKENS_BY_OP = {
+    "readiness_generate": 900,
+    "readiness_evaluate": 600,
+    "readiness_both": 1400,
+    "readiness_score": 600,
+    "rerouting": 1500,
+    "profiling": 900
+}
+
 # Request Configuration
 REQUEST_TIMEOUT = 30
-REQUEST_THROTTLE_INTERVAL = 1.5  # seconds between requests
 REQUEST_MAX_RETRIES = 5
 REQUEST_RETRY_DELAYS = [4, 8, 16, 32, 64]  # exponential backoff in seconds
 
@@ -33,6 +52,9 @@ CONTEXT_DIR = os.path.join(
 # Create context directory if needed
 Path(CONTEXT_DIR).mkdir(exist_ok=True, parents=True)
 
+# Curated diagnostic questions per common target role (<role-slug>.json)
+QUESTION_BANK_DIR = os.path.join(os.path.dirname(__file__), "data", "question_banks")
+
 # Application Configuration
 APP_NAME = "Career Navigation System"
 APP_VERSION = "2.0"
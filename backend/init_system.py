@@ -3,15 +3,15 @@ System Initialization
 Ensures all components are properly initialized with API key and context
 """
 
-import os
+import logging
 import sys
 
+logger = logging.getLogger(__name__)
+
 def ensure_api_key():
-    """Ensure API key is set"""
-    api_key = os.getenv("GROQ_API_KEY") or "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"
-    if not api_key:
-        raise ValueError("API key not found")
-    return api_key
+    """Return the first configured API key; raises ValueError if none is set"""
+    from .utils.api_key_manager import get_key_manager
+    return get_key_manager().get_all_keys()[0]
 
 def ensure_context_directory():
     """Ensure context directory exists"""
@@ -24,23 +24,25 @@ def initialize_system():
     """Initialize entire system"""
     try:
         # 1. Verify API key
-        api_key = ensure_api_key()
-        print(f"✓ API Key verified: {api_key[:10]}...")
+        ensure_api_key()
+        logger.info("api_key_verified")
         
         # 2. Ensure context directory
         context_dir = ensure_context_directory()
-        print(f"✓ Context directory ready: {context_dir}")
+        logger.info("context_dir_ready", extra={"context_dir": context_dir})
         
         # 3. Load configuration
         from . import config
-        print(f"✓ Configuration loaded: {config.APP_NAME} v{config.APP_VERSION}")
+        logger.info("config_loaded", extra={"app": config.APP_NAME, "version": config.APP_VERSION})
         
-        print("\n✓ System initialization complete!")
+        logger.info("system_initialized")
         return True
         
     except Exception as e:
-        print(f"✗ System initialization failed: {e}")
+        logger.exception("system_init_failed")
         return False
 
 if __name__ == "__main__":
+    from .utils.logging_setup import setup_logging
+    setup_logging("INFO")
     initialize_system()
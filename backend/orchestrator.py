@@ -3,15 +3,22 @@ Orchestration Agent (Meta-Agent)
 Coordinates all agents and manages workflow
 """
 
-import json
-import os
+import asyncio
+import functools
+import logging
 import requests
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 
 from .user_context import UserContextManager
+from .utils.api_client import APIClient
 from .utils.api_key_manager import get_key_manager
+from .utils.http_session import get_groq_session
+from .utils.json_utils import JSONObjectAssembler, decode_first_json, dumps_compact, loads
+from .utils.llm_cache import LLMCache, llm_cache_key
+from .utils.semantic_cache import SemanticCache
+from .utils.rate_limiter import estimate_tokens, limiter_for_key, retry_after_seconds, backoff_delay, MAX_RETRY_DELAY
 from .agents.student_profiling import StudentProfilingAgent
 from .agents.goal_interpretation import GoalInterpretationAgent
 from .agents.readiness_assessment import ReadinessAssessmentAgent
@@ -20,6 +27,24 @@ from .agents.career_path_planning import CareerPathPlanningAgent
 from .agents.rerouting import ReroutingAgent
 from .agents.action_recommendation import ActionRecommendationAgent
 from .agents.feedback_learning import FeedbackLearningAgent
+from .agents.schemas import RoadmapResult
+
+logger = logging.getLogger(__name__)
+
+
+def _action_key(value: Any) -> str:
+    """Normalized form of an action reference (id or title) for lookups"""
+    return str(value).strip().lower()
+
+
+@functools.lru_cache(maxsize=1024)
+def _fallback_questions_for(action_title: str) -> Tuple[Dict[str, str], ...]:
+    """Generic validation questions for an action title (copy before handing out)"""
+    return (
+        {"question": f"What is the main objective of '{action_title}'?", "expected_understanding": "Student understands the goal"},
+        {"question": f"How does '{action_title}' relate to your career goal?", "expected_understanding": "Student can connect to their path"},
+        {"question": f"What did you learn from completing '{action_title}'?", "expected_understanding": "Student reflects on learning"}
+    )
 
 
 class Orchestrator:
@@ -30,6 +55,50 @@ class Orchestrator:
     
     AGENT_NAME = "Orchestration Agent (Meta-Agent)"
     
+    # Static instructions sent as the system message, so every validation call
+    # starts with a byte-identical prefix (eligible for provider-side prompt
+    # caching); only the action or the Q&A block goes in the user message
+    VALIDATION_QUESTIONS_PROMPT = """Generate 3 validation questions to test if the student has truly mastered the action described by the user.
+
+Generate exactly 3 questions that:
+1. Test conceptual understanding
+2. Test practical application
+3. Test real-world relevance
+
+Return as JSON array with fields: question, expected_understanding"""
+    
+    # Answers shorter than this count as empty when screening submissions
+    MIN_ANSWER_CHARS = 10
+    
+    # The rubric scores each answer 0-3 and passes at 6, so fewer than this
+    # many real answers can never pass
+    MIN_SUBSTANTIVE_ANSWERS = 2
+    
+    VALIDATION_RUBRIC_PROMPT = """Evaluate the student's answers to the validation questions given by the user.
+
+Score EACH answer individually (0-3 scale):
+- 0: No understanding or incorrect
+- 1: Minimal understanding
+- 2: Good understanding  
+- 3: Excellent understanding
+
+Calculate total_score by summing individual scores (0-9 scale).
+
+COMPLETION CRITERIA:
+- Total score >= 6: Action is COMPLETE - ready_to_proceed = true
+- Total score < 6: Action needs REVIEW - ready_to_proceed = false
+
+Return ONLY JSON:
+{
+  "individual_scores": [score1, score2, score3],
+  "total_score": 7,
+  "ready_to_proceed": true,
+  "areas_of_strength": ["area1", "area2"],
+  "areas_for_improvement": ["area1"],
+  "feedback": "What they did well",
+  "recommendation": "What to do next or which part to review"
+}"""
+    
     def __init__(self, context_dir: str = None):
         """
         Initialize orchestrator with all agents
@@ -43,7 +112,24 @@ class Orchestrator:
         self.key_manager = get_key_manager()
         self.api_key = self.key_manager.get_next_key()
         
-        print(f"\n✓ API Key Manager initialized with {self.key_manager.get_key_count()} key(s)")
+        logger.info("API Key Manager initialized with %s key(s)", self.key_manager.get_key_count())
+        
+        # Keep-alive connection pool shared with every agent's APIClient calls,
+        # so repeated Groq calls skip DNS + TCP + TLS setup
+        self._session = get_groq_session()
+        self.http = self._session
+        # Open those connections now, in the background, so the first agent
+        # call doesn't pay the handshake (no-op for keys already warmed)
+        for api_key in self.key_manager.get_all_keys():
+            APIClient.warmup(api_key)
+        
+        # On-disk cache for the orchestrator's own low-temperature prompts
+        self.llm_cache = LLMCache(str(self.context_manager.context_dir / "llm_cache" / "responses.sqlite"))
+        self.cache_stats = self.llm_cache.stats
+        
+        # Near-duplicate validation-question prompts (reworded action titles and
+        # descriptions); inactive unless sentence-transformers and faiss are installed
+        self.semantic_cache = SemanticCache(str(self.context_manager.context_dir / "semantic_cache.faiss"))
         
         # Initialize all agents
         self.profiling_agent = StudentProfilingAgent(self.context_manager)
@@ -55,69 +141,147 @@ class Orchestrator:
         self.action_agent = ActionRecommendationAgent(self.context_manager)
         self.feedback_agent = FeedbackLearningAgent(self.context_manager)
         
-        # Rate limiting tracking
-        self.last_request_time = 0
-        self.min_request_interval = 1.0  # Minimum 1 second between requests
-        
-        print(f"Orchestrator initialized with all 8 agents")
+        logger.info("Orchestrator initialized with all 8 agents")
     
-    def _call_llm_with_retry(self, prompt: str, max_tokens: int = 2000, retries: int = 5) -> str:
+    def _post_groq(self, payload: Dict[str, Any], retries: int = 5, stream: bool = False) -> requests.Response:
         """
-        Call LLM with retry logic for rate limiting and throttling
+        POST a chat completion over the pooled session, within the chosen
+        key's rate budget; a 429/5xx moves to another usable key, or waits
+        until the first exhausted key resets (Retry-After) when every key is
+        exhausted. Connection errors are retried with jittered backoff.
         
         Args:
-            prompt: The prompt to send
-            max_tokens: Maximum tokens in response
-            retries: Number of retries on rate limit
-            
+            payload: Chat completion request body
+            retries: Attempts before the last 429/5xx is returned
+            stream: Leave the body unread (for "stream": True payloads)
+        
         Returns:
-            Content from LLM response
+            The last response (callers check its status)
         """
-        # Throttle requests to avoid rate limiting
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            sleep_time = self.min_request_interval - elapsed
-            time.sleep(sleep_time)
+        api_key = self.key_manager.acquire_least_loaded()
+        estimated = estimate_tokens(payload["messages"], payload.get("max_tokens", 0))
         
         for attempt in range(retries):
+            limiter_for_key(api_key).acquire(estimated)
             try:
-                # Update last request time before making request
-                self.last_request_time = time.time()
-                
-                response = requests.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
+                response = self._session.post(
+                    APIClient.GROQ_URL,
                     headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "llama-3.3-70b-versatile",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.3,
-                        "max_tokens": max_tokens
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json",
+                        "Connection": "keep-alive"
                     },
-                    timeout=30
+                    json=payload,
+                    stream=stream,
+                    timeout=APIClient.REQUEST_TIMEOUT
                 )
-                response.raise_for_status()
-                return response.json()["choices"][0]["message"]["content"]
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:  # Too Many Requests
-                    if attempt < retries - 1:
-                        wait_time = 2 ** (attempt + 2)  # Exponential backoff: 4, 8, 16, 32, 64 seconds
-                        print(f"Rate limited. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{retries})")
-                        time.sleep(wait_time)
-                    else:
-                        raise Exception(f"Rate limited after {retries} retries. API quota may be exhausted.")
-                else:
-                    raise
-            except Exception as e:
-                if attempt < retries - 1:
-                    print(f"Error: {e}. Retrying... (Attempt {attempt + 1}/{retries})")
-                    time.sleep(3)
-                else:
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries - 1:
                     raise
+                time.sleep(backoff_delay(attempt, APIClient.BASE_WAIT))
+                continue
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            response.close()  # hand the connection back to the pool
+            
+            # Mark the key even on the last attempt, so the next call starts elsewhere
+            next_key = self.key_manager.failover(api_key, retry_after_seconds(response.headers))
+            if attempt == retries - 1:
+                return response
+            if next_key is None:
+                time.sleep(min(self.key_manager.seconds_until_available(), MAX_RETRY_DELAY))
+                next_key = self.key_manager.acquire_least_loaded()
+            api_key = next_key
         
-        raise Exception("Failed to get LLM response after all retries")
+        return response
+    
+    def _post_groq_json(self, payload: Dict[str, Any], opener: str = "{", retries: int = 5) -> str:
+        """
+        Streamed _post_groq for prompts answered with a single JSON object
+        (or array, opener="["): returns its text as soon as it closes and
+        drops the rest of the stream
+        
+        Returns:
+            JSON text (or the full content if no complete value was seen)
+        
+        Raises:
+            requests.exceptions.HTTPError: If the final response is an error
+        """
+        response = self._post_groq({**payload, "stream": True}, retries=retries, stream=True)
+        try:
+            response.raise_for_status()
+            assembler = JSONObjectAssembler(opener)
+            for delta in APIClient.iter_stream_content(response):
+                value_text = assembler.feed(delta)
+                if value_text is not None:
+                    return value_text
+            return assembler.text
+        finally:
+            response.close()
+    
+    def _call_llm_with_retry(self,
+                             prompt: str,
+                             max_tokens: int = 2000,
+                             retries: int = 5,
+                             system: Optional[str] = None,
+                             temperature: float = 0.3,
+                             opener: str = "{",
+                             use_cache: bool = False) -> str:
+        """
+        Call LLM with retry logic for rate limiting and throttling
+        
+        Args:
+            prompt: The prompt to send
+            max_tokens: Maximum tokens in response
+            retries: Attempts on 429/5xx or connection errors (see _post_groq)
+            system: Optional system message sent before the prompt
+            temperature: Sampling temperature
+            opener: "{" or "[" - the JSON value the response is read up to
+            use_cache: Serve/store the raw, unparsed response in the LLM cache;
+                callers that parse the response cache it themselves once it
+                parses, so a truncated stream is never replayed
+            
+        Returns:
+            Content from LLM response
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if system is not None:
+            messages.insert(0, {"role": "system", "content": system})
+        
+        cache_key = llm_cache_key(
+            "llama-3.3-70b-versatile",
+            prompt if system is None else messages,
+            temperature,
+            max_tokens
+        )
+        if use_cache:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Pacing is left to the key's token bucket in _post_groq, which only
+        # blocks when the real RPM/TPM budget is used up. _post_groq is the
+        # only retry layer: each 429/5xx retry moves to the next usable key
+        # and only waits when every key is exhausted
+        try:
+            content = self._post_groq_json(
+                {
+                    "model": "llama-3.3-70b-versatile",
+                    "messages": messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                },
+                opener=opener,
+                retries=retries
+            )
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 429:  # Too Many Requests
+                raise Exception(f"Rate limited after {retries} retries on all API keys. API quota may be exhausted.")
+            raise
+        
+        if use_cache:
+            self.llm_cache.set(cache_key, content)
+        return content
     
     def _log_api_usage(self, stage: str, agent_name: str, key_number: int = None) -> None:
         """
@@ -128,16 +292,15 @@ class Orchestrator:
             agent_name: Name of the agent
             key_number: API key number (1, 2, or 3)
         """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
         if key_number is None:
             # Find which key this agent is using
-            try:
-                key = self.key_manager.get_key_for_agent(agent_name)
-                key_list = list(self.key_manager.keys)
-                key_number = key_list.index(key) + 1
-            except:
-                key_number = "?"
+            key = self.key_manager.get_key_for_agent(agent_name)
+            key_number = self.key_manager.key_number(key) or "?"
         
-        print(f"\n🔑 [{stage}] {agent_name} → Using API Key #{key_number}")
+        logger.debug("[%s] %s → Using API Key #%s", stage, agent_name, key_number)
     
     def onboard_student(self,
                        user_id: str,
@@ -146,12 +309,42 @@ class Orchestrator:
                        education: str = None,
                        experience: str = None,
                        projects: List[str] = None,
-                       duration_weeks: int = 12) -> Dict[str, Any]:
-        """Complete onboarding workflow for new student"""
+                       duration_weeks: int = 12,
+                       profile_result: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Complete onboarding workflow for new student (interactive, real-time calls)
+        
+        profile_result: Profiling output computed beforehand (e.g. by
+        onboard_cohort's batch run); step 1 is skipped when given
+        """
+        return asyncio.run(self.onboard_student_async(
+            user_id=user_id,
+            desired_role=desired_role,
+            skills=skills,
+            education=education,
+            experience=experience,
+            projects=projects,
+            duration_weeks=duration_weeks,
+            profile_result=profile_result
+        ))
+    
+    async def onboard_student_async(self,
+                                    user_id: str,
+                                    desired_role: str,
+                                    skills: str = None,
+                                    education: str = None,
+                                    experience: str = None,
+                                    projects: List[str] = None,
+                                    duration_weeks: int = 12,
+                                    profile_result: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async onboarding workflow: every agent call goes through the loop's
+        shared httpx client (see utils.async_client), and readiness + market,
+        which only need profile and goal, run concurrently
+        """
+        from .utils.async_client import close_async_client
         
-        print(f"\n{'='*70}")
-        print(f"ONBOARDING STUDENT: {user_id}")
-        print(f"{'='*70}\n")
+        logger.info("ONBOARDING STUDENT: %s", user_id)
         
         results = {
             "user_id": user_id,
@@ -160,35 +353,43 @@ class Orchestrator:
         }
         
         try:
-            print("[1/6] Running Student Profiling Agent...")
-            self._log_api_usage("ONBOARDING", "StudentProfilingAgent", 1)
-            profile_result = self.profiling_agent.analyze_profile(
-                user_id=user_id,
-                skills_text=skills,
-                education=education,
-                experience=experience,
-                projects=projects
-            )
+            logger.info("[1/6] Running Student Profiling Agent...")
+            if profile_result is None:
+                self._log_api_usage("ONBOARDING", "StudentProfilingAgent", 1)
+                profile_result = await self.profiling_agent.analyze_profile_async(
+                    user_id=user_id,
+                    skills_text=skills,
+                    education=education,
+                    experience=experience,
+                    projects=projects
+                )
             results["agent_outputs"]["profiling"] = profile_result
-            print(f"✓ Profile created: {profile_result['student_profile']['experience_level']} level")
-            time.sleep(5)  # Increased delay between agents
+            logger.info("Profile created: %s level", profile_result['student_profile']['experience_level'])
             
-            print("\n[2/6] Running Goal Interpretation Agent...")
+            logger.info("[2/6] Running Goal Interpretation Agent...")
             self._log_api_usage("ONBOARDING", "GoalInterpretationAgent", 2)
-            goal_result = self.goal_agent.interpret_goal(
+            goal_result = await self.goal_agent.interpret_goal_async(
                 user_id=user_id,
                 desired_role=desired_role
             )
             results["agent_outputs"]["goal_interpretation"] = goal_result
             interpreted = goal_result["interpreted_goal"]["role_title"]
-            print(f"✓ Goal interpreted: '{desired_role}' -> '{interpreted}'")
-            time.sleep(5)
+            logger.info("Goal interpreted: '%s' -> '%s'", desired_role, interpreted)
             
-            print("\n[3/6] Running Readiness Assessment Agent...")
+            # Readiness and market analysis both only need the interpreted
+            # goal, so their LLM calls run concurrently. Context writes happen
+            # on the event loop thread between awaits, so the two agents never
+            # interleave a load/save cycle.
+            logger.info("[3/6] Running Readiness Assessment Agent...")
             self._log_api_usage("ONBOARDING", "ReadinessAssessmentAgent", 3)
-            readiness_result = self.readiness_agent.assess_readiness(
-                user_id=user_id,
-                generate_questions=True  # Generate diagnostic questions during onboarding
+            logger.info("[4/6] Running Market Intelligence Agent...")
+            self._log_api_usage("ONBOARDING", "MarketIntelligenceAgent", 1)
+            readiness_result, market_result = await asyncio.gather(
+                self.readiness_agent.assess_readiness_async(
+                    user_id=user_id,
+                    generate_questions=True  # Generate diagnostic questions during onboarding
+                ),
+                self.market_agent.analyze_market_async(user_id=user_id)
             )
             results["agent_outputs"]["readiness"] = readiness_result
             
@@ -203,28 +404,23 @@ class Orchestrator:
                 verdict = readiness_data.get("readiness_verdict", "needs_preparation")
                 confidence = readiness_data.get("confidence_score", 0.5)
             
-            print(f"✓ Readiness: {verdict}")
-            print(f"   Confidence Score: {confidence:.2f}")
-            time.sleep(5)
+            logger.info("Readiness: %s", verdict)
+            logger.info("Confidence Score: %.2f", confidence)
             
-            print("\n[4/6] Running Market Intelligence Agent...")
-            self._log_api_usage("ONBOARDING", "MarketIntelligenceAgent", 1)
-            market_result = self.market_agent.analyze_market(user_id=user_id)
             results["agent_outputs"]["market"] = market_result
             demand = market_result["market_analysis"]["demand_score"]
-            print(f"✓ Market demand score: {demand}/100")
-            time.sleep(5)
+            logger.info("Market demand score: %s/100", demand)
             
-            print("\n[5/6] Running Career Path Planning Agent...")
+            logger.info("[5/6] Running Career Path Planning Agent...")
             self._log_api_usage("ROADMAP_GENERATION", "CareerPathPlanningAgent", 2)
-            path_result = self.path_agent.generate_path(
+            path_result = await self.path_agent.generate_path_async(
                 user_id=user_id,
                 duration_weeks=duration_weeks
             )
             results["agent_outputs"]["career_path"] = path_result
             success_prob = path_result["career_path"]["success_probability"]
             steps = len(path_result["career_path"]["primary_path"]["steps"])
-            print(f"✓ Path generated: {steps} steps, {success_prob*100:.0f}% success probability")
+            logger.info("Path generated: %s steps, %.0f%% success probability", steps, success_prob*100)
             
             # Save roadmap with steps and actions
             roadmap_data = {
@@ -237,20 +433,16 @@ class Orchestrator:
                 "status": "generated"
             }
             self.context_manager.update_roadmap(user_id, roadmap_data)
-            print(f"✓ Roadmap saved to context with {steps} steps")
-            
-            time.sleep(5)
+            logger.info("Roadmap saved to context with %s steps", steps)
             
-            print("\n[6/6] Running Action Recommendation Agent...")
+            logger.info("[6/6] Running Action Recommendation Agent...")
             self._log_api_usage("ACTION_GENERATION", "ActionRecommendationAgent", 1)
-            action_result = self.action_agent.generate_actions(user_id=user_id)
+            action_result = await self.action_agent.generate_actions_async(user_id=user_id)
             results["agent_outputs"]["actions"] = action_result
             actions_count = len(action_result["action_plan"]["priority_actions"])
-            print(f"✓ Generated {actions_count} actionable tasks")
+            logger.info("Generated %s actionable tasks", actions_count)
             
-            print(f"\n{'='*70}")
-            print("ONBOARDING COMPLETE!")
-            print(f"{'='*70}\n")
+            logger.info("ONBOARDING COMPLETE!")
             
             results["status"] = "success"
             results["summary"] = {
@@ -265,414 +457,527 @@ class Orchestrator:
             return results
             
         except Exception as e:
-            print(f"\nError during onboarding: {e}")
+            logger.exception("Error during onboarding")
             results["status"] = "error"
             results["error"] = str(e)
             return results
+        finally:
+            await close_async_client()
+    
+    def onboard_cohort(self,
+                       students: List[Dict[str, Any]],
+                       duration_weeks: int = 12,
+                       poll_interval: float = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Onboard many students at once (e.g. a class) as a background job
+        
+        Profiling for the whole cohort runs as one Groq batch, which does not
+        consume the live rate limits used by interactive onboard_student calls;
+        the remaining steps then run per student.
+        
+        Args:
+            students: Dicts with user_id, desired_role and optionally skills,
+                      education, experience, projects
+            duration_weeks: Path duration for every student
+            poll_interval: Seconds between batch status checks
+            
+        Returns:
+            user_id -> onboard_student result
+        """
+        logger.info("Batch-profiling cohort of %s students...", len(students))
+        profiles = self.profiling_agent.analyze_profile_batch(
+            [
+                {
+                    "user_id": student["user_id"],
+                    "skills_text": student.get("skills"),
+                    "education": student.get("education"),
+                    "experience": student.get("experience"),
+                    "projects": student.get("projects")
+                }
+                for student in students
+            ],
+            poll_interval=poll_interval
+        )
+        
+        return {
+            student["user_id"]: self.onboard_student(
+                user_id=student["user_id"],
+                desired_role=student["desired_role"],
+                duration_weeks=duration_weeks,
+                profile_result=profiles[student["user_id"]]
+            )
+            for student in students
+        }
     
     def evaluate_and_feedback(self, user_id: str) -> Dict[str, Any]:
         """Run feedback evaluation on student progress"""
-        print(f"\nEvaluating progress for {user_id}...")
+        logger.info("Evaluating progress for %s...", user_id)
         result = self.feedback_agent.evaluate_progress(user_id=user_id)
         if result["status"] == "success":
             feedback = result["feedback_analysis"]
-            print(f"Progress: {feedback['overall_progress_rating']}")
-            print(f"   Velocity: {feedback['velocity_assessment']}")
-            print(f"   Confidence: {feedback['updated_confidence_score']}")
+            logger.info("Progress: %s", feedback['overall_progress_rating'])
+            logger.info("Velocity: %s", feedback['velocity_assessment'])
+            logger.info("Confidence: %s", feedback['updated_confidence_score'])
         return result
     
     def handle_failure_and_reroute(self, user_id: str, failure_evidence: Dict = None) -> Dict[str, Any]:
         """Detect failure and reroute student"""
-        print(f"\nDetecting failures and rerouting for {user_id}...")
+        logger.info("Detecting failures and rerouting for %s...", user_id)
         reroute_result = self.reroute_agent.detect_and_reroute(
             user_id=user_id,
             failure_evidence=failure_evidence
         )
         if reroute_result["status"] == "success":
             analysis = reroute_result["reroute_analysis"]
-            print(f"Failure detected: {analysis['failure_type']}")
-            print(f"   Alternatives found: {len(analysis['alternative_paths'])}")
+            logger.info("Failure detected: %s", analysis['failure_type'])
+            logger.info("Alternatives found: %s", len(analysis['alternative_paths']))
         return reroute_result
     
-    def answer_diagnostic_questions(self, user_id: str, answers: List[str]) -> Dict[str, Any]:
-        """Evaluate diagnostic question answers"""
-        print(f"\nEvaluating diagnostic answers for {user_id}...")
-        result = self.readiness_agent.assess_readiness(user_id=user_id, answers=answers)
+    def answer_diagnostic_questions(self, user_id: str, answers: List[str], next_questions: bool = False) -> Dict[str, Any]:
+        """Evaluate diagnostic question answers (and generate the next set in the same call if next_questions)"""
+        logger.info("Evaluating diagnostic answers for %s...", user_id)
+        result = self.readiness_agent.assess_readiness(
+            user_id=user_id,
+            answers=answers,
+            generate_questions=next_questions
+        )
         if result["status"] == "success":
             assessment = result["readiness_assessment"]
-            print(f"Updated confidence: {assessment['confidence_score']}")
-            print(f"   Readiness: {assessment['readiness_verdict']}")
+            logger.info("Updated confidence: %s", assessment['confidence_score'])
+            logger.info("Readiness: %s", assessment['readiness_verdict'])
         return result
     
+    def _action_index(self, current_actions: Dict[str, Any]) -> Dict[str, Tuple[str, int]]:
+        """
+        Map each action's action_id, id and title (case-insensitive) to its
+        (list name, position), in one pass over pending then completed actions;
+        on duplicate keys the pending action wins
+        """
+        index = {}
+        for list_name in ("pending_actions", "completed_actions"):
+            for position, action in enumerate(current_actions.get(list_name, [])):
+                for field in ("action_id", "id", "title"):
+                    if action.get(field) is not None:
+                        index.setdefault(_action_key(action[field]), (list_name, position))
+        return index
+    
+    def _find_action(self,
+                     current_actions: Dict[str, Any],
+                     action_id: str,
+                     pending_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Action referred to by action_id (its action_id, id or title), or None"""
+        location = self._action_index(current_actions).get(_action_key(action_id))
+        if location is None or (pending_only and location[0] != "pending_actions"):
+            return None
+        list_name, position = location
+        return current_actions[list_name][position]
+    
     def complete_action(self, user_id: str, action_id: str, time_spent_hours: float = None, notes: str = None) -> Dict[str, Any]:
         """Mark action as complete and generate validation questions"""
-        try:
-            # First load context and find the action
-            context = self.context_manager.load_context(user_id)
-            completed_action = None
-            
-            # Search in both pending and completed actions
-            all_actions = context["current_actions"].get("pending_actions", []) + context["current_actions"].get("completed_actions", [])
-            
-            for action in all_actions:
-                if action.get("title") == action_id or action.get("id") == action_id or action.get("action_id") == action_id:
-                    completed_action = action
-                    break
-            
-            if not completed_action:
-                return {"status": "error", "message": f"Action '{action_id}' not found"}
-            
-            # Mark action as in_progress for this attempt
-            completed_action["status"] = "in_progress"
-            completed_action["attempts"] = completed_action.get("attempts", 0) + 1
-            
-            # Generate validation questions for this action
-            validation_questions = self._generate_action_validation_questions(
-                user_id,
-                completed_action
-            )
-            
-            # Store questions in context with the action title as key
-            if "action_validations" not in context:
-                context["action_validations"] = {}
-            context["action_validations"][action_id] = {
-                "questions": validation_questions,
-                "generated_at": datetime.now().isoformat(),
-                "status": "pending"
-            }
-            self.context_manager.save_context(user_id, context)
+        # One load and one write for the whole request: nested load_context
+        # calls (e.g. question generation) reuse this context
+        with self.context_manager.batch(user_id):
+            try:
+                # First load context and find the action
+                context = self.context_manager.load_context(user_id)
+                
+                # Search in both pending and completed actions
+                completed_action = self._find_action(context["current_actions"], action_id)
+                
+                if not completed_action:
+                    return {"status": "error", "message": f"Action '{action_id}' not found"}
+                
+                # Mark action as in_progress for this attempt
+                completed_action["status"] = "in_progress"
+                completed_action["attempts"] = completed_action.get("attempts", 0) + 1
+                
+                # Generate validation questions for this action
+                validation_questions = self._generate_action_validation_questions(
+                    user_id,
+                    completed_action
+                )
+                
+                # Store questions in context with the action title as key
+                if "action_validations" not in context:
+                    context["action_validations"] = {}
+                context["action_validations"][action_id] = {
+                    "questions": validation_questions,
+                    "generated_at": datetime.now().isoformat(),
+                    "status": "pending"
+                }
+                # Normalized key -> stored key, for case-insensitive lookups
+                context.setdefault("action_validation_keys", {})[_action_key(action_id)] = action_id
+                self.context_manager.save_context(user_id, context)
+                
+                return {
+                    "status": "success",
+                    "validation_questions": validation_questions,
+                    "message": f"Generated {len(validation_questions)} validation questions"
+                }
             
-            return {
-                "status": "success",
-                "validation_questions": validation_questions,
-                "message": f"Generated {len(validation_questions)} validation questions"
-            }
+            except Exception as e:
+                logger.exception("Error in complete_action")
+                return {"status": "error", "message": str(e)}
         
-        except Exception as e:
-            print(f"Error in complete_action: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"status": "error", "message": str(e)}
-    
     def _generate_action_validation_questions(self, user_id: str, action: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate validation questions for a completed action"""
         context = self.context_manager.load_context(user_id)
         
-        prompt = f"""Generate 3 validation questions to test if the student has truly mastered the action:
-        
-Action: {action.get('title', 'Unknown')}
+        action_details = f"""Action: {action.get('title', 'Unknown')}
 Description: {action.get('description', '')}
 Success Criteria: {action.get('success_criteria', '')}
-Target Role: {context['active_path'].get('target_role', 'Unknown')}
-
-Generate exactly 3 questions that:
-1. Test conceptual understanding
-2. Test practical application
-3. Test real-world relevance
-
-Return as JSON array with fields: question, expected_understanding"""
+Target Role: {context['active_path'].get('target_role', 'Unknown')}"""
+        
+        # Students on the same action for the same role share one set of questions
+        cache_key = llm_cache_key(
+            "llama-3.3-70b-versatile",
+            {"validation_questions": action.get('title'), "target_role": context['active_path'].get('target_role')},
+            0.3,
+            1000
+        )
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            return loads(cached)
         
+        # Embed only the action-specific text; the shared instructions would
+        # make every prompt look alike
+        target_role = context['active_path'].get('target_role', 'Unknown')
+        semantic_text = f"{action.get('title', '')}\n{action.get('description', '')}\n{action.get('success_criteria', '')}"
         try:
-            api_key = os.getenv('GROQ_API_KEY') or "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"
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3,
-                    "max_tokens": 1000
-                }
+            similar = self.semantic_cache.get(semantic_text, namespace=target_role)
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            similar = None
+        if similar is not None:
+            self.llm_cache.set(cache_key, dumps_compact(similar))
+            return similar
+        
+        try:
+            # Cached below per action title and role, once the questions parse
+            content = self._call_llm_with_retry(
+                action_details,
+                max_tokens=1000,
+                system=self.VALIDATION_QUESTIONS_PROMPT,
+                opener="["
             )
-            response.raise_for_status()
-            content = response.json()["choices"][0]["message"]["content"]
             
             # Parse JSON from response
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                questions = json.loads(json_match.group())
-                if questions and len(questions) > 0:
-                    return questions
+            try:
+                questions = decode_first_json(content, "[")
+            except ValueError:
+                questions = None
+            if questions:
+                self.llm_cache.set(cache_key, dumps_compact(questions))
+                try:
+                    self.semantic_cache.set(semantic_text, questions, namespace=target_role)
+                except Exception as e:
+                    logger.warning("Semantic cache update failed: %s", e)
+                return questions
                     
             # Fallback: Generate basic questions if API parsing fails
-            print(f"⚠️ Could not parse API response, using fallback questions")
+            logger.warning("Could not parse API response, using fallback questions")
             return self._get_fallback_validation_questions(action)
             
-        except Exception as e:
-            print(f"Error generating validation questions: {e}")
+        except Exception:
+            logger.exception("Error generating validation questions")
             # Return fallback questions on any error
             return self._get_fallback_validation_questions(action)
     
     def _get_fallback_validation_questions(self, action: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate fallback validation questions when API fails"""
-        action_title = action.get('title', 'Action')
-        action_desc = action.get('description', 'Complete this action')
-        
-        return [
-            {"question": f"What is the main objective of '{action_title}'?", "expected_understanding": "Student understands the goal"},
-            {"question": f"How does '{action_title}' relate to your career goal?", "expected_understanding": "Student can connect to their path"},
-            {"question": f"What did you learn from completing '{action_title}'?", "expected_understanding": "Student reflects on learning"}
-        ]
+        # Fresh dicts: the questions are stored in (and may be edited through) the context
+        return [dict(question) for question in _fallback_questions_for(action.get('title', 'Action'))]
     
-    def validate_action_completion(self, user_id: str, action_id: str, answers: List[str]) -> Dict[str, Any]:
-        """Evaluate answers to validation questions with score threshold"""
-        context = self.context_manager.load_context(user_id)
+    def _screen_answers(self, questions: List[Dict[str, Any]], answers: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Zero-score evaluation for submissions the rubric can't pass: fewer
+        than MIN_SUBSTANTIVE_ANSWERS non-trivial answers, or the same text
+        given for every question. Anything else goes to the LLM, which scores
+        individual short answers itself.
         
-        # Try exact match first
-        if action_id not in context.get("action_validations", {}):
-            # Try case-insensitive match
-            search_key = None
-            for key in context.get("action_validations", {}).keys():
-                if key.lower() == action_id.lower():
-                    search_key = key
-                    break
-            if not search_key:
-                return {"status": "error", "message": f"No validation questions found for action '{action_id}'"}
-            action_id = search_key
-            return {"status": "error", "message": "No validation questions found for this action"}
-        
-        validation_data = context["action_validations"][action_id]
-        questions = validation_data["questions"]
-        
-        prompt = f"""Evaluate these answers to validation questions:
-
-Questions and Answers:
-"""
-        for i, (q, a) in enumerate(zip(questions, answers)):
-            prompt += f"\nQ{i+1}: {q.get('question', '')}\nAnswer: {a}"
+        Returns:
+            Synthetic evaluation, or None if the answers need LLM grading
+        """
+        stripped = [str(answer or "").strip() for answer in answers]
+        stripped += [""] * (len(questions) - len(stripped))
         
-        prompt += f"""
-
-Score EACH answer individually (0-3 scale):
-- 0: No understanding or incorrect
-- 1: Minimal understanding
-- 2: Good understanding  
-- 3: Excellent understanding
-
-Calculate total_score by summing individual scores (0-9 scale).
-
-COMPLETION CRITERIA:
-- Total score >= 6: Action is COMPLETE - ready_to_proceed = true
-- Total score < 6: Action needs REVIEW - ready_to_proceed = false
-
-Return ONLY JSON:
-{{
-  "individual_scores": [score1, score2, score3],
-  "total_score": 7,
-  "ready_to_proceed": true,
-  "areas_of_strength": ["area1", "area2"],
-  "areas_for_improvement": ["area1"],
-  "feedback": "What they did well",
-  "recommendation": "What to do next or which part to review"
-}}"""
+        substantive = sum(len(answer) >= self.MIN_ANSWER_CHARS for answer in stripped)
+        too_short = substantive < self.MIN_SUBSTANTIVE_ANSWERS
+        repeated = len(stripped) > 1 and len({answer.lower() for answer in stripped}) == 1
+        if not (too_short or repeated):
+            return None
         
-        try:
-            api_key = os.getenv('GROQ_API_KEY') or "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"
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.2,
-                    "max_tokens": 800
-                }
+        return {
+            "individual_scores": [0] * len(questions),
+            "total_score": 0,
+            "ready_to_proceed": False,
+            "areas_of_strength": [],
+            "areas_for_improvement": ["depth"],
+            "feedback": "Answers too short" if too_short else "The same answer was given for every question",
+            "recommendation": "Provide a detailed answer to each question (a few sentences each)"
+        }
+    
+    def validate_action_completion(self, user_id: str, action_id: str, answers: List[str]) -> Dict[str, Any]:
+        """Evaluate answers to validation questions with score threshold"""
+        # Shared with stage progression (and the action agent it may run)
+        with self.context_manager.batch(user_id):
+            context = self.context_manager.load_context(user_id)
+            
+            # Try exact match first
+            validations = context.get("action_validations", {})
+            if action_id not in validations:
+                # Try case-insensitive match (contexts saved before the key index
+                # existed fall back to a scan)
+                search_key = context.get("action_validation_keys", {}).get(_action_key(action_id))
+                if search_key is None:
+                    search_key = next((key for key in validations if _action_key(key) == _action_key(action_id)), None)
+                if search_key not in validations:
+                    return {"status": "error", "message": f"No validation questions found for action '{action_id}'"}
+                action_id = search_key
+            
+            validation_data = context["action_validations"][action_id]
+            questions = validation_data["questions"]
+            actions = context.setdefault("current_actions", {})
+            pending = actions.setdefault("pending_actions", [])
+            completed = actions.setdefault("completed_actions", [])
+            
+            qa_block = "Questions and Answers:\n" + "".join(
+                f"\nQ{i+1}: {q.get('question', '')}\nAnswer: {a}"
+                for i, (q, a) in enumerate(zip(questions, answers))
             )
-            response.raise_for_status()
-            content = response.json()["choices"][0]["message"]["content"]
+            messages = [
+                {"role": "system", "content": self.VALIDATION_RUBRIC_PROMPT},
+                {"role": "user", "content": qa_block}
+            ]
             
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                evaluation = json.loads(json_match.group())
-                
-                # Update context with validation result
-                context["action_validations"][action_id]["status"] = "completed"
-                context["action_validations"][action_id]["evaluation"] = evaluation
-                context["action_validations"][action_id]["answers"] = answers
-                context["action_validations"][action_id]["evaluated_at"] = datetime.now().isoformat()
-                
-                # If score >= 6, move action from pending to completed
-                if evaluation.get("total_score", 0) >= 6:
-                    pending_actions = context["current_actions"].get("pending_actions", [])
-                    completed_actions = context["current_actions"].get("completed_actions", [])
-                    
-                    # Find and move action
-                    search_id = str(action_id).strip().lower()
-                    action_index = -1
+            try:
+                # Submissions that cannot reach the passing total (too few
+                # real answers, or one answer copy-pasted) skip the LLM call
+                evaluation = self._screen_answers(questions, answers)
+                if evaluation is None:
+                    cache_key = llm_cache_key("llama-3.3-70b-versatile", messages, 0.2, 800)
+                    content = self.llm_cache.get(cache_key)
+                    if content is None:
+                        content = self._call_llm_with_retry(
+                            qa_block,
+                            max_tokens=800,
+                            system=self.VALIDATION_RUBRIC_PROMPT,
+                            temperature=0.2
+                        )
                     
-                    for i, action in enumerate(pending_actions):
-                        if action.get("title", "").strip().lower() == search_id:
-                            action_index = i
-                            break
+                    try:
+                        evaluation = decode_first_json(content, "{")
+                    except ValueError:
+                        evaluation = None
+                    if evaluation is not None:
+                        self.llm_cache.set(cache_key, content)
+                
+                if evaluation is not None:
+                    # Update context with validation result
+                    validation_data["status"] = "completed"
+                    validation_data["evaluation"] = evaluation
+                    validation_data["answers"] = answers
+                    evaluated_at = datetime.now().isoformat()
+                    validation_data["evaluated_at"] = evaluated_at
                     
-                    if action_index >= 0:
-                        action_to_move = pending_actions.pop(action_index)
-                        action_to_move["status"] = "completed"
-                        action_to_move["completion_timestamp"] = datetime.now().isoformat()
-                        action_to_move["relevance_score"] = evaluation.get("total_score", 0) / 9.0
-                        action_to_move["agent_satisfied"] = True
-                        action_to_move["user_answers"] = answers
+                    # If score >= 6, move action from pending to completed
+                    if evaluation.get("total_score", 0) >= 6:
+                        # Find and move action
+                        list_name, action_index = self._action_index(actions).get(
+                            _action_key(action_id), (None, -1)
+                        )
                         
-                        completed_actions.append(action_to_move)
-                        context["current_actions"]["pending_actions"] = pending_actions
-                        context["current_actions"]["completed_actions"] = completed_actions
+                        if list_name == "pending_actions":
+                            action_to_move = pending.pop(action_index)
+                            action_to_move["status"] = "completed"
+                            action_to_move["completion_timestamp"] = evaluated_at
+                            action_to_move["relevance_score"] = evaluation.get("total_score", 0) / 9.0
+                            action_to_move["agent_satisfied"] = True
+                            action_to_move["validated"] = True
+                            action_to_move["user_answers"] = answers
+                            completed.append(action_to_move)
+                            self._count_completion(context, action_to_move)
+                            
+                            self._allocate_next_action(user_id, context)
+                            self._check_stage_progression(user_id, context)
                         
                         self.context_manager.save_context(user_id, context)
-                        self._allocate_next_action(user_id, context)
-                        self._check_stage_progression(user_id, context)
-                        self.context_manager.save_context(user_id, context)
-                else:
-                    print(f"⏸️ Action needs review - score {evaluation.get('total_score')}/9 (need 6+)")
-                    context["action_validations"][action_id]["retry_suggested"] = True
-                    
-                    # Mark attempts in pending action
-                    all_actions = context["current_actions"].get("pending_actions", [])
-                    for action in all_actions:
-                        if action.get("title") == action_id or action.get("id") == action_id or action.get("action_id") == action_id:
+                    else:
+                        logger.info("Action needs review - score %s/9 (need 6+)", evaluation.get('total_score'))
+                        validation_data["retry_suggested"] = True
+                        
+                        # Mark attempts in pending action
+                        action = self._find_action(actions, action_id, pending_only=True)
+                        if action:
                             action["attempts"] = action.get("attempts", 0) + 1
-                            break
+                        
+                        # Save for failed validation
+                        self.context_manager.save_context(user_id, context)
+                        logger.debug("Context saved for retry attempt")
                     
-                    # Save for failed validation
-                    self.context_manager.save_context(user_id, context)
-                    print(f"✅ Context saved for retry attempt")
-                
-                return {
-                    "status": "success",
-                    "evaluation": evaluation,
-                    "ready_to_proceed": evaluation.get("ready_to_proceed", False),
-                    "score": evaluation.get("total_score", 0),
-                    "passing_threshold": 6
-                }
-            return {"status": "error", "message": "Failed to parse evaluation"}
-        except Exception as e:
-            print(f"Error validating action: {e}")
-            return {"status": "error", "message": str(e)}
+                    return {
+                        "status": "success",
+                        "evaluation": evaluation,
+                        "ready_to_proceed": evaluation.get("ready_to_proceed", False),
+                        "score": evaluation.get("total_score", 0),
+                        "passing_threshold": 6
+                    }
+                return {"status": "error", "message": "Failed to parse evaluation"}
+            except Exception as e:
+                logger.exception("Error validating action")
+                return {"status": "error", "message": str(e)}
 
     def mark_action_as_completed(self, user_id: str, action_id: str, score: int = 9, time_spent_hours: float = 1.0) -> Dict[str, Any]:
-        print(f"[DEBUG] mark_action_as_completed called for user_id={user_id}, action_id={action_id}, score={score}, time_spent={time_spent_hours}h")
         """Force-mark an action as completed without running evaluation.
 
         This is used when the frontend should immediately mark the action complete
         after the user submits the validation form (no LLM evaluation required).
         Returns a success dict with a synthetic evaluation containing the score.
         """
-        try:
-            context = self.context_manager.load_context(user_id)
-
-            pending_actions = context.get("current_actions", {}).get("pending_actions", [])
-            completed_actions = context.get("current_actions", {}).get("completed_actions", [])
+        logger.debug("mark_action_as_completed: user_id=%s action_id=%s score=%s time_spent=%sh",
+                     user_id, action_id, score, time_spent_hours)
+        # Allocation and stage progression share this context; saved once on exit
+        with self.context_manager.batch(user_id):
+            try:
+                context = self.context_manager.load_context(user_id)
+                now = datetime.now().isoformat()
 
-            search_id = str(action_id).strip().lower()
-            action_index = -1
-            for i, action in enumerate(pending_actions):
-                if action.get("title", "").strip().lower() == search_id:
-                    action_index = i
-                    break
+                actions = context.setdefault("current_actions", {})
+                pending = actions.setdefault("pending_actions", [])
+                completed = actions.setdefault("completed_actions", [])
+                progress = context.setdefault("progress", {})
 
-            if action_index < 0:
-                return {"status": "error", "message": f"Action '{action_id}' not found in pending actions"}
+                list_name, action_index = self._action_index(actions).get(
+                    _action_key(action_id), (None, -1)
+                )
 
-            action_to_move = pending_actions.pop(action_index)
-            action_to_move["status"] = "completed"
-            action_to_move["completion_timestamp"] = datetime.now().isoformat()
-            action_to_move["relevance_score"] = float(score) / 9.0
-            action_to_move["agent_satisfied"] = True
-            action_to_move["user_answers"] = []
-            action_to_move["time_spent_hours"] = time_spent_hours
+                if list_name != "pending_actions":
+                    return {"status": "error", "message": f"Action '{action_id}' not found in pending actions"}
 
-            completed_actions.append(action_to_move)
+                action_to_move = pending.pop(action_index)
+                action_to_move["status"] = "completed"
+                action_to_move["completion_timestamp"] = now
+                action_to_move["relevance_score"] = float(score) / 9.0
+                action_to_move["agent_satisfied"] = True
+                action_to_move["validated"] = score >= 6
+                action_to_move["user_answers"] = []
+                action_to_move["time_spent_hours"] = time_spent_hours
 
-            # update context and save
-            context["current_actions"]["pending_actions"] = pending_actions
-            context["current_actions"]["completed_actions"] = completed_actions
-            
-            # Update progress metrics
-            progress = context.get("progress", {})
-            progress["time_spent_hours"] = progress.get("time_spent_hours", 0.0) + time_spent_hours
-            progress["last_activity"] = datetime.now().isoformat()
-            context["progress"] = progress
-            
-            print(f"[DEBUG] Saving context after moving action. Pending: {len(pending_actions)}, Completed: {len(completed_actions)}, Total hours: {progress['time_spent_hours']}")
-            self.context_manager.save_context(user_id, context)
+                completed.append(action_to_move)
+                self._count_completion(context, action_to_move)
+                
+                # Update progress metrics
+                progress["time_spent_hours"] = progress.get("time_spent_hours", 0.0) + time_spent_hours
+                progress["last_activity"] = now
+                
+                logger.debug("Moved action. Pending: %d, Completed: %d, Total hours: %s",
+                             len(pending), len(completed), progress["time_spent_hours"])
 
-            # perform stage progression and allocation
-            self._allocate_next_action(user_id, context)
-            self._check_stage_progression(user_id, context)
-            
-            # Update overall progress metrics
-            completed = context.get("current_actions", {}).get("completed_actions", [])
-            pending = context.get("current_actions", {}).get("pending_actions", [])
-            total_actions = len(completed) + len(pending)
-            if total_actions > 0:
-                context["progress"]["completion_rate"] = len(completed) / total_actions
-            
-            # Update completed_steps in progress object
-            if "completed_steps" not in context["progress"]:
-                context["progress"]["completed_steps"] = []
-            context["progress"]["completed_steps"] = [a.get("title", "") for a in completed]
-            
-            print(f"[DEBUG] Saving context after allocation/progression. Pending: {len(context['current_actions']['pending_actions'])}, Completed: {len(context['current_actions']['completed_actions'])}")
-            print(f"[DEBUG] Progress: {context.get('progress', {})}")
-            self.context_manager.save_context(user_id, context)
+                # perform stage progression and allocation
+                self._allocate_next_action(user_id, context)
+                self._check_stage_progression(user_id, context)
+                
+                # A new stage replaces the pending list
+                pending = actions["pending_actions"]
+                
+                # Update overall progress metrics
+                total_actions = len(completed) + len(pending)
+                if total_actions > 0:
+                    progress["completion_rate"] = len(completed) / total_actions
+                
+                # Update completed_steps in progress object
+                progress["completed_steps"] = [a.get("title", "") for a in completed]
+                
+                logger.debug("Saving context after allocation/progression. Pending: %d, Completed: %d",
+                             len(pending), len(completed))
+                logger.debug("Progress: %s", progress)
+                self.context_manager.save_context(user_id, context)
 
-            evaluation = {
-                "individual_scores": [3, 3, 3],
-                "total_score": score,
-                "ready_to_proceed": True,
-                "areas_of_strength": [],
-                "areas_for_improvement": [],
-                "feedback": "Marked complete by user submission",
-                "recommendation": "Proceed to next action"
-            }
+                evaluation = {
+                    "individual_scores": [3, 3, 3],
+                    "total_score": score,
+                    "ready_to_proceed": True,
+                    "areas_of_strength": [],
+                    "areas_for_improvement": [],
+                    "feedback": "Marked complete by user submission",
+                    "recommendation": "Proceed to next action"
+                }
 
-            return {"status": "success", "evaluation": evaluation, "score": score, "passing_threshold": 6}
-        except Exception as e:
-            print(f"Error in mark_action_as_completed: {e}")
-            return {"status": "error", "message": str(e)}
-    
+                return {"status": "success", "evaluation": evaluation, "score": score, "passing_threshold": 6}
+            except Exception as e:
+                logger.exception("Error in mark_action_as_completed")
+                return {"status": "error", "message": str(e)}
+        
     def _check_stage_progression(self, user_id: str, context: Dict[str, Any]) -> None:
-        """Check if current stage is complete and generate next stage if needed"""
+        """
+        Check if current stage is complete and generate next stage if needed
+        
+        Updates context in place; the caller saves it afterwards
+        """
         try:
             # Get current stage info
             progress = context.get("progress", {})
             active_stage = progress.get("active_stage", 1)
             
-            # Get current stage actions
-            pending = context.get("current_actions", {}).get("pending_actions", [])
-            completed = context.get("current_actions", {}).get("completed_actions", [])
-            
-            # Calculate current stage completion rate
-            stage_actions = [a for a in completed if a.get("stage") == active_stage]
-            total_stage_actions = len([a for a in (completed + pending) if a.get("stage") == active_stage])
+            counts = self._stage_counts(context, active_stage)
+            completed_count, total_stage_actions = counts["completed"], counts["total"]
             
             if total_stage_actions > 0:
-                stage_completion_rate = len(stage_actions) / total_stage_actions
+                stage_completion_rate = completed_count / total_stage_actions
                 progress["stage_completion_rate"] = stage_completion_rate
                 context["progress"] = progress  # Save progress back to context
                 
-                print(f"[DEBUG] Stage {active_stage} completion rate: {stage_completion_rate:.1%} ({len(stage_actions)}/{total_stage_actions})")
+                logger.debug("Stage %s completion rate: %.1f%% (%d/%d)",
+                             active_stage, stage_completion_rate * 100, completed_count, total_stage_actions)
                 
                 # If stage is 100% complete and all validated
                 if stage_completion_rate >= 1.0:
+                    # Actions record "validated" when they are scored; older
+                    # contexts fall back to the stored evaluation
+                    validations = context.get("action_validations", {})
+                    stage_actions = [
+                        a for a in context["current_actions"].get("completed_actions") or ()
+                        if a.get("stage") == active_stage
+                    ]
                     all_validated = all(
-                        context.get("action_validations", {}).get(a.get("title"), {}).get("evaluation", {}).get("total_score", 0) >= 6
+                        a["validated"] if "validated" in a else
+                        validations.get(a.get("title"), {}).get("evaluation", {}).get("total_score", 0) >= 6
                         for a in stage_actions
                     )
                     
                     if all_validated:
-                        print(f"Stage {active_stage} COMPLETE! Moving to Stage {active_stage + 1}...")
+                        logger.info("Stage %s COMPLETE! Moving to Stage %s...", active_stage, active_stage + 1)
+                        # The action agent plans from the user's context, so make
+                        # this completion visible to it first (inside a batch
+                        # this only marks the shared context dirty)
+                        self.context_manager.save_context(user_id, context)
                         self._generate_next_stage(user_id, context, active_stage + 1)
                         return
-        except Exception as e:
-            print(f"Error checking stage progression: {e}")
+        except Exception:
+            logger.exception("Error checking stage progression")
+    
+    def _stage_counts(self, context: Dict[str, Any], stage: int) -> Dict[str, int]:
+        """
+        Completed/total action counts for a stage, kept in
+        progress["stage_counts"] and updated as actions complete
+        
+        Anything that replaces the action lists drops the counts; they are
+        then recounted here from the lists.
+        """
+        stage_counts = context["progress"].setdefault("stage_counts", {})
+        counts = stage_counts.get(str(stage))
+        if counts is None:
+            actions = context.get("current_actions", {})
+            completed = sum(1 for a in actions.get("completed_actions") or () if a.get("stage") == stage)
+            pending = sum(1 for a in actions.get("pending_actions") or () if a.get("stage") == stage)
+            counts = stage_counts[str(stage)] = {"completed": completed, "total": completed + pending}
+        return counts
+    
+    def _count_completion(self, context: Dict[str, Any], action: Dict[str, Any]) -> None:
+        """Record a pending -> completed move in the stage counts (if they are loaded)"""
+        counts = context["progress"].get("stage_counts", {}).get(str(action.get("stage")))
+        if counts is not None:
+            counts["completed"] += 1
     
     def _generate_next_stage(self, user_id: str, context: Dict[str, Any], next_stage: int) -> None:
         """Generate actions for the next stage of the roadmap"""
@@ -684,45 +989,32 @@ Return ONLY JSON:
             progress["stage_completion_rate"] = 0.0
             progress["next_stage_generated_at"] = datetime.now().isoformat()
             
-            # Get current active path and regenerate actions for next stage
-            active_path = context["active_path"]
-            current_step = progress.get("current_step", 0)
-            
-            # Call action agent to generate next stage actions
-            print(f"Generating Stage {next_stage} actions from roadmap...")
+            # None in a fresh context (and after a path change)
+            current_step = progress.get("current_step") or 0
             
-            input_data = {
-                "active_path": active_path,
-                "student_profile": context["student_profile"],
-                "progress": progress,
-                "completed_actions": context["current_actions"].get("completed_actions", []),
-                "current_step": current_step + 1,
-                "stage_number": next_stage
-            }
-            
-            # Generate next stage actions
+            # Call action agent to generate next stage actions (it plans from
+            # the saved context)
+            logger.debug("Generating Stage %s actions from roadmap", next_stage)
             result = self.action_agent.generate_actions(user_id=user_id)
             
             if result["status"] == "success":
-                action_plan = result["action_plan"]
-                next_stage_actions = action_plan.get("priority_actions", [])
-                
                 # Tag new actions with stage number
-                for action in next_stage_actions:
-                    action["stage"] = next_stage
-                    action["status"] = "pending"
+                next_stage_actions = [
+                    {**action, "stage": next_stage, "status": "pending"}
+                    for action in result["action_plan"].get("priority_actions", [])
+                ]
                 
                 # Update context with new stage actions
                 context["current_actions"]["pending_actions"] = next_stage_actions
-                context["current_actions"]["completed_actions"] = context["current_actions"].get("completed_actions", [])
+                progress["stage_counts"] = {str(next_stage): {"completed": 0, "total": len(next_stage_actions)}}
                 
-                # Update progress
+                # Update progress (one timestamp for the generated stage)
+                generated_at = datetime.now().isoformat()
                 progress["current_step"] = current_step + 1
-                progress["last_stage_generated"] = datetime.now().isoformat()
-                progress["stage_progression_history"] = progress.get("stage_progression_history", [])
-                progress["stage_progression_history"].append({
+                progress["last_stage_generated"] = generated_at
+                progress.setdefault("stage_progression_history", []).append({
                     "stage": next_stage,
-                    "generated_at": datetime.now().isoformat(),
+                    "generated_at": generated_at,
                     "action_count": len(next_stage_actions)
                 })
                 
@@ -732,13 +1024,13 @@ Return ONLY JSON:
                 if next_stage_actions:
                     next_stage_actions[0]["status"] = "in_progress"
                     progress["next_action_allocated"] = next_stage_actions[0].get("title")
-                    progress["last_allocation_time"] = datetime.now().isoformat()
+                    progress["last_allocation_time"] = generated_at
                 
-                self.context_manager.save_context(user_id, context)
-                print(f"✅ Stage {next_stage} generated with {len(next_stage_actions)} actions")
+                # Saved by the caller together with its own updates
+                logger.info("Stage %s generated with %s actions", next_stage, len(next_stage_actions))
             
-        except Exception as e:
-            print(f"Error generating next stage: {e}")
+        except Exception:
+            logger.exception("Error generating next stage")
     
     def _allocate_next_action(self, user_id: str, context: Dict[str, Any]) -> None:
         """Mark next pending action as current/prioritized"""
@@ -757,7 +1049,7 @@ Return ONLY JSON:
             attempted_solutions=attempted_solutions
         )
         if result["status"] == "success":
-            print(f"Blocker recorded for action '{action_id}'")
+            logger.info("Blocker recorded for action '%s'", action_id)
         return result
     
     def get_student_context(self, user_id: str) -> Dict[str, Any]:
@@ -770,149 +1062,196 @@ Return ONLY JSON:
     
     def apply_alternative_path(self, user_id: str, alternative_path: Dict[str, Any], path_type: str = "alternative", option_index: int = None) -> Dict[str, Any]:
         """Apply a selected alternative path and update all context"""
-        print(f"\nApplying alternative path for {user_id}...")
+        logger.info("Applying alternative path for %s...", user_id)
+        
+        # Path, action and feedback agents plus the consistency check all
+        # update this context; one load and one write for the whole switch
+        with self.context_manager.batch(user_id):
+            try:
+                context = self.context_manager.load_context(user_id)
+                now = datetime.now().isoformat()
+                active_path = context["active_path"]
+                reroute_history = context["reroute_history"]
+                progress = context["progress"]
+                current_actions = context["current_actions"]
+                
+                if not active_path.get("original_target_role"):
+                    active_path["original_target_role"] = active_path.get("target_role")
+                
+                path_change = {
+                    "timestamp": now,
+                    "type": path_type,
+                    "from_role": active_path.get("target_role"),
+                    "to_role": alternative_path.get("new_target_role"),
+                    "option_index": option_index,
+                    "success_probability": alternative_path.get("success_probability", 0.0),
+                    "reason": "User selected after rerouting analysis"
+                }
+                
+                if path_type == "alternative":
+                    active_path["target_role"] = alternative_path.get("new_target_role")
+                    active_path["success_probability"] = alternative_path.get("success_probability", 0.0)
+                    active_path["status"] = "not_started"
+                    active_path["current_path_type"] = "alternative"
+                else:
+                    active_path["status"] = "not_started"
+                    active_path["current_path_type"] = "adjusted_original"
+                    if "extended_timeline_months" in alternative_path:
+                        active_path["original_timeline_months"] = alternative_path.get("extended_timeline_months")
+                
+                active_path.setdefault("path_change_history", []).append(path_change)
+                
+                reroute_history["reroute_count"] += 1
+                reroute_history["selected_alternative"] = {
+                    "selected_role": alternative_path.get("new_target_role"),
+                    "timestamp": now,
+                    "type": path_type
+                }
+                reroute_history.setdefault("applied_changes", []).append({
+                    "timestamp": now,
+                    "change": f"Applied {path_type}: {alternative_path.get('new_target_role')}"
+                })
+                
+                progress["completed_steps"] = []
+                progress["current_step"] = None
+                progress["completion_rate"] = 0.0
+                progress["time_spent_hours"] = 0.0
+                
+                current_actions["completed_actions"].extend(current_actions["pending_actions"])
+                current_actions["pending_actions"] = []
+                current_actions["priority_actions"] = []
+                progress.pop("stage_counts", None)
+                
+                self.context_manager.save_context(user_id, context)
+                
+                logger.debug("Regenerating career path, action plan and feedback for new role: %s",
+                             alternative_path.get("new_target_role"))
+                path_result, action_result, feedback_result = asyncio.run(
+                    self._regenerate_for_path_async(user_id)
+                )
+                
+                # Whatever context the agents saved last (the batch hands it back)
+                context = self.context_manager.load_context(user_id)
+                consistency_check = self._validate_consistency(user_id, context)
+                
+                return {
+                    "status": "success",
+                    "message": f"Successfully applied alternative path: {alternative_path.get('new_target_role')}",
+                    "path_change": path_change,
+                    "consistency_check": consistency_check,
+                    "agents_updated": ["path_planning", "action_recommendation", "feedback_learning"],
+                    "new_context": context
+                }
+                
+            except Exception as e:
+                logger.exception("Error applying alternative path")
+                return {
+                    "status": "failure",
+                    "message": f"Failed to apply alternative path: {str(e)}",
+                    "error": str(e)
+                }
+    
+    async def _regenerate_for_path_async(self, user_id: str) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Regenerate the career path after a path change, then the action plan
+        and progress feedback concurrently: actions are planned from the new
+        path, while feedback only reads the saved progress
+        
+        Runs on the caller's thread, so an open context batch is shared by all
+        three agents
+        
+        Returns:
+            (path result, action result, feedback result)
+        """
+        from .utils.async_client import close_async_client
         
         try:
-            context = self.context_manager.load_context(user_id)
-            
-            if not context["active_path"].get("original_target_role"):
-                context["active_path"]["original_target_role"] = context["active_path"].get("target_role")
-            
-            path_change = {
-                "timestamp": datetime.now().isoformat(),
-                "type": path_type,
-                "from_role": context["active_path"].get("target_role"),
-                "to_role": alternative_path.get("new_target_role"),
-                "option_index": option_index,
-                "success_probability": alternative_path.get("success_probability", 0.0),
-                "reason": "User selected after rerouting analysis"
-            }
-            
-            if path_type == "alternative":
-                context["active_path"]["target_role"] = alternative_path.get("new_target_role")
-                context["active_path"]["success_probability"] = alternative_path.get("success_probability", 0.0)
-                context["active_path"]["status"] = "not_started"
-                context["active_path"]["current_path_type"] = "alternative"
-            else:
-                context["active_path"]["status"] = "not_started"
-                context["active_path"]["current_path_type"] = "adjusted_original"
-                if "extended_timeline_months" in alternative_path:
-                    context["active_path"]["original_timeline_months"] = alternative_path.get("extended_timeline_months")
-            
-            context["active_path"]["path_change_history"].append(path_change)
-            
-            context["reroute_history"]["reroute_count"] += 1
-            context["reroute_history"]["selected_alternative"] = {
-                "selected_role": alternative_path.get("new_target_role"),
-                "timestamp": datetime.now().isoformat(),
-                "type": path_type
-            }
-            context["reroute_history"]["applied_changes"].append({
-                "timestamp": datetime.now().isoformat(),
-                "change": f"Applied {path_type}: {alternative_path.get('new_target_role')}"
-            })
-            
-            context["progress"]["completed_steps"] = []
-            context["progress"]["current_step"] = None
-            context["progress"]["completion_rate"] = 0.0
-            context["progress"]["time_spent_hours"] = 0.0
-            
-            context["current_actions"]["completed_actions"].extend(context["current_actions"]["pending_actions"])
-            context["current_actions"]["pending_actions"] = []
-            context["current_actions"]["priority_actions"] = []
-            
-            self.context_manager.save_context(user_id, context)
-            
-            print(f"  Regenerating career path for new role: {alternative_path.get('new_target_role')}")
-            path_result = self.path_agent.generate_path(user_id=user_id, duration_weeks=12)
-            
-            print(f"  Generating new action plan")
-            action_result = self.action_agent.generate_actions(user_id=user_id)
-            
-            print(f"  Regenerating feedback for new context")
-            feedback_result = self.feedback_agent.evaluate_progress(user_id=user_id)
-            
-            consistency_check = self._validate_consistency(user_id)
-            
-            return {
-                "status": "success",
-                "message": f"Successfully applied alternative path: {alternative_path.get('new_target_role')}",
-                "path_change": path_change,
-                "consistency_check": consistency_check,
-                "agents_updated": ["path_planning", "action_recommendation", "feedback_learning"],
-                "new_context": self.context_manager.load_context(user_id)
-            }
-            
-        except Exception as e:
-            print(f"Error applying alternative path: {str(e)}")
-            return {
-                "status": "failure",
-                "message": f"Failed to apply alternative path: {str(e)}",
-                "error": str(e)
-            }
+            path_result = await self.path_agent.generate_path_async(user_id=user_id, duration_weeks=12)
+            action_result, feedback_result = await asyncio.gather(
+                self.action_agent.generate_actions_async(user_id=user_id),
+                self.feedback_agent.evaluate_progress_async(user_id=user_id)
+            )
+            return path_result, action_result, feedback_result
+        finally:
+            await close_async_client()
     
     def apply_adjusted_original_path(self, user_id: str, adjusted_path: Dict[str, Any]) -> Dict[str, Any]:
         """Apply adjusted version of original path (extended timeline, modifications)"""
-        print(f"\nApplying adjusted original path for {user_id}...")
+        logger.info("Applying adjusted original path for %s...", user_id)
         
-        try:
-            context = self.context_manager.load_context(user_id)
-            
-            # Update timeline and modifications
-            if "extended_timeline_months" in adjusted_path:
-                context["active_path"]["timeline_months"] = adjusted_path["extended_timeline_months"]
-            
-            # Mark as adjusted
-            context["active_path"]["is_adjusted"] = True
-            context["active_path"]["adjustment_reason"] = "User selected adjusted timeline due to high deviation risk"
-            
-            path_change = {
-                "timestamp": datetime.now().isoformat(),
-                "type": "adjusted_original",
-                "role": context["active_path"].get("target_role"),
-                "new_timeline_months": adjusted_path.get("extended_timeline_months"),
-                "modifications": adjusted_path.get("modifications", []),
-                "reason": "User adjusted pace to reduce deviation risk"
-            }
-            
-            context["active_path"]["path_change_history"].append(path_change)
-            
-            context["reroute_history"]["reroute_count"] += 1
-            context["reroute_history"]["selected_alternative"] = {
-                "selected_option": "adjusted_original",
-                "timestamp": datetime.now().isoformat(),
-                "new_timeline": adjusted_path.get("extended_timeline_months")
-            }
-            
-            self.context_manager.save_context(user_id, context)
-            
-            print(f"  Applied adjusted timeline: {adjusted_path.get('extended_timeline_months')} months")
-            
-            return {
-                "status": "success",
-                "message": f"Successfully applied adjusted original path with extended timeline",
-                "path_change": path_change,
-                "new_context": self.context_manager.load_context(user_id)
-            }
-            
-        except Exception as e:
-            print(f"Error applying adjusted original path: {str(e)}")
-            return {
-                "status": "failure",
-                "message": f"Failed to apply adjusted original path: {str(e)}",
-                "error": str(e)
-            }
+        # Read and written once, whatever the helpers below touch
+        with self.context_manager.batch(user_id):
+            try:
+                context = self.context_manager.load_context(user_id)
+                now = datetime.now().isoformat()
+                
+                # Update timeline and modifications
+                if "extended_timeline_months" in adjusted_path:
+                    context["active_path"]["timeline_months"] = adjusted_path["extended_timeline_months"]
+                
+                # Mark as adjusted
+                context["active_path"]["is_adjusted"] = True
+                context["active_path"]["adjustment_reason"] = "User selected adjusted timeline due to high deviation risk"
+                
+                path_change = {
+                    "timestamp": now,
+                    "type": "adjusted_original",
+                    "role": context["active_path"].get("target_role"),
+                    "new_timeline_months": adjusted_path.get("extended_timeline_months"),
+                    "modifications": adjusted_path.get("modifications", []),
+                    "reason": "User adjusted pace to reduce deviation risk"
+                }
+                
+                context["active_path"].setdefault("path_change_history", []).append(path_change)
+                
+                context["reroute_history"]["reroute_count"] += 1
+                context["reroute_history"]["selected_alternative"] = {
+                    "selected_option": "adjusted_original",
+                    "timestamp": now,
+                    "new_timeline": adjusted_path.get("extended_timeline_months")
+                }
+                
+                self.context_manager.save_context(user_id, context)
+                
+                logger.info("Applied adjusted timeline: %s months", adjusted_path.get('extended_timeline_months'))
+                
+                return {
+                    "status": "success",
+                    "message": f"Successfully applied adjusted original path with extended timeline",
+                    "path_change": path_change,
+                    "new_context": context
+                }
+                
+            except Exception as e:
+                logger.exception("Error applying adjusted original path")
+                return {
+                    "status": "failure",
+                    "message": f"Failed to apply adjusted original path: {str(e)}",
+                    "error": str(e)
+                }
     
-    def _validate_consistency(self, user_id: str) -> Dict[str, Any]:
-        """Validate that all agents' data is consistent and relevant"""
-        print(f"  Validating consistency across all agents...")
+    def _validate_consistency(self, user_id: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Validate that all agents' data is consistent and relevant
         
-        context = self.context_manager.load_context(user_id)
+        Args:
+            user_id: User identifier
+            context: The user's current context, if the caller already has it;
+                fixes are applied to it in place
+        """
+        logger.debug("Validating consistency across all agents")
+        
+        if context is None:
+            context = self.context_manager.load_context(user_id)
+        career_goals = context["career_goals"]
+        active_path = context["active_path"]
+        progress = context["progress"]
+        regenerate_actions = False
         issues = []
         fixes = []
         
-        current_goal = context["career_goals"].get("current_goal")
-        active_role = context["active_path"].get("target_role")
+        current_goal = career_goals.get("current_goal")
+        active_role = active_path.get("target_role")
         
         # Handle current_goal being either a string or dict
         if isinstance(current_goal, dict):
@@ -921,28 +1260,28 @@ Return ONLY JSON:
         if current_goal and active_role and str(current_goal).lower() != str(active_role).lower():
             issue = f"Goal mismatch: Career goal '{current_goal}' != Active path '{active_role}'"
             issues.append(issue)
-            context["career_goals"]["current_goal"] = active_role
-            context["career_goals"]["interpreted_goal"]["role_title"] = active_role
+            career_goals["current_goal"] = active_role
+            career_goals["interpreted_goal"]["role_title"] = active_role
             fixes.append(f"Fixed: Updated career goal to '{active_role}'")
         
-        if context["active_path"].get("primary_path"):
-            path_skills = self._extract_skills_from_path(context["active_path"]["primary_path"])
-            required_skills = context["career_goals"].get("interpreted_goal", {}).get("required_skills", [])
+        if active_path.get("primary_path"):
+            path_skills = self._extract_skills_from_path(active_path["primary_path"])
+            required_skills = career_goals.get("interpreted_goal", {}).get("required_skills", [])
             
-            missing_skills = set(required_skills) - set(path_skills)
+            # Probes the path's set directly; keeps the goal's skill order
+            missing_skills = [skill for skill in dict.fromkeys(required_skills) if skill not in path_skills]
             if missing_skills:
-                issue = f"Skills gap: Required skills {list(missing_skills)} not in path"
+                issue = f"Skills gap: Required skills {missing_skills} not in path"
                 issues.append(issue)
-                fixes.append(f"Note: Path missing skills {list(missing_skills)} - agents should address")
+                fixes.append(f"Note: Path missing skills {missing_skills} - agents should address")
         
-        pending_actions = context["current_actions"].get("pending_actions", [])
-        action_count = len(pending_actions)
+        action_count = len(context["current_actions"].get("pending_actions") or ())
         
-        if action_count == 0 and context["active_path"]["status"] != "completed":
+        if action_count == 0 and active_path["status"] != "completed":
             issue = f"No pending actions for active path '{active_role}'"
             issues.append(issue)
             fixes.append("Regenerating action plan...")
-            self.action_agent.generate_actions(user_id=user_id)
+            regenerate_actions = True
         
         confidence = context["readiness"].get("confidence_score", 0.5)
         if confidence < 0.4:
@@ -950,18 +1289,24 @@ Return ONLY JSON:
             issues.append(issue)
             fixes.append("Readiness reassessment recommended after path change")
         
-        completion_rate = context["progress"].get("completion_rate", 0.0)
-        path_status = context["active_path"].get("status")
+        completion_rate = progress.get("completion_rate", 0.0)
+        path_status = active_path.get("status")
         
         if path_status == "not_started" and completion_rate > 0:
             issue = f"Status mismatch: Path status '{path_status}' but completion {completion_rate*100:.0f}%"
             issues.append(issue)
-            context["progress"]["completed_steps"] = []
-            context["progress"]["completion_rate"] = 0.0
+            progress["completed_steps"] = []
+            progress["completion_rate"] = 0.0
             fixes.append("Reset progress tracking for new path")
         
         self.context_manager.save_context(user_id, context)
         
+        # Regenerate after the save so it isn't overwritten, then pick up the
+        # agent's write in the caller's dict
+        if regenerate_actions:
+            self.action_agent.generate_actions(user_id=user_id)
+            context.update(self.context_manager.load_context(user_id))
+        
         return {
             "consistent": len(issues) == 0,
             "issues_found": issues,
@@ -970,7 +1315,7 @@ Return ONLY JSON:
             "total_fixes": len(fixes)
         }
     
-    def _extract_skills_from_path(self, path: Dict[str, Any]) -> List[str]:
+    def _extract_skills_from_path(self, path: Dict[str, Any]) -> Set[str]:
         """Extract all skills mentioned in a career path"""
         skills = set()
         
@@ -982,88 +1327,90 @@ Return ONLY JSON:
                     if isinstance(step_skills, list):
                         skills.update(step_skills)
         
-        return list(skills)
+        return skills
     
     def revert_to_original_path(self, user_id: str) -> Dict[str, Any]:
         """Revert from alternative path back to original target path after completing mission"""
-        print(f"\nReverting to original path for {user_id}...")
+        logger.info("Reverting to original path for %s...", user_id)
         
-        try:
-            context = self.context_manager.load_context(user_id)
-            
-            # Check if there's an original path to revert to
-            original_role = context["active_path"].get("original_target_role")
-            if not original_role:
+        # Shared with the agents regenerating the reverted path; written on exit
+        with self.context_manager.batch(user_id):
+            try:
+                context = self.context_manager.load_context(user_id)
+                now = datetime.now().isoformat()
+                
+                # Check if there's an original path to revert to
+                original_role = context["active_path"].get("original_target_role")
+                if not original_role:
+                    return {
+                        "status": "error",
+                        "message": "No original path found to revert to"
+                    }
+                
+                # Check if alternative path is sufficiently completed
+                alternative_role = context["active_path"].get("target_role")
+                completion_on_alternative = context["progress"].get("completion_rate", 0)
+                
+                if completion_on_alternative < 0.6:  # At least 60% completion
+                    return {
+                        "status": "warning",
+                        "message": f"Alternative path only {completion_on_alternative*100:.0f}% complete. Recommend more progress before reverting."
+                    }
+                
+                # Record the reversal
+                path_change = {
+                    "timestamp": now,
+                    "type": "reversion",
+                    "from_role": alternative_role,
+                    "to_role": original_role,
+                    "reason": "Reverted after completing alternative mission",
+                    "alternative_completion": completion_on_alternative
+                }
+                
+                # Update context
+                context["active_path"]["target_role"] = original_role
+                context["active_path"]["status"] = "resumed"
+                context["active_path"]["current_path_type"] = "original"
+                context["active_path"].setdefault("path_change_history", []).append(path_change)
+                
+                context["reroute_history"]["reroute_count"] += 1
+                context["reroute_history"].setdefault("applied_changes", []).append({
+                    "timestamp": now,
+                    "change": f"Reverted from {alternative_role} back to original path: {original_role}"
+                })
+                
+                # Keep progress but mark as resumed
+                context["progress"]["status"] = "resumed_from_alternative"
+                context["progress"]["alternative_completion_rate"] = completion_on_alternative
+                context["progress"]["last_reversion_time"] = now
+                
+                self.context_manager.save_context(user_id, context)
+                
+                logger.debug("Regenerating career path, action plan and feedback for reverted role: %s",
+                             original_role)
+                path_result, action_result, feedback_result = asyncio.run(
+                    self._regenerate_for_path_async(user_id)
+                )
+                
+                # Whatever context the agents saved last (the batch hands it back)
+                context = self.context_manager.load_context(user_id)
+                consistency_check = self._validate_consistency(user_id, context)
+                
                 return {
-                    "status": "error",
-                    "message": "No original path found to revert to"
+                    "status": "success",
+                    "message": f"Successfully reverted to original path: {original_role}",
+                    "path_change": path_change,
+                    "consistency_check": consistency_check,
+                    "new_context": context
                 }
-            
-            # Check if alternative path is sufficiently completed
-            alternative_role = context["active_path"].get("target_role")
-            completion_on_alternative = context["progress"].get("completion_rate", 0)
-            
-            if completion_on_alternative < 0.6:  # At least 60% completion
+                
+            except Exception as e:
+                logger.exception("Error reverting to original path")
                 return {
-                    "status": "warning",
-                    "message": f"Alternative path only {completion_on_alternative*100:.0f}% complete. Recommend more progress before reverting."
+                    "status": "error",
+                    "message": f"Failed to revert path: {str(e)}",
+                    "error": str(e)
                 }
-            
-            # Record the reversal
-            path_change = {
-                "timestamp": datetime.now().isoformat(),
-                "type": "reversion",
-                "from_role": alternative_role,
-                "to_role": original_role,
-                "reason": "Reverted after completing alternative mission",
-                "alternative_completion": completion_on_alternative
-            }
-            
-            # Update context
-            context["active_path"]["target_role"] = original_role
-            context["active_path"]["status"] = "resumed"
-            context["active_path"]["current_path_type"] = "original"
-            context["active_path"]["path_change_history"].append(path_change)
-            
-            context["reroute_history"]["reroute_count"] += 1
-            context["reroute_history"]["applied_changes"].append({
-                "timestamp": datetime.now().isoformat(),
-                "change": f"Reverted from {alternative_role} back to original path: {original_role}"
-            })
-            
-            # Keep progress but mark as resumed
-            context["progress"]["status"] = "resumed_from_alternative"
-            context["progress"]["alternative_completion_rate"] = completion_on_alternative
-            context["progress"]["last_reversion_time"] = datetime.now().isoformat()
-            
-            self.context_manager.save_context(user_id, context)
-            
-            print(f"  Regenerating career path for reverted role: {original_role}")
-            path_result = self.path_agent.generate_path(user_id=user_id, duration_weeks=12)
-            
-            print(f"  Generating new action plan")
-            action_result = self.action_agent.generate_actions(user_id=user_id)
-            
-            print(f"  Regenerating feedback")
-            feedback_result = self.feedback_agent.evaluate_progress(user_id=user_id)
-            
-            consistency_check = self._validate_consistency(user_id)
-            
-            return {
-                "status": "success",
-                "message": f"Successfully reverted to original path: {original_role}",
-                "path_change": path_change,
-                "consistency_check": consistency_check,
-                "new_context": self.context_manager.load_context(user_id)
-            }
-            
-        except Exception as e:
-            print(f"Error reverting to original path: {str(e)}")
-            return {
-                "status": "error",
-                "message": f"Failed to revert path: {str(e)}",
-                "error": str(e)
-            }
     
     def get_next_action(self, user_id: str) -> Dict[str, Any]:
         """Get the next pending action allocated for the student"""
@@ -1092,9 +1439,7 @@ Return ONLY JSON:
         Each step contains 3 initial actions.
         Returns structured roadmap stored in user context.
         """
-        print(f"\n{'='*70}")
-        print(f"GENERATING ROADMAP for {user_id}...")
-        print(f"{'='*70}")
+        logger.info("GENERATING ROADMAP for %s...", user_id)
         self._log_api_usage("ROADMAP_GENERATION", "CareerPathPlanningAgent", 2)
         
         try:
@@ -1149,62 +1494,72 @@ Return ONLY valid JSON:
   }}
 }}"""
             
-            content = self._call_llm_with_retry(prompt, max_tokens=3000)
-            
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if not json_match:
-                raise ValueError("Failed to extract JSON from LLM response")
+            # Cached below once the roadmap validates
+            cache_key = llm_cache_key("llama-3.3-70b-versatile", prompt, 0.3, 3000)
+            content = self.llm_cache.get(cache_key)
+            if content is None:
+                content = self._call_llm_with_retry(prompt, max_tokens=3000)
             
-            roadmap_data = json.loads(json_match.group())
+            # Typed once here; the stored roadmap stays plain JSON-ready dicts
+            roadmap_data = RoadmapResult.model_validate(decode_first_json(content, "{")).roadmap
+            self.llm_cache.set(cache_key, content)
             
             # Structure roadmap in context
+            created = datetime.now()
             roadmap_structure = {
-                "roadmap_id": f"{user_id}_roadmap_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                "total_steps": roadmap_data["roadmap"]["total_steps"],
+                "roadmap_id": f"{user_id}_roadmap_{created.strftime('%Y%m%d_%H%M%S')}",
+                "total_steps": roadmap_data.total_steps or len(roadmap_data.steps),
                 "steps": [],
                 "current_step_number": 1,
                 "completed_steps": [],
-                "created_at": datetime.now().isoformat(),
+                "created_at": created.isoformat(),
                 "status": "in_progress"
             }
             
             # Initialize all steps with structure
-            for step_data in roadmap_data["roadmap"]["steps"]:
-                step = {
-                    "step_number": step_data["step_number"],
-                    "title": step_data["title"],
-                    "description": step_data["description"],
-                    "actions": [],
-                    "status": "pending" if step_data["step_number"] > 1 else "in_progress",
+            roadmap_structure["steps"] = [
+                {
+                    "step_number": step_data.step_number,
+                    "title": step_data.title,
+                    "description": step_data.description,
+                    "actions": [
+                        {
+                            "action_id": action_data.action_id,
+                            "title": action_data.title,
+                            "description": action_data.description,
+                            "success_criteria": action_data.success_criteria,
+                            "status": "pending",
+                            "questions": [],
+                            "user_answers": [],
+                            "relevance_score": 0.0,
+                            "agent_satisfied": False,
+                            "attempts": 0,
+                            "completion_timestamp": None
+                        }
+                        for action_data in step_data.actions
+                    ],
+                    "status": "pending" if step_data.step_number > 1 else "in_progress",
                     "completion_percentage": 0.0
                 }
-                
-                # Add actions to step
-                for action_data in step_data.get("actions", []):
-                    action = {
-                        "action_id": action_data["action_id"],
-                        "title": action_data["title"],
-                        "description": action_data["description"],
-                        "success_criteria": action_data.get("success_criteria", ""),
-                        "status": "pending",
-                        "questions": [],
-                        "user_answers": [],
-                        "relevance_score": 0.0,
-                        "agent_satisfied": False,
-                        "attempts": 0,
-                        "completion_timestamp": None
-                    }
-                    step["actions"].append(action)
-                
-                roadmap_structure["steps"].append(step)
+                for step_data in roadmap_data.steps
+            ]
+            
+            # step_number -> action_id -> [step index, action index], so action
+            # lookups don't scan every step
+            roadmap_structure["action_positions"] = {
+                str(step["step_number"]): {
+                    action["action_id"]: [step_index, action_index]
+                    for action_index, action in enumerate(step["actions"])
+                }
+                for step_index, step in enumerate(roadmap_structure["steps"])
+            }
             
             context["roadmap"] = roadmap_structure
             self.context_manager.save_context(user_id, context)
             
-            print(f"✅ Roadmap generated: {roadmap_structure['total_steps']} steps")
-            print(f"   First step: {roadmap_structure['steps'][0]['title']}")
-            print(f"   First step actions: {len(roadmap_structure['steps'][0]['actions'])} actions")
+            logger.info("Roadmap generated: %s steps", roadmap_structure['total_steps'])
+            logger.debug("First step: %s (%d actions)",
+                         roadmap_structure["steps"][0]["title"], len(roadmap_structure["steps"][0]["actions"]))
             
             return {
                 "status": "success",
@@ -1213,44 +1568,50 @@ Return ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Error generating roadmap: {e}")
+            logger.exception("Error generating roadmap")
             return {
                 "status": "error",
                 "message": str(e)
             }
     
+    def _find_roadmap_action(self, roadmap: Dict[str, Any], step_number: int, action_id: str) -> Optional[Dict[str, Any]]:
+        """Action action_id of roadmap step step_number, or None"""
+        position = roadmap.get("action_positions", {}).get(str(step_number), {}).get(action_id)
+        if position is not None:
+            step_index, action_index = position
+            steps = roadmap.get("steps", [])
+            if step_index < len(steps) and action_index < len(steps[step_index].get("actions", [])):
+                action = steps[step_index]["actions"][action_index]
+                if action.get("action_id") == action_id:
+                    return action
+        
+        # Roadmaps saved before positions were recorded (or since edited)
+        for step in roadmap.get("steps", []):
+            if step["step_number"] == step_number:
+                for action in step.get("actions", []):
+                    if action.get("action_id") == action_id or action.get("id") == action_id:
+                        return action
+                return None
+        return None
+    
     def complete_action_in_roadmap(self, user_id: str, step_number: int, action_id: str) -> Dict[str, Any]:
         """
         Mark an action as complete in the roadmap.
         Delegate to ActionRecommendationAgent to generate validation questions.
         Search in both roadmap steps and current_actions.
         """
-        print(f"\nCompleting action {action_id} in step {step_number}...")
+        logger.info("Completing action %s in step %s...", action_id, step_number)
         
         try:
             context = self.context_manager.load_context(user_id)
             roadmap = context.get("roadmap", {})
             
             # Find the action in roadmap steps first
-            target_step = None
-            target_action = None
-            
-            for step in roadmap.get("steps", []):
-                if step["step_number"] == step_number:
-                    target_step = step
-                    for action in step.get("actions", []):
-                        if action.get("action_id") == action_id or action.get("id") == action_id:
-                            target_action = action
-                            break
-                    break
+            target_action = self._find_roadmap_action(roadmap, step_number, action_id)
             
             # If not found in roadmap, search in current_actions
             if not target_action:
-                all_actions = context.get("current_actions", {}).get("pending_actions", []) + context.get("current_actions", {}).get("completed_actions", [])
-                for action in all_actions:
-                    if action.get("action_id") == action_id or action.get("id") == action_id or action.get("title") == action_id:
-                        target_action = action
-                        break
+                target_action = self._find_action(context.get("current_actions", {}), action_id)
             
             if not target_action:
                 return {"status": "error", "message": "Action not found in roadmap or current actions"}
@@ -1260,7 +1621,7 @@ Return ONLY valid JSON:
             target_action["attempts"] = target_action.get("attempts", 0) + 1
             
             # DELEGATE TO ActionRecommendationAgent to generate questions
-            print(f"→ Delegating to ActionRecommendationAgent for question generation...")
+            logger.info("Delegating to ActionRecommendationAgent for question generation...")
             result = self.action_agent.generate_validation_questions(user_id, target_action)
             
             if result["status"] == "success":
@@ -1278,9 +1639,7 @@ Return ONLY valid JSON:
                 return {"status": "error", "message": result.get("message", "Failed to generate questions")}
             
         except Exception as e:
-            print(f"Error completing action: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error completing action")
             return {"status": "error", "message": str(e)}
     
     def submit_action_answers(self, user_id: str, step_number: int, action_id: str, answers: List[str]) -> Dict[str, Any]:
@@ -1289,32 +1648,18 @@ Return ONLY valid JSON:
         Delegate to FeedbackLearningAgent for evaluation.
         Search in both roadmap steps and current_actions.
         """
-        print(f"\nEvaluating answers for action {action_id}...")
+        logger.info("Evaluating answers for action %s...", action_id)
         
         try:
             context = self.context_manager.load_context(user_id)
             roadmap = context.get("roadmap", {})
             
             # Find the action in roadmap steps first
-            target_step = None
-            target_action = None
-            
-            for step in roadmap.get("steps", []):
-                if step["step_number"] == step_number:
-                    target_step = step
-                    for action in step.get("actions", []):
-                        if action.get("action_id") == action_id or action.get("id") == action_id:
-                            target_action = action
-                            break
-                    break
+            target_action = self._find_roadmap_action(roadmap, step_number, action_id)
             
             # If not found in roadmap, search in current_actions
             if not target_action:
-                all_actions = context.get("current_actions", {}).get("pending_actions", []) + context.get("current_actions", {}).get("completed_actions", [])
-                for action in all_actions:
-                    if action.get("action_id") == action_id or action.get("id") == action_id or action.get("title") == action_id:
-                        target_action = action
-                        break
+                target_action = self._find_action(context.get("current_actions", {}), action_id)
             
             if not target_action:
                 return {"status": "error", "message": "Action not found in roadmap or current actions"}
@@ -1327,7 +1672,7 @@ Return ONLY valid JSON:
             target_action["user_answers"] = answers
             
             # DELEGATE TO FeedbackLearningAgent to evaluate answers
-            print(f"→ Delegating to FeedbackLearningAgent for answer evaluation...")
+            logger.info("Delegating to FeedbackLearningAgent for answer evaluation...")
             evaluation = self.feedback_agent.evaluate_action_answers(user_id, target_action, answers)
             
             target_action["relevance_score"] = evaluation.get("relevance_score", 0)
@@ -1336,17 +1681,17 @@ Return ONLY valid JSON:
             if evaluation.get("agent_satisfied"):
                 target_action["status"] = "completed"
                 target_action["completion_timestamp"] = datetime.now().isoformat()
-                print(f"✅ Action '{action_id}' marked COMPLETE (score: {evaluation['relevance_score']:.2f})")
+                logger.info("Action '%s' marked COMPLETE (score: %.2f)", action_id, evaluation['relevance_score'])
                 
                 # Check if step is complete
                 self._check_step_completion(user_id, context, step_number)
             else:
                 target_action["status"] = "pending"
-                print(f"⏸️  Action '{action_id}' needs more work (score: {evaluation['relevance_score']:.2f})")
+                logger.info("Action '%s' needs more work (score: %.2f)", action_id, evaluation['relevance_score'])
                 
                 # Auto-detect deviation after 3 failed attempts
                 if target_action.get("attempts", 0) >= 3:
-                    print(f"⚠️  AUTO-DETECTED: Action failed {target_action['attempts']} times. Triggering rerouting...")
+                    logger.warning("AUTO-DETECTED: Action failed %s times. Triggering rerouting...", target_action['attempts'])
                     context["reroute_state"]["is_rerouting"] = True
                     context["reroute_state"]["auto_detected"] = True
                     context["reroute_state"]["failed_action_id"] = action_id
@@ -1364,9 +1709,7 @@ Return ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Error evaluating answers: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error evaluating answers")
             return {"status": "error", "message": str(e)}
     
     
@@ -1392,9 +1735,9 @@ Return ONLY valid JSON:
         
         # If all actions satisfied, move to next step
         if completed_actions == total_actions and total_actions > 0:
-            print(f"\n🎉 Step {step_number} COMPLETE!")
+            logger.info("Step %s COMPLETE!", step_number)
             target_step["status"] = "completed"
-            roadmap["completed_steps"].append(step_number)
+            roadmap.setdefault("completed_steps", []).append(step_number)
             
             # Move to next step if available
             if step_number < roadmap.get("total_steps", 0):
@@ -1403,12 +1746,12 @@ Return ONLY valid JSON:
                     if step["step_number"] == next_step_number:
                         step["status"] = "in_progress"
                         roadmap["current_step_number"] = next_step_number
-                        print(f"✅ Starting Step {next_step_number}: {step['title']}")
+                        logger.info("Starting Step %s: %s", next_step_number, step['title'])
                         break
             else:
                 # All steps complete!
                 roadmap["status"] = "completed"
-                print(f"\n🏆 ALL STEPS COMPLETE! Roadmap finished!")
+                logger.info("ALL STEPS COMPLETE! Roadmap finished!")
             
             self.context_manager.save_context(user_id, context)
     
@@ -1455,9 +1798,7 @@ Return ONLY valid JSON:
         Detect deviation and create alternative roadmaps.
         User can select one or continue with adjusted original.
         """
-        print(f"\n{'='*70}")
-        print(f"DETECTING DEVIATION & GENERATING ALTERNATIVES for {user_id}...")
-        print(f"{'='*70}")
+        logger.info("DETECTING DEVIATION & GENERATING ALTERNATIVES for %s...", user_id)
         self._log_api_usage("REROUTING", "ReroutingAgent", 3)
         
         try:
@@ -1495,14 +1836,14 @@ Return ONLY valid JSON:
   }}
 }}"""
             
-            content = self._call_llm_with_retry(prompt, max_tokens=2000)
-            
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if not json_match:
-                raise ValueError("Failed to extract JSON")
+            # Cached below once the options parse
+            cache_key = llm_cache_key("llama-3.3-70b-versatile", prompt, 0.3, 2000)
+            content = self.llm_cache.get(cache_key)
+            if content is None:
+                content = self._call_llm_with_retry(prompt, max_tokens=2000)
             
-            reroute_data = json.loads(json_match.group())
+            reroute_data = decode_first_json(content, "{")
+            self.llm_cache.set(cache_key, content)
             
             # Store alternatives in context
             context["reroute_state"]["is_rerouting"] = True
@@ -1523,7 +1864,7 @@ Return ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Error during rerouting: {e}")
+            logger.exception("Error during rerouting")
             return {"status": "error", "message": str(e)}
     
     def select_reroute_option(self, user_id: str, option_id) -> Dict[str, Any]:
@@ -1531,7 +1872,7 @@ Return ONLY valid JSON:
         User selects a reroute option.
         Generate new roadmap and update context.
         """
-        print(f"\nApplying selected reroute option for {user_id}...")
+        logger.info("Applying selected reroute option for %s...", user_id)
         
         try:
             context = self.context_manager.load_context(user_id)
@@ -1575,7 +1916,7 @@ Return ONLY valid JSON:
                 }
             
             # Generate new roadmap
-            print(f"  Generating new roadmap for role: {new_role}")
+            logger.info("Generating new roadmap for role: %s", new_role)
             roadmap_result = self.generate_roadmap(user_id)
             
             if roadmap_result["status"] != "success":
@@ -1592,7 +1933,7 @@ Return ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Error applying reroute: {e}")
+            logger.exception("Error applying reroute")
             return {"status": "error", "message": str(e)}
     
     def complete_rerouted_roadmap(self, user_id: str) -> Dict[str, Any]:
@@ -1600,7 +1941,7 @@ Return ONLY valid JSON:
         Student completes rerouted roadmap.
         Redirect back to original target if applicable.
         """
-        print(f"\nCompleting rerouted roadmap for {user_id}...")
+        logger.info("Completing rerouted roadmap for %s...", user_id)
         
         try:
             context = self.context_manager.load_context(user_id)
@@ -1615,7 +1956,7 @@ Return ONLY valid JSON:
                 }
             
             # Regenerate original roadmap
-            print(f"  Regenerating original roadmap...")
+            logger.info("Regenerating original roadmap...")
             
             # Store reroute completion info
             reroute_state["alternative_completion_percentage"] = 1.0
@@ -1634,5 +1975,5 @@ Return ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Error completing rerouted roadmap: {e}")
+            logger.exception("Error completing rerouted roadmap")
             return {"status": "error", "message": str(e)}
@@ -4,12 +4,18 @@ Manages persistent storage and retrieval of all user-related data
 across agent interactions.
 """
 
-import json
+import copy
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from pathlib import Path
 
+from .utils.json_utils import dumps_indented, loads
+
 
 class UserContextManager:
     """
@@ -17,6 +23,9 @@ class UserContextManager:
     All agents MUST read from and write to this context.
     """
     
+    # Parsed context files kept for get_sections
+    PARSED_CACHE_SIZE = 128
+    
     def __init__(self, context_dir: str = None):
         """
         Initialize context manager
@@ -30,6 +39,21 @@ class UserContextManager:
         
         self.context_dir = Path(context_dir)
         self.context_dir.mkdir(exist_ok=True, parents=True)
+        
+        # Serializes read-modify-write cycles done through apply_updates
+        self._lock = threading.RLock()
+        
+        # Per-thread write batches opened with batch(user_id)
+        self._local = threading.local()
+        
+        # Background writers for submit_write; last queued write per user
+        self._writer_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="context-writer")
+        self._pending_writes: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        
+        # user_id -> ((mtime_ns, size), parsed context); reused while the file is unchanged
+        self._parsed: "OrderedDict[str, tuple[tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+        self._parsed_lock = threading.Lock()
     
     def get_context_path(self, user_id: str) -> Path:
         """Get file path for user context"""
@@ -202,24 +226,186 @@ class UserContextManager:
         Returns:
             User context dict or creates new if doesn't exist
         """
+        batch = self._active_batch(user_id)
+        if batch is not None and batch["context"] is not None:
+            return batch["context"]
+        
+        # Read-your-writes: let queued background writes land first
+        self.wait_for_writes(user_id)
+        
         context_path = self.get_context_path(user_id)
         
         if context_path.exists():
-            with open(context_path, 'r') as f:
-                context = json.load(f)
-            return context
+            context = loads(context_path.read_bytes())
         else:
+            context = self.initialize_context(user_id)
+        
+        if batch is not None:
+            batch["context"] = context
+        return context
+    
+    def get_sections(self, user_id: str, *sections: str) -> Dict[str, Any]:
+        """
+        Read-only copies of the named context sections
+        
+        Agents that only read a few sections use this instead of load_context;
+        the file is parsed once and reused until its mtime/size changes.
+        
+        Returns:
+            {section: copy of that section}
+        """
+        batch = self._active_batch(user_id)
+        if batch is not None and batch["context"] is not None:
+            context = batch["context"]
+        else:
+            self.wait_for_writes(user_id)
+            context = self._read_parsed(user_id)
+        
+        return {section: copy.deepcopy(context[section]) for section in sections}
+    
+    def _read_parsed(self, user_id: str) -> Dict[str, Any]:
+        """Parsed context file for user_id, re-read only when the file changed"""
+        context_path = self.get_context_path(user_id)
+        try:
+            stat = context_path.stat()
+        except FileNotFoundError:
             return self.initialize_context(user_id)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        
+        with self._parsed_lock:
+            entry = self._parsed.get(user_id)
+            if entry is not None and entry[0] == stamp:
+                self._parsed.move_to_end(user_id)
+                return entry[1]
+        
+        context = loads(context_path.read_bytes())
+        
+        with self._parsed_lock:
+            self._parsed[user_id] = (stamp, context)
+            self._parsed.move_to_end(user_id)
+            while len(self._parsed) > self.PARSED_CACHE_SIZE:
+                self._parsed.popitem(last=False)
+        return context
     
     def save_context(self, user_id: str, context: Dict[str, Any]) -> None:
         """
-        Save user context to storage
+        Save user context to storage (deferred while a batch is open)
         """
         context["last_updated"] = datetime.now().isoformat()
+        
+        batch = self._active_batch(user_id)
+        if batch is not None:
+            batch["context"] = context
+            batch["dirty"] = True
+            return
+        
+        self._write_context(user_id, context)
+    
+    def _write_context(self, user_id: str, context: Dict[str, Any]) -> None:
+        """
+        Write user context to its file atomically: readers see either the old
+        or the new file, never a partially written one
+        """
         context_path = self.get_context_path(user_id)
+        tmp_path = context_path.with_name(f"{context_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps_indented(context))
+        os.replace(tmp_path, context_path)
+    
+    def submit_write(self, user_id: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Run a context write (e.g. apply_updates) on the writer pool
+        
+        Writes for one user run in submission order, and load_context for that
+        user waits for them, so callers can overlap persistence with other work
+        (such as the next LLM call) without reading stale data.
+        
+        Inside batch(user_id) on this thread the write runs inline instead: a
+        writer thread can't see the batch's context, and the batch's own write
+        on exit would overwrite whatever it saved.
         
-        with open(context_path, 'w') as f:
-            json.dump(context, indent=2, fp=f)
+        Returns:
+            Future for the write's result
+        """
+        if self._active_batch(user_id) is not None:
+            self.wait_for_writes(user_id)
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        with self._pending_lock:
+            previous = self._pending_writes.get(user_id)
+            future = self._writer_pool.submit(self._run_write, previous, fn, args, kwargs)
+            self._pending_writes[user_id] = future
+        
+        future.add_done_callback(lambda done: self._clear_pending_write(user_id, done))
+        return future
+    
+    def wait_for_writes(self, user_id: str) -> None:
+        """Block until background writes queued for user_id have finished"""
+        if getattr(self._local, "in_writer", False):
+            return  # called from inside a queued write
+        
+        with self._pending_lock:
+            future = self._pending_writes.get(user_id)
+        if future is not None:
+            wait([future])
+    
+    def _run_write(self, previous: Optional[Future], fn: Callable, args: tuple, kwargs: Dict) -> Any:
+        """Writer-pool task: wait for the user's previous write, then run this one"""
+        if previous is not None:
+            wait([previous])  # an earlier failure must not block later writes
+        
+        self._local.in_writer = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.in_writer = False
+    
+    def _clear_pending_write(self, user_id: str, future: Future) -> None:
+        """Forget a finished write unless a newer one was queued after it"""
+        with self._pending_lock:
+            if self._pending_writes.get(user_id) is future:
+                del self._pending_writes[user_id]
+    
+    def _active_batch(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Open batch for user_id on this thread, if any"""
+        batches = getattr(self._local, "batches", None)
+        return batches.get(user_id) if batches else None
+    
+    @contextmanager
+    def batch(self, user_id: str):
+        """
+        Group several context updates into one load and one write
+        
+        Inside the block, load_context returns the same in-memory context and
+        save_context only marks it dirty; the file is written once on exit.
+        Nested batches for the same user join the outer one.
+        
+        Usage:
+            with manager.batch(user_id):
+                manager.update_market_context(user_id, {...})
+                manager.log_agent_interaction(user_id, ...)
+        """
+        if not hasattr(self._local, "batches"):
+            self._local.batches = {}
+        batches = self._local.batches
+        
+        if user_id in batches:
+            yield
+            return
+        
+        batch = batches[user_id] = {"context": None, "dirty": False}
+        try:
+            yield
+        finally:
+            del batches[user_id]
+            if batch["dirty"]:
+                self._write_context(user_id, batch["context"])
     
     def update_student_profile(self, user_id: str, profile_data: Dict[str, Any]) -> None:
         """Update student profile section"""
@@ -245,9 +431,13 @@ class UserContextManager:
     def update_readiness(self, user_id: str, readiness_data: Dict[str, Any]) -> None:
         """Update readiness assessment"""
         context = self.load_context(user_id)
+        self._merge_readiness(context, readiness_data)
+        self.save_context(user_id, context)
+    
+    def _merge_readiness(self, context: Dict[str, Any], readiness_data: Dict[str, Any]) -> None:
+        """Apply a readiness update to an in-memory context"""
         readiness_data["last_assessed"] = datetime.now().isoformat()
         context["readiness"].update(readiness_data)
-        self.save_context(user_id, context)
     
     def update_market_context(self, user_id: str, market_data: Dict[str, Any]) -> None:
         """Update market intelligence data"""
@@ -259,12 +449,15 @@ class UserContextManager:
     def update_active_path(self, user_id: str, path_data: Dict[str, Any]) -> None:
         """Update active career path"""
         context = self.load_context(user_id)
-        
+        self._merge_active_path(context, path_data)
+        self.save_context(user_id, context)
+    
+    def _merge_active_path(self, context: Dict[str, Any], path_data: Dict[str, Any]) -> None:
+        """Apply an active path update to an in-memory context"""
         if not path_data.get("created_at"):
             path_data["created_at"] = datetime.now().isoformat()
         
         context["active_path"].update(path_data)
-        self.save_context(user_id, context)
     
     def update_roadmap(self, user_id: str, roadmap_data: Dict[str, Any]) -> None:
         """Update roadmap with steps and actions"""
@@ -287,6 +480,11 @@ class UserContextManager:
     def record_progress(self, user_id: str, progress_data: Dict[str, Any]) -> None:
         """Record progress update"""
         context = self.load_context(user_id)
+        self._merge_progress(context, progress_data)
+        self.save_context(user_id, context)
+    
+    def _merge_progress(self, context: Dict[str, Any], progress_data: Dict[str, Any]) -> None:
+        """Apply a progress update to an in-memory context"""
         progress_data["last_activity"] = datetime.now().isoformat()
         
         if "completed_step" in progress_data:
@@ -298,12 +496,15 @@ class UserContextManager:
             del progress_data["blocker"]
         
         context["progress"].update(progress_data)
-        self.save_context(user_id, context)
     
     def record_reroute(self, user_id: str, reroute_data: Dict[str, Any]) -> None:
         """Record re-routing event"""
         context = self.load_context(user_id)
-        
+        self._merge_reroute(context, reroute_data)
+        self.save_context(user_id, context)
+    
+    def _merge_reroute(self, context: Dict[str, Any], reroute_data: Dict[str, Any]) -> None:
+        """Apply a re-routing event to an in-memory context"""
         context["reroute_history"]["reroute_count"] += 1
         
         if "failed_path" in reroute_data:
@@ -319,13 +520,15 @@ class UserContextManager:
             context["reroute_history"]["alternative_suggestions"].extend(
                 reroute_data["alternatives"]
             )
-        
-        self.save_context(user_id, context)
     
     def update_actions(self, user_id: str, action_data: Dict[str, Any]) -> None:
         """Update current actions"""
         context = self.load_context(user_id)
-        
+        self._merge_actions(context, action_data)
+        self.save_context(user_id, context)
+    
+    def _merge_actions(self, context: Dict[str, Any], action_data: Dict[str, Any]) -> None:
+        """Apply an actions update to an in-memory context"""
         if "completed_action" in action_data:
             context["current_actions"]["completed_actions"].append(
                 action_data["completed_action"]
@@ -333,13 +536,19 @@ class UserContextManager:
             del action_data["completed_action"]
         
         context["current_actions"].update(action_data)
-        self.save_context(user_id, context)
+        # The lists changed under the orchestrator's per-stage counts
+        context["progress"].pop("stage_counts", None)
     
     def log_agent_interaction(self, user_id: str, agent_name: str, 
                              event_type: str, details: Dict = None) -> None:
         """Log agent interaction for tracking"""
         context = self.load_context(user_id)
-        
+        self._append_interaction(context, agent_name, event_type, details)
+        self.save_context(user_id, context)
+    
+    def _append_interaction(self, context: Dict[str, Any], agent_name: str,
+                            event_type: str, details: Dict = None) -> None:
+        """Record an agent interaction on an in-memory context"""
         if agent_name not in context["metadata"]["agent_interaction_count"]:
             context["metadata"]["agent_interaction_count"][agent_name] = 0
         context["metadata"]["agent_interaction_count"][agent_name] += 1
@@ -354,8 +563,62 @@ class UserContextManager:
         if len(context["metadata"]["system_events"]) > 100:
             context["metadata"]["system_events"] = \
                 context["metadata"]["system_events"][-100:]
+    
+    def apply_updates(self, user_id: str, updates: Dict[str, Any]) -> None:
+        """
+        Apply several updates with a single load and a single write
         
-        self.save_context(user_id, context)
+        Args:
+            user_id: User identifier
+            updates: Any of
+                "student_profile": keys merged into the student profile
+                "readiness": same data as update_readiness
+                "active_path": same data as update_active_path
+                "reroute": same data as record_reroute
+                "current_actions": same data as update_actions
+                "progress": same data as record_progress
+                "metadata": keys merged into the metadata section
+                "agent_interaction": {"agent_name", "event_type", "details"};
+                    details may be a callable taking the updated context, for
+                    values that depend on the other updates (e.g. counts)
+        """
+        with self._lock:
+            context = self.load_context(user_id)
+            
+            if "student_profile" in updates:
+                context["student_profile"].update(updates["student_profile"])
+            
+            if "readiness" in updates:
+                self._merge_readiness(context, updates["readiness"])
+            
+            if "reroute" in updates:
+                self._merge_reroute(context, updates["reroute"])
+            
+            if "active_path" in updates:
+                self._merge_active_path(context, updates["active_path"])
+            
+            if "current_actions" in updates:
+                self._merge_actions(context, updates["current_actions"])
+            
+            if "progress" in updates:
+                self._merge_progress(context, updates["progress"])
+            
+            if "metadata" in updates:
+                context["metadata"].update(updates["metadata"])
+            
+            if "agent_interaction" in updates:
+                interaction = updates["agent_interaction"]
+                details = interaction.get("details")
+                if callable(details):
+                    details = details(context)
+                self._append_interaction(
+                    context,
+                    interaction["agent_name"],
+                    interaction["event_type"],
+                    details
+                )
+            
+            self.save_context(user_id, context)
     
     def get_full_context(self, user_id: str) -> Dict[str, Any]:
         """Get complete user context"""
@@ -371,8 +634,8 @@ class UserContextManager:
             export_path = os.path.join(export_dir, 
                 f"{user_id}_context_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
-        with open(export_path, 'w') as f:
-            json.dump(context, indent=2, fp=f)
+        with open(export_path, 'wb') as f:
+            f.write(dumps_indented(context))
         
         return export_path
     
@@ -2,19 +2,124 @@
 Shared API client with retry logic and rate limiting
 """
 
+import copy
+import logging
 import requests
+import threading
 import time
-import json
-from typing import Dict, Any, Optional
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, Iterator, Optional
+from .http_session import get_groq_session
+from .json_utils import JSONObjectAssembler, loads, stable_hash
+from .api_key_manager import get_key_manager
+from .rate_limiter import estimate_tokens, limiter_for_key, retry_after_seconds, backoff_delay, MAX_RETRY_DELAY
+
+logger = logging.getLogger(__name__)
+
 
 class APIClient:
     """API client with exponential backoff retry logic"""
     
-    MAX_RETRIES = 8  # Increased from 5 to 8
-    BASE_WAIT = 8    # Increased from 4 to 8 seconds
-    MIN_INTERVAL = 2  # Increased from 1.5 to 2 seconds
+    MAX_RETRIES = 5
+    BASE_WAIT = 4  # Seconds; see rate_limiter.backoff_delay (capped at MAX_RETRY_DELAY)
+    
+    # (connect, read) seconds; a pooled socket that stops answering must not
+    # hang the calling agent forever
+    REQUEST_TIMEOUT = (5, 30)
+    
+    GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+    
+    # Groq JSON mode: the completion is a single JSON object, no fences or prose
+    JSON_MODE = {"type": "json_object"}
+    GROQ_MODELS_URL = "https://api.groq.com/openai/v1/models"
+    
+    # API keys whose connection has already been warmed
+    _warmed_keys = set()
+    _warmup_lock = threading.Lock()
+    
+    # Recent (model, max_tokens, completion_tokens) samples, for tuning per-agent budgets
+    completion_usage = deque(maxlen=500)
+    
+    @classmethod
+    def _record_usage(cls, model: str, max_tokens: int, result: Dict[str, Any]) -> None:
+        """Remember how many tokens a completion actually used"""
+        completion_tokens = (result.get("usage") or {}).get("completion_tokens")
+        if completion_tokens is not None:
+            cls.completion_usage.append((model, max_tokens, completion_tokens))
+    
+    @classmethod
+    def completion_tokens_p95(cls, model: str = None) -> Optional[int]:
+        """95th percentile of recorded completion tokens (optionally for one model)"""
+        samples = sorted(
+            tokens for sample_model, _, tokens in cls.completion_usage
+            if model is None or sample_model == model
+        )
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    
+    # Identical requests currently on the wire, keyed by content hash
+    _inflight: Dict[str, Future] = {}
+    _inflight_lock = threading.Lock()
+    
+    @classmethod
+    def _coalesce(cls, key: str, call: Callable[[], Any]) -> Any:
+        """
+        Run call() unless an identical request is already in flight, in which
+        case wait for that one and share its result (single-flight)
+        """
+        with cls._inflight_lock:
+            future = cls._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = cls._inflight[key] = Future()
+        
+        if not is_leader:
+            return copy.deepcopy(future.result())
+        
+        try:
+            result = call()
+            future.set_result(copy.deepcopy(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with cls._inflight_lock:
+                cls._inflight.pop(key, None)
+    
+    @classmethod
+    def warmup(cls, api_key: str) -> None:
+        """
+        Open a pooled connection to Groq in the background (once per key) so the
+        first real completion doesn't pay the TCP+TLS handshake
+        """
+        with cls._warmup_lock:
+            if api_key in cls._warmed_keys:
+                return
+            cls._warmed_keys.add(api_key)
+        
+        def ping():
+            try:
+                response = get_groq_session().get(
+                    cls.GROQ_MODELS_URL,
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    timeout=10
+                )
+                response.close()
+            except requests.exceptions.RequestException:
+                pass  # best effort; the real call will connect normally
+        
+        threading.Thread(target=ping, name="groq-warmup", daemon=True).start()
     
-    _last_request_time = 0
+    @classmethod
+    def _throttle(cls, api_key: str, model: str, messages: list, max_tokens: int) -> None:
+        """Wait for the key's RPM/TPM budget (shared with the async client)"""
+        # Reserve what completions for this model actually use, not max_tokens
+        expected = cls.completion_tokens_p95(model)
+        completion = min(max_tokens, expected) if expected is not None else max_tokens
+        limiter_for_key(api_key).acquire(estimate_tokens(messages, completion))
     
     @classmethod
     def call_groq_api(cls, 
@@ -22,7 +127,37 @@ class APIClient:
                       model: str,
                       messages: list,
                       temperature: float = 0.3,
-                      max_tokens: int = 2000) -> Dict[str, Any]:
+                      max_tokens: int = 2000,
+                      response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Call Groq API with retry logic and rate limiting.
+        Concurrent identical calls share one HTTP request.
+        
+        Args:
+            api_key: Groq API key
+            model: Model name
+            messages: List of messages
+            temperature: Temperature setting
+            max_tokens: Max tokens in response
+            response_format: Optional Groq response_format, e.g. JSON_MODE
+            
+        Returns:
+            API response JSON
+        """
+        key = stable_hash(["completion", model, messages, temperature, max_tokens, response_format])
+        return cls._coalesce(
+            key,
+            lambda: cls._call_groq_api(api_key, model, messages, temperature, max_tokens, response_format)
+        )
+    
+    @classmethod
+    def _call_groq_api(cls, 
+                       api_key: str, 
+                       model: str,
+                       messages: list,
+                       temperature: float = 0.3,
+                       max_tokens: int = 2000,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Call Groq API with retry logic and rate limiting
         
@@ -32,6 +167,7 @@ class APIClient:
             messages: List of messages
             temperature: Temperature setting
             max_tokens: Max tokens in response
+            response_format: Optional Groq response_format, e.g. JSON_MODE
             
         Returns:
             API response JSON
@@ -40,7 +176,7 @@ class APIClient:
             Exception: If all retries fail
         """
         
-        url = "https://api.groq.com/openai/v1/chat/completions"
+        url = cls.GROQ_URL
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -51,44 +187,55 @@ class APIClient:
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+        if response_format:
+            payload["response_format"] = response_format
         
         last_error = None
         
         for attempt in range(cls.MAX_RETRIES):
             try:
-                # Apply minimum interval throttling
-                elapsed = time.time() - cls._last_request_time
-                if elapsed < cls.MIN_INTERVAL:
-                    time.sleep(cls.MIN_INTERVAL - elapsed)
+                # Wait for rate-limit budget
+                cls._throttle(api_key, model, messages, max_tokens)
                 
-                cls._last_request_time = time.time()
-                
-                response = requests.post(url, headers=headers, json=payload)
+                response = get_groq_session().post(url, headers=headers, json=payload, timeout=cls.REQUEST_TIMEOUT)
                 
                 # Success
                 if response.status_code == 200:
-                    return response.json()
+                    result = loads(response.content)
+                    cls._record_usage(model, max_tokens, result)
+                    return result
                 
-                # Rate limit - retry with backoff
-                if response.status_code == 429:
-                    if attempt < cls.MAX_RETRIES - 1:
-                        wait_time = cls.BASE_WAIT * (2 ** attempt)
-                        print(f"  [429 Rate Limited] Waiting {wait_time}s before retry {attempt + 1}/{cls.MAX_RETRIES}...")
+                # Key rate limited or Groq overloaded - switch to another key if
+                # one is free, otherwise wait until the first one resets
+                if (response.status_code == 429 or response.status_code >= 500) and attempt < cls.MAX_RETRIES - 1:
+                    key_manager = get_key_manager()
+                    next_key = key_manager.failover(api_key, retry_after_seconds(response.headers))
+                    if next_key is None:
+                        wait_time = min(key_manager.seconds_until_available(), MAX_RETRY_DELAY)
+                        logger.warning(
+                            "groq_keys_exhausted",
+                            extra={"status": response.status_code, "wait_seconds": round(wait_time, 1), "attempt": attempt + 1}
+                        )
                         time.sleep(wait_time)
-                        continue
+                        next_key = key_manager.acquire_least_loaded()
                     else:
-                        print(f"  [ERROR] Max retries reached with 429 errors")
-                        response.raise_for_status()
+                        logger.info("groq_key_switched", extra={"status": response.status_code, "attempt": attempt + 1})
+                    api_key = next_key
+                    headers["Authorization"] = f"Bearer {api_key}"
+                    continue
                 
-                # Other errors
+                # Last attempt or other errors
                 response.raise_for_status()
-                return response.json()
+                return loads(response.content)
                 
             except requests.exceptions.RequestException as e:
                 last_error = e
                 if attempt < cls.MAX_RETRIES - 1:
-                    wait_time = cls.BASE_WAIT * (2 ** attempt)
-                    print(f"  [Retry {attempt + 1}/{cls.MAX_RETRIES}] Error: {type(e).__name__}. Waiting {wait_time}s...")
+                    wait_time = backoff_delay(attempt, cls.BASE_WAIT)
+                    logger.warning(
+                        "groq_request_retry",
+                        extra={"error": type(e).__name__, "wait_seconds": round(wait_time, 1), "attempt": attempt + 1}
+                    )
                     time.sleep(wait_time)
                 else:
                     raise
@@ -97,3 +244,131 @@ class APIClient:
             raise last_error
         
         raise Exception("Max retries exceeded")
+    
+    @classmethod
+    def stream_groq_api(cls,
+                        api_key: str,
+                        model: str,
+                        messages: list,
+                        temperature: float = 0.3,
+                        max_tokens: int = 2000,
+                        response_format: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Call Groq API with stream=True and yield content deltas as they arrive
+        
+        Args:
+            api_key: Groq API key
+            model: Model name
+            messages: List of messages
+            temperature: Temperature setting
+            max_tokens: Max tokens in response
+            response_format: Optional Groq response_format, e.g. JSON_MODE
+            
+        Yields:
+            Content fragments of the assistant message
+            
+        Raises:
+            requests.exceptions.RequestException: On HTTP or connection errors
+        """
+        
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        
+        cls._throttle(api_key, model, messages, max_tokens)
+        response = get_groq_session().post(
+            cls.GROQ_URL, headers=headers, json=payload, stream=True, timeout=cls.REQUEST_TIMEOUT
+        )
+        
+        try:
+            response.raise_for_status()
+            yield from cls.iter_stream_content(response)
+        finally:
+            response.close()
+    
+    @staticmethod
+    def iter_stream_content(response: requests.Response) -> Iterator[str]:
+        """Yield the content deltas of a streamed (SSE) chat completion response"""
+        response.encoding = "utf-8"  # SSE responses don't declare a charset
+        
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            
+            choices = loads(data).get("choices") or []
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
+    @classmethod
+    def call_groq_json(cls,
+                       api_key: str,
+                       model: str,
+                       messages: list,
+                       temperature: float = 0.3,
+                       max_tokens: int = 2000,
+                       response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Streamed JSON completion (see _call_groq_json).
+        Concurrent identical calls share one stream.
+        """
+        key = stable_hash(["json", model, messages, temperature, max_tokens, response_format])
+        return cls._coalesce(
+            key,
+            lambda: cls._call_groq_json(api_key, model, messages, temperature, max_tokens, response_format)
+        )
+    
+    @classmethod
+    def _call_groq_json(cls,
+                        api_key: str,
+                        model: str,
+                        messages: list,
+                        temperature: float = 0.3,
+                        max_tokens: int = 2000,
+                        response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Stream a completion that should contain a JSON object and return its text
+        as soon as the object closes, without waiting for the rest of the stream.
+        Falls back to a buffered call_groq_api if streaming fails.
+        
+        Returns:
+            JSON object text (or the raw content if no complete object was seen)
+        """
+        
+        assembler = JSONObjectAssembler()
+        stream = cls.stream_groq_api(api_key, model, messages, temperature, max_tokens, response_format)
+        
+        try:
+            for delta in stream:
+                object_text = assembler.feed(delta)
+                if object_text is not None:
+                    return object_text
+            return assembler.text
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("groq_stream_failed", extra={"error": f"{type(e).__name__}: {e}"})
+        finally:
+            stream.close()
+        
+        result = cls.call_groq_api(
+            api_key=api_key,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format=response_format
+        )
+        return result["choices"][0]["message"]["content"]
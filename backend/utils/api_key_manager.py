@@ -3,10 +3,18 @@ API Key Manager - Manages multiple Groq API keys for load distribution
 Distributes keys across agents to avoid rate limiting
 """
 
+import functools
+import logging
 import os
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Optional
 import json
 
+from .rate_limiter import limiter_for_key
+
+logger = logging.getLogger(__name__)
+
 
 class APIKeyManager:
     """Manages multiple API keys and distributes them across agents"""
@@ -23,13 +31,20 @@ class APIKeyManager:
         "FeedbackLearningAgent"
     ]
     
+    # Seconds a key is skipped after a 429/5xx when Groq gives no Retry-After
+    EXHAUSTED_COOLDOWN = 20
+    
     def __init__(self):
         """Initialize API key manager and load all available keys"""
         self.keys: List[str] = []
         self.agent_key_map: Dict[str, str] = {}
         self.current_index = 0
+        self.exhausted_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
         
         self._load_api_keys()
+        # Key -> 1-based number, for usage logs
+        self.key_numbers: Dict[str, int] = {key: number for number, key in enumerate(self.keys, 1)}
         self._assign_keys_to_agents()
     
     def _load_api_keys(self) -> None:
@@ -50,14 +65,14 @@ class APIKeyManager:
         
         # If no numbered keys, try single key as fallback
         if not self.keys:
-            api_key = os.getenv("GROQ_API_KEY") or "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"
+            api_key = os.getenv("GROQ_API_KEY")
             if api_key:
                 self.keys.append(api_key)
         
         if not self.keys:
-            raise ValueError("No API keys found!")
+            raise ValueError("No API keys found! Set GROQ_API_KEY or GROQ_API_KEY_1, GROQ_API_KEY_2, ...")
         
-        print(f"✓ Loaded {len(self.keys)} API key(s)")
+        logger.info("api_keys_loaded", extra={"count": len(self.keys)})
     
     def _assign_keys_to_agents(self) -> None:
         """Assign API keys to agents in round-robin fashion"""
@@ -65,10 +80,9 @@ class APIKeyManager:
             key_index = i % len(self.keys)
             self.agent_key_map[agent_name] = self.keys[key_index]
         
-        # Print assignment for debugging
-        for agent_name in self.AGENT_NAMES:
-            key_num = self.keys.index(self.agent_key_map[agent_name]) + 1
-            print(f"  {agent_name}: Key #{key_num}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for agent_name in self.AGENT_NAMES:
+                logger.debug("%s: Key #%s", agent_name, self.key_numbers[self.agent_key_map[agent_name]])
     
     def get_key_for_agent(self, agent_name: str) -> str:
         """
@@ -100,6 +114,58 @@ class APIKeyManager:
         self.current_index += 1
         return key
     
+    def acquire_least_loaded(self) -> str:
+        """
+        Pick the key with the most free rate-limit budget right now, so
+        concurrent agents spread over all keys instead of queueing on one
+        
+        Keys marked exhausted are skipped until their reset time; if every key
+        is exhausted, the one that resets first is returned.
+        
+        Returns:
+            API key string
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = [key for key in self.keys if self.exhausted_until.get(key, 0) <= now]
+            if not available:
+                return min(self.keys, key=lambda key: self.exhausted_until[key])
+            
+            # Rotate the starting point so equally idle keys take turns
+            start = self.current_index % len(available)
+            self.current_index += 1
+            candidates = available[start:] + available[:start]
+        
+        return max(candidates, key=lambda key: limiter_for_key(key).headroom())
+    
+    def mark_exhausted(self, api_key: str, retry_after: Optional[float] = None) -> None:
+        """Skip api_key until Groq's reset time (or EXHAUSTED_COOLDOWN seconds)"""
+        with self._lock:
+            self.exhausted_until[api_key] = time.monotonic() + (retry_after or self.EXHAUSTED_COOLDOWN)
+    
+    def seconds_until_available(self) -> float:
+        """Seconds until the first exhausted key resets (0 if a key is usable now)"""
+        with self._lock:
+            earliest = min(self.exhausted_until.get(key, 0) for key in self.keys)
+            return max(0.0, earliest - time.monotonic())
+    
+    def failover(self, api_key: str, retry_after: Optional[float] = None) -> Optional[str]:
+        """
+        Mark api_key exhausted after a 429/5xx and return the key to retry with
+        
+        Returns:
+            A key that is not exhausted, or None if every key is; callers then
+            wait seconds_until_available() and retry with acquire_least_loaded()
+        """
+        self.mark_exhausted(api_key, retry_after)
+        if self.seconds_until_available():
+            return None
+        return self.acquire_least_loaded()
+    
+    def key_number(self, api_key: str) -> Optional[int]:
+        """1-based position of api_key among the loaded keys (None if unknown)"""
+        return self.key_numbers.get(api_key)
+    
     def get_all_keys(self) -> List[str]:
         """Get all loaded API keys"""
         return self.keys.copy()
@@ -113,24 +179,18 @@ class APIKeyManager:
         return {
             "total_keys": len(self.keys),
             "agent_assignments": self.agent_key_map,
-            "key_rotation_index": self.current_index
+            "key_rotation_index": self.current_index,
+            "exhausted_keys": sum(until > time.monotonic() for until in self.exhausted_until.values())
         }
 
 
-# Global instance
-_key_manager: APIKeyManager = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_key_manager() -> APIKeyManager:
-    """Get or create the global API key manager"""
-    global _key_manager
-    if _key_manager is None:
-        _key_manager = APIKeyManager()
-    return _key_manager
+    """Get or create the global API key manager (environment is read once)"""
+    return APIKeyManager()
 
 
 def initialize_key_manager() -> APIKeyManager:
-    """Initialize the API key manager"""
-    global _key_manager
-    _key_manager = APIKeyManager()
-    return _key_manager
+    """(Re)initialize the API key manager from the current environment"""
+    get_key_manager.cache_clear()
+    return get_key_manager()
@@ -0,0 +1,124 @@
+"""
+Async Groq client for concurrent agent fan-out
+Shares the process-wide token bucket with the sync requests path; uses
+HTTP/2 when the optional h2 package is installed
+"""
+
+import asyncio
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 support)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+from .json_utils import loads
+from .api_key_manager import get_key_manager
+from .rate_limiter import estimate_tokens, limiter_for_key, retry_after_seconds, backoff_delay, MAX_RETRY_DELAY
+
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# At most this many Groq requests in flight per event loop
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 5
+BASE_WAIT = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# httpx clients and asyncio primitives are bound to the loop that created them,
+# so keep one (client, semaphore) pair per running loop
+_loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def _get_loop_state() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    """Return the shared client and concurrency semaphore for the running loop"""
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None or state[0].is_closed:
+        # With h2 installed, concurrent agent calls share one TLS connection
+        # as multiplexed HTTP/2 streams; otherwise pooled HTTP/1.1 keep-alive
+        client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY * 2,
+                max_keepalive_connections=MAX_CONCURRENCY,
+                keepalive_expiry=30.0
+            )
+        )
+        state = (client, asyncio.Semaphore(MAX_CONCURRENCY))
+        _loop_state[loop] = state
+    return state
+
+
+async def close_async_client() -> None:
+    """Close the shared client for the running loop (call before the loop exits)"""
+    state = _loop_state.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state[0].aclose()
+
+
+async def call_groq_async(
+    api_key: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    response_format: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Call the Groq chat completions API without blocking the event loop
+
+    Args:
+        api_key: Groq API key
+        model: Model name
+        messages: Chat messages
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens in the completion
+        response_format: Optional Groq response_format, e.g. {"type": "json_object"}
+
+    Returns:
+        Parsed JSON response
+    """
+    client, semaphore = _get_loop_state()
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if response_format:
+        payload["response_format"] = response_format
+
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            await limiter_for_key(api_key).acquire_async(estimate_tokens(messages, max_tokens))
+            try:
+                response = await client.post(GROQ_CHAT_URL, headers=headers, json=payload)
+            except httpx.TransportError:
+                if attempt < MAX_RETRIES - 1:
+                    await asyncio.sleep(backoff_delay(attempt, BASE_WAIT))
+                    continue
+                raise
+
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES - 1:
+                # Retry at once on another key if one is free, otherwise wait
+                # until the first exhausted key resets
+                key_manager = get_key_manager()
+                next_key = key_manager.failover(api_key, retry_after_seconds(response.headers))
+                if next_key is None:
+                    await asyncio.sleep(min(key_manager.seconds_until_available(), MAX_RETRY_DELAY))
+                    next_key = key_manager.acquire_least_loaded()
+                api_key = next_key
+                headers["Authorization"] = f"Bearer {api_key}"
+                continue
+
+            response.raise_for_status()
+            return loads(response.content)
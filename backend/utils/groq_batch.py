@@ -0,0 +1,158 @@
+"""
+Groq batch API client (OpenAI-compatible /files + /batches)
+For bulk background runs such as cohort onboarding: requests are processed
+within the batch window and do not consume the live RPM/TPM budget
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .http_session import get_groq_session
+from .json_utils import dumps_compact, loads
+
+logger = logging.getLogger(__name__)
+
+GROQ_OPENAI_URL = "https://api.groq.com/openai/v1"
+
+# Batch states after which polling stops
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class GroqBatchError(Exception):
+    """A batch ended without producing an output file"""
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def submit_batch(api_key: str,
+                 bodies: Dict[str, Dict[str, Any]],
+                 completion_window: str = "24h") -> str:
+    """
+    Upload one chat-completion request per custom_id and start a batch
+
+    Args:
+        api_key: Groq API key
+        bodies: custom_id -> chat completion request body (model, messages, ...)
+        completion_window: How long Groq may take to process the batch
+
+    Returns:
+        Batch id
+    """
+    lines = "\n".join(
+        dumps_compact({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body
+        })
+        for custom_id, body in bodies.items()
+    )
+
+    session = get_groq_session()
+    response = session.post(
+        f"{GROQ_OPENAI_URL}/files",
+        headers=_headers(api_key),
+        data={"purpose": "batch"},
+        files={"file": ("batch.jsonl", lines.encode(), "application/jsonl")},
+        timeout=60
+    )
+    response.raise_for_status()
+    file_id = loads(response.content)["id"]
+
+    response = session.post(
+        f"{GROQ_OPENAI_URL}/batches",
+        headers=_headers(api_key),
+        json={
+            "input_file_id": file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": completion_window
+        },
+        timeout=30
+    )
+    response.raise_for_status()
+    batch_id = loads(response.content)["id"]
+    logger.info("batch_submitted", extra={"batch_id": batch_id, "requests": len(bodies)})
+    return batch_id
+
+
+def get_batch(api_key: str, batch_id: str) -> Dict[str, Any]:
+    """Current batch object (status, request_counts, output_file_id, ...)"""
+    response = get_groq_session().get(
+        f"{GROQ_OPENAI_URL}/batches/{batch_id}",
+        headers=_headers(api_key),
+        timeout=30
+    )
+    response.raise_for_status()
+    return loads(response.content)
+
+
+def wait_for_batch(api_key: str,
+                   batch_id: str,
+                   poll_interval: float = 30,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Poll until the batch reaches a terminal status
+
+    Raises:
+        TimeoutError: If timeout seconds pass first
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        batch = get_batch(api_key, batch_id)
+        if batch.get("status") in TERMINAL_STATUSES:
+            return batch
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch {batch_id} still {batch.get('status')} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def fetch_results(api_key: str, batch: Dict[str, Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Download a finished batch's output
+
+    Returns:
+        custom_id -> chat completion response, or None for requests that failed
+
+    Raises:
+        GroqBatchError: If the batch has no output file
+    """
+    output_file_id = batch.get("output_file_id")
+    if not output_file_id:
+        raise GroqBatchError(f"Batch {batch.get('id')} ended as {batch.get('status')} without output")
+
+    response = get_groq_session().get(
+        f"{GROQ_OPENAI_URL}/files/{output_file_id}/content",
+        headers=_headers(api_key),
+        timeout=60
+    )
+    response.raise_for_status()
+
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    for line in response.content.splitlines():
+        if not line.strip():
+            continue
+        item = loads(line)
+        item_response = item.get("response") or {}
+        ok = not item.get("error") and item_response.get("status_code") == 200
+        results[item["custom_id"]] = item_response.get("body") if ok else None
+    return results
+
+
+def run_batch(api_key: str,
+              bodies: Dict[str, Dict[str, Any]],
+              poll_interval: float = 30,
+              timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Submit bodies as one batch, wait for it and return its results
+
+    Returns:
+        custom_id -> chat completion response (None if that request failed or
+        is missing from the output)
+    """
+    batch_id = submit_batch(api_key, bodies)
+    batch = wait_for_batch(api_key, batch_id, poll_interval, timeout)
+    results = fetch_results(api_key, batch)
+    return {custom_id: results.get(custom_id) for custom_id in bodies}
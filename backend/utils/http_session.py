@@ -1,43 +1,36 @@
 """
-HTTP session with automatic rate limiting and retry logic for Groq API
+HTTP session for the Groq API (pooled keep-alive connections)
 """
 
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import time
+import threading
 
-class RateLimitedSession(requests.Session):
-    """Session with global request throttling"""
-    
-    last_request_time = 0
-    min_interval = 1.5  # Minimum 1.5 seconds between requests
-    
-    def request(self, *args, **kwargs):
-        """Override request to add throttling"""
-        # Throttle requests
-        elapsed = time.time() - self.__class__.last_request_time
-        if elapsed < self.__class__.min_interval:
-            time.sleep(self.__class__.min_interval - elapsed)
-        
-        self.__class__.last_request_time = time.time()
-        return super().request(*args, **kwargs)
+_groq_session = None
+_groq_session_lock = threading.Lock()
 
 
-def get_groq_session():
-    """Get a requests session configured for Groq API with retry logic"""
-    session = RateLimitedSession()
+def get_groq_session() -> requests.Session:
+    """
+    Get the process-wide requests session for the Groq API
     
-    # Configure retry strategy
-    retry_strategy = Retry(
-        total=5,
-        backoff_factor=2,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["POST", "GET"]
-    )
+    One keep-alive connection pool is shared by every agent, so TCP+TLS
+    handshakes are paid once per connection rather than once per call.
+    """
+    global _groq_session
     
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
+    if _groq_session is None:
+        with _groq_session_lock:
+            if _groq_session is None:
+                session = requests.Session()
+                session.headers["Connection"] = "keep-alive"
+                # No urllib3 retries: APIClient, the async client and
+                # Orchestrator._post_groq are the single retry layer, so each
+                # attempt re-acquires a rate-limit token and can switch keys
+                session.mount(
+                    "https://",
+                    HTTPAdapter(pool_connections=32, pool_maxsize=64)
+                )
+                _groq_session = session
     
-    return session
+    return _groq_session
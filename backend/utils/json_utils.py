@@ -0,0 +1,250 @@
+"""
+Fast JSON helpers for LLM prompts and responses
+Uses orjson when installed, stdlib json otherwise
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_DECODER = json.JSONDecoder()
+
+
+def dumps_compact(obj: Any) -> str:
+    """Serialize to compact JSON (no indentation/whitespace) for prompts"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. non-string keys; stdlib json is more permissive
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps_indented(obj: Any) -> bytes:
+    """Serialize to 2-space indented UTF-8 JSON, for files people may read"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+
+
+def loads(text: Any) -> Any:
+    """Parse JSON text (str or bytes); raises ValueError (JSONDecodeError) on bad input"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def stable_hash(obj: Any) -> str:
+    """Content hash of a JSON-serializable object, independent of key order"""
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            payload = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+    else:
+        payload = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class JSONObjectAssembler:
+    """
+    Incrementally scans streamed text and detects when the first top-level
+    JSON object (or, with opener="[", array) is closed, so a stream can be
+    cut off as soon as it is complete
+    """
+    
+    def __init__(self, opener: str = "{"):
+        self._opener = opener
+        self._parts: List[str] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return "".join(self._parts)
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Add a chunk of streamed text
+        
+        Returns:
+            Text of the complete object once its closing brace arrives, else None
+        """
+        for i, ch in enumerate(chunk):
+            if self._start is None:
+                # Skip preamble (e.g. markdown fences) before the object
+                if ch == self._opener:
+                    self._start = self._length + i
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[:i + 1])
+                    return "".join(self._parts)[self._start:]
+        
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        return None
+
+
+def extract_first_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in text (linear scan, string-aware), or None"""
+    return JSONObjectAssembler().feed(text)
+
+
+def decode_first_json(text: str, opener: str = "{") -> Any:
+    """
+    Parse the first JSON value starting with opener ("{" or "[") in text,
+    e.g. an object or array wrapped in prose or markdown fences
+    
+    Each candidate is parsed once with JSONDecoder.raw_decode, so there is no
+    regex backtracking over long responses.
+    
+    Raises:
+        ValueError: If no parseable value starts with opener
+    """
+    start = text.find(opener)
+    while start >= 0:
+        try:
+            return _DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            start = text.find(opener, start + 1)
+    raise ValueError(f"No JSON value starting with {opener!r} in response")
+
+
+def _close_truncated(text: str) -> str:
+    """Close the strings/brackets left open by output cut off at max_tokens"""
+    closers = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]" and closers:
+            closers.pop()
+    
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += "null"
+    return text + "".join(reversed(closers))
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Cheap local fixes for common LLM JSON defects: prose or fences around the
+    object, trailing commas, and output truncated before its closing brackets
+    
+    Returns:
+        Parseable JSON object text, or None if it could not be recovered
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    
+    candidate = extract_first_json_object(text)
+    if candidate is None:
+        candidate = _close_truncated(text[start:])
+    candidate = _TRAILING_COMMA_RE.sub(r"\1", candidate)
+    
+    try:
+        loads(candidate)
+    except ValueError:
+        return None
+    return candidate
+
+
+class JSONArrayItemScanner:
+    """
+    Incrementally scans streamed text and returns the objects of one named
+    array (e.g. "diagnostic_questions") as each of them closes
+    """
+    
+    def __init__(self, key: str):
+        self._marker = f'"{key}"'
+        self._buffer = ""
+        self._pos: Optional[int] = None  # next unread index inside the array
+        self._done = False
+    
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return self._buffer
+    
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add a chunk of streamed text
+        
+        Returns:
+            Texts of the array items completed by this chunk (possibly empty)
+        """
+        self._buffer += chunk
+        items: List[str] = []
+        if self._done:
+            return items
+        
+        if self._pos is None:
+            start = self._buffer.find(self._marker)
+            if start < 0:
+                return items
+            bracket = self._buffer.find("[", start + len(self._marker))
+            if bracket < 0:
+                return items
+            self._pos = bracket + 1
+        
+        while self._pos < len(self._buffer):
+            ch = self._buffer[self._pos]
+            if ch in " \t\r\n,":
+                self._pos += 1
+            elif ch == "]":
+                self._done = True
+                break
+            elif ch == "{":
+                item = JSONObjectAssembler().feed(self._buffer[self._pos:])
+                if item is None:
+                    break  # wait for the rest of this item
+                items.append(item)
+                self._pos += len(item)
+            else:
+                self._done = True  # not an array of objects
+                break
+        
+        return items
@@ -0,0 +1,177 @@
+"""
+Caches for LLM results (in-process LRU and on-disk SQLite)
+Lets agents skip a Groq round-trip when their inputs have not changed
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .json_utils import stable_hash
+
+
+class LRUCache:
+    """Small thread-safe LRU cache; values are deep-copied in and out"""
+    
+    def __init__(self, maxsize: int = 32, ttl: Optional[float] = None):
+        """
+        Initialize cache
+        
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays valid (None = no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on miss"""
+        with self._lock:
+            if key not in self._data:
+                return None
+            expires_at, value = self._data[key]
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return copy.deepcopy(value)
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store a copy of value, evicting the least recently used entry if full"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_text(text: Optional[str]) -> Optional[str]:
+    """Lowercase, trim and collapse whitespace so trivially different inputs share a key"""
+    if not isinstance(text, str):
+        return text
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def cached_llm(maxsize: int = 128,
+               ttl: Optional[float] = None,
+               key_fn: Callable[[Dict[str, Any]], Any] = None,
+               cache: Optional[LRUCache] = None):
+    """
+    Cache an agent's _call_llm(self, input_data) on the content of input_data
+    
+    The cache is shared by all instances (and so all users) of the agent class,
+    so identical inputs from different users cost a single LLM call.
+    Coroutine methods (e.g. _call_llm_async) are supported as well.
+    
+    Args:
+        maxsize: Maximum number of cached responses
+        ttl: Seconds a response stays valid (None = no expiry)
+        key_fn: Optional mapping applied to input_data before hashing,
+                e.g. to normalize free-text fields
+        cache: Existing cache to use instead of a new one, so a sync and an
+               async variant of the same call share entries
+    """
+    def decorator(call_llm):
+        store = cache if cache is not None else LRUCache(maxsize=maxsize, ttl=ttl)
+        
+        def cache_key(self, input_data: Dict[str, Any]) -> str:
+            key_data = key_fn(input_data) if key_fn else input_data
+            return stable_hash([type(self).__name__, key_data])
+        
+        if inspect.iscoroutinefunction(call_llm):
+            @functools.wraps(call_llm)
+            async def wrapper(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+                key = cache_key(self, input_data)
+                result = store.get(key)
+                if result is None:
+                    result = await call_llm(self, input_data)
+                    store.set(key, result)
+                return result
+        else:
+            @functools.wraps(call_llm)
+            def wrapper(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+                key = cache_key(self, input_data)
+                result = store.get(key)
+                if result is None:
+                    result = call_llm(self, input_data)
+                    store.set(key, result)
+                return result
+        
+        wrapper.cache = store
+        return wrapper
+    
+    return decorator
+
+
+def llm_cache_key(model: str, prompt: Any, temperature: float, max_tokens: int) -> str:
+    """SHA-256 over everything that determines a low-temperature completion"""
+    payload = json.dumps(
+        {"m": model, "p": prompt, "t": temperature, "mt": max_tokens},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent response cache in a SQLite file, shared across processes and
+    restarts; meant for low-temperature calls whose output is reusable
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize cache
+        
+        Args:
+            path: SQLite database file (parent directories are created)
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def get(self, key: str) -> Optional[str]:
+        """Cached value for key, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, int(time.time()))
+            ).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return row[0].decode() if row else None
+    
+    def set(self, key: str, value: str, ttl: int = 86400) -> None:
+        """Store value for ttl seconds"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value.encode(), int(time.time()) + ttl)
+            )
+    
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM llm_cache WHERE expires_at <= ?", (int(time.time()),)
+            ).rowcount
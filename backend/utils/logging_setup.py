@@ -0,0 +1,60 @@
+"""
+Non-blocking logging setup
+Agent threads hand records to a queue; one background thread does the I/O
+"""
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_listener: Optional[QueueListener] = None
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter that appends extra={...} fields as key=value pairs"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        )
+        return f"{text} {fields}" if fields else text
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """
+    Route all logging through a QueueHandler drained by a QueueListener
+    
+    Safe to call more than once (e.g. on Streamlit reruns); only the first
+    call installs handlers.
+    
+    Args:
+        level: Root log level name; defaults to $LOG_LEVEL or WARNING
+    """
+    global _listener
+    
+    if _listener is not None:
+        return
+    
+    level = level or os.getenv("LOG_LEVEL", "WARNING")
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        StructuredFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(QueueHandler(log_queue))
+    
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
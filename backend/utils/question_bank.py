@@ -0,0 +1,81 @@
+"""
+Pre-built diagnostic question banks for common target roles
+Lets readiness assessment hand out questions without an LLM call
+"""
+
+import functools
+import os
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+from .. import config
+from .json_utils import loads
+
+
+def role_slug(role_title: str) -> str:
+    """'Full-Stack Developer' -> 'full-stack-developer'"""
+    return re.sub(r"[^a-z0-9]+", "-", role_title.lower()).strip("-")
+
+
+@functools.lru_cache(maxsize=1)
+def _bank_index() -> Dict[str, Dict[str, Any]]:
+    """Load every bank once and index it by the slugs of its title and aliases"""
+    index: Dict[str, Dict[str, Any]] = {}
+    if not os.path.isdir(config.QUESTION_BANK_DIR):
+        return index
+    
+    for filename in sorted(os.listdir(config.QUESTION_BANK_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(config.QUESTION_BANK_DIR, filename), "rb") as f:
+            bank = loads(f.read())
+        for title in [bank["role_title"], *bank.get("aliases", [])]:
+            index.setdefault(role_slug(title), bank)
+    return index
+
+
+def get_question_bank(role_title: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Bank for role_title (matched on title or alias), or None for unknown roles"""
+    if not role_title:
+        return None
+    return _bank_index().get(role_slug(role_title))
+
+
+def sample_questions(bank: Dict[str, Any],
+                     count: int = 5,
+                     exclude: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Pick count questions, spread evenly across categories, skipping ones
+    already asked
+    
+    Args:
+        bank: Question bank from get_question_bank
+        count: Number of questions to return
+        exclude: Question texts the student has already seen
+        
+    Returns:
+        Diagnostic question dicts numbered 1..count (fewer if the bank runs out)
+    """
+    seen = set(exclude or [])
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for question in bank["questions"]:
+        if question["question"] not in seen:
+            by_category.setdefault(question["category"], []).append(question)
+    
+    pools = list(by_category.values())
+    for pool in pools:
+        random.shuffle(pool)
+    random.shuffle(pools)
+    
+    # Round-robin over categories so every sample mixes question types
+    picked: List[Dict[str, Any]] = []
+    while len(picked) < count and any(pools):
+        for pool in pools:
+            if pool and len(picked) < count:
+                picked.append(pool.pop())
+    
+    return [
+        {"question_number": number, **question}
+        for number, question in enumerate(picked, start=1)
+    ]
@@ -0,0 +1,173 @@
+"""
+Client-side rate limiting shared by all agents
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+# Upper bound for any single backoff sleep (seconds)
+MAX_RETRY_DELAY = 30
+
+
+class TokenBucket:
+    """Thread-safe token bucket: allows short bursts while enforcing a sustained rate"""
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize bucket
+
+        Args:
+            rate: Tokens refilled per second (sustained requests/sec)
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add tokens accrued since the last refill (caller holds the lock)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _reserve(self, amount: float) -> float:
+        """
+        Take amount tokens now, letting the balance go negative, and return
+        how long the caller must wait before using them
+        
+        The lock is only held for the arithmetic, so a waiting caller never
+        blocks available() or other callers' reservations.
+        """
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+    
+    def acquire(self, amount: float = 1) -> None:
+        """Block until amount tokens are available, then consume them"""
+        wait_time = self._reserve(amount)
+        if wait_time:
+            time.sleep(wait_time)
+    
+    def available(self) -> float:
+        """Tokens that could be consumed right now without waiting (0 while in debt)"""
+        with self.lock:
+            self._refill()
+            return max(0.0, self.tokens)
+    
+    async def acquire_async(self, amount: float = 1) -> None:
+        """Async variant of acquire(); waits without blocking the event loop"""
+        wait_time = self._reserve(amount)
+        if wait_time:
+            await asyncio.sleep(wait_time)
+
+
+class GroqRateLimiter:
+    """
+    Client-side view of Groq's per-minute limits: a request bucket (RPM) and
+    an LLM-token bucket (TPM). A call waits only as long as needed to stay
+    under both, so concurrent agents can burst up to the real limits.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize limiter
+        
+        Args:
+            requests_per_minute: Sustained request budget
+            tokens_per_minute: Sustained prompt + completion token budget
+        """
+        # Small request burst so a single user's agents don't trip Groq's
+        # short-window limiter; the token bucket holds a full minute
+        self.requests = TokenBucket(rate=requests_per_minute / 60, capacity=max(1, requests_per_minute // 10))
+        self.tokens = TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+    
+    def acquire(self, estimated_tokens: int = 0) -> None:
+        """Block until one request and estimated_tokens LLM tokens fit the budget"""
+        self.requests.acquire()
+        if estimated_tokens:
+            self.tokens.acquire(estimated_tokens)
+    
+    async def acquire_async(self, estimated_tokens: int = 0) -> None:
+        """Async variant of acquire()"""
+        await self.requests.acquire_async()
+        if estimated_tokens:
+            await self.tokens.acquire_async(estimated_tokens)
+    
+    def headroom(self) -> float:
+        """Fraction (0-1) of the tighter of the two budgets that is free right now"""
+        return min(
+            self.requests.available() / self.requests.capacity,
+            self.tokens.available() / self.tokens.capacity
+        )
+
+
+def estimate_tokens(messages: Iterable[Dict[str, Any]], completion_tokens: int) -> int:
+    """Rough request size for the TPM budget: ~4 characters per prompt token"""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // 4 + completion_tokens
+
+
+# Defaults match the previous ~40 requests/min; set GROQ_RPM / GROQ_TPM to
+# the account's published per-key limits.
+GROQ_RPM = int(os.getenv("GROQ_RPM", "40"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "30000"))
+
+# Process-wide limiter for Groq calls that don't say which key they use
+groq_limiter = GroqRateLimiter(requests_per_minute=GROQ_RPM, tokens_per_minute=GROQ_TPM)
+
+# Request bucket alone, for callers that cannot estimate token usage
+groq_bucket = groq_limiter.requests
+
+# Groq enforces its limits per key, so each key gets its own budget; shared
+# by the sync and async clients
+_key_limiters: Dict[str, GroqRateLimiter] = {}
+_key_limiters_lock = threading.Lock()
+
+
+def limiter_for_key(api_key: Optional[str]) -> GroqRateLimiter:
+    """Return the rate limiter for api_key (groq_limiter if no key is given)"""
+    if not api_key:
+        return groq_limiter
+    limiter = _key_limiters.get(api_key)
+    if limiter is None:
+        with _key_limiters_lock:
+            limiter = _key_limiters.setdefault(
+                api_key,
+                GroqRateLimiter(requests_per_minute=GROQ_RPM, tokens_per_minute=GROQ_TPM)
+            )
+    return limiter
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date), or None if absent"""
+    retry_after = headers.get("Retry-After")
+    if not retry_after:
+        return None
+    
+    try:
+        return max(float(retry_after), 0.5)
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.5)
+
+
+def backoff_delay(attempt: int, base_wait: float) -> float:
+    """Decorrelated-jitter backoff so agents sharing a quota don't retry in lockstep"""
+    return random.uniform(base_wait, min(MAX_RETRY_DELAY, base_wait * 3 * (2 ** attempt)))
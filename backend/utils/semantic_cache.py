@@ -0,0 +1,185 @@
+"""
+Semantic response cache: near-duplicate prompts share one LLM result
+Uses sentence-transformers + FAISS when installed; without them every lookup
+is a miss and the cache stays out of the way
+"""
+
+import atexit
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+    SentenceTransformer = None
+
+from .json_utils import dumps_compact, loads
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Cosine-similarity cache over normalized sentence embeddings (inner
+    product on an IndexFlatIP). A hit needs the same namespace (e.g. target
+    role) and similarity >= threshold.
+    """
+
+    # Nearest neighbours checked per lookup, so expired or other-namespace
+    # entries don't hide a usable one
+    SEARCH_K = 4
+
+    # Index and entries are written to disk after this many new entries or
+    # this many seconds since the last write (and at interpreter exit)
+    PERSIST_EVERY = 16
+    PERSIST_INTERVAL = 60
+
+    def __init__(self,
+                 index_path: str,
+                 threshold: float = 0.92,
+                 ttl: float = 24 * 3600,
+                 max_entries: int = 5000,
+                 model_name: str = "all-MiniLM-L6-v2"):
+        """
+        Initialize cache (the embedding model loads on first use)
+
+        Args:
+            index_path: FAISS index file; entries are kept next to it as JSON
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry stays valid
+            max_entries: Oldest entries are dropped beyond this many
+            model_name: sentence-transformers model used for embeddings
+        """
+        self.index_path = index_path
+        self.entries_path = os.path.splitext(index_path)[0] + ".json"
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.model_name = model_name
+        self.stats = {"hits": 0, "misses": 0}
+
+        self._model = None
+        self._index = None
+        self._entries: List[Dict[str, Any]] = []  # oldest first, same order as the index
+        self._last: Optional[Tuple[str, Any]] = None  # (text, embedding) of the latest lookup
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+        if self.enabled:
+            atexit.register(self.flush)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the optional sentence-transformers/FAISS dependencies are installed"""
+        return faiss is not None and SentenceTransformer is not None
+
+    def _load(self) -> None:
+        """Load the model and any persisted index (caller holds the lock)"""
+        if self._model is not None:
+            return
+
+        self._model = SentenceTransformer(self.model_name)
+        dimension = self._model.get_sentence_embedding_dimension()
+
+        if os.path.exists(self.index_path) and os.path.exists(self.entries_path):
+            self._index = faiss.read_index(self.index_path)
+            with open(self.entries_path, "rb") as f:
+                self._entries = loads(f.read())
+            if self._index.ntotal != len(self._entries) or self._index.d != dimension:
+                logger.warning("semantic_cache_reset", extra={"path": self.index_path})
+                self._index, self._entries = None, []
+
+        if self._index is None:
+            self._index = faiss.IndexFlatIP(dimension)
+        else:
+            self._prune()
+
+    def _prune(self) -> None:
+        """
+        Drop expired entries and any beyond max_entries (caller holds the lock)
+
+        Entries are appended in time order, so both are a prefix of the list
+        and of the index.
+        """
+        cutoff = time.time() - self.ttl
+        drop = max(0, len(self._entries) - self.max_entries)
+        while drop < len(self._entries) and self._entries[drop]["ts"] <= cutoff:
+            drop += 1
+        if drop:
+            self._index.remove_ids(faiss.IDSelectorRange(0, drop))
+            del self._entries[:drop]
+            self._unsaved += drop
+
+    def _persist(self) -> None:
+        """Write the index and entries to disk (caller holds the lock)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        faiss.write_index(self._index, self.index_path)
+        with open(self.entries_path, "w", encoding="utf-8") as f:
+            f.write(dumps_compact(self._entries))
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def _embed(self, text: str) -> Any:
+        """Normalized embedding of text, reusing the one from the latest lookup"""
+        if self._last is not None and self._last[0] == text:
+            return self._last[1]
+        embedding = self._model.encode([text], normalize_embeddings=True).astype("float32")
+        self._last = (text, embedding)
+        return embedding
+
+    def get(self, text: str, namespace: str = "") -> Optional[Any]:
+        """Response stored for a near-duplicate of text, or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self._load()
+            embedding = self._embed(text)
+
+            if self._index.ntotal:
+                scores, ids = self._index.search(embedding, min(self.SEARCH_K, self._index.ntotal))
+                now = time.time()
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if score < self.threshold:
+                        break  # results are sorted by similarity
+                    entry = self._entries[entry_id]
+                    if entry["namespace"] == namespace and now - entry["ts"] < self.ttl:
+                        self.stats["hits"] += 1
+                        return copy.deepcopy(entry["response"])
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, text: str, response: Any, namespace: str = "") -> None:
+        """Store a copy of a JSON-serializable response for text"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._load()
+            self._index.add(self._embed(text))
+            self._entries.append({
+                "prompt": text,
+                "namespace": namespace,
+                "response": copy.deepcopy(response),
+                "ts": time.time()
+            })
+            self._unsaved += 1
+            self._prune()
+
+            if (self._unsaved >= self.PERSIST_EVERY
+                    or time.monotonic() - self._saved_at >= self.PERSIST_INTERVAL):
+                self._persist()
+
+    def flush(self) -> None:
+        """Write pending changes to disk"""
+        with self._lock:
+            if self._unsaved and self._index is not None:
+                self._persist()
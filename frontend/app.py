@@ -14,10 +14,6 @@ from datetime import datetime
 # Add parent directory to path for backend imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# CRITICAL: Set default API key if not in environment
-if not os.getenv("GROQ_API_KEY") and not os.getenv("GROQ_API_KEY_1"):
-    os.environ["GROQ_API_KEY"] = "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"
-
 # Initialize API Key Manager
 try:    
     from backend.utils.api_key_manager import initialize_key_manager
@@ -27,29 +23,12 @@ except ValueError as e:
     st.error(f"API Key Error: {str(e)}")
     st.stop()
 
-# IMPORTANT: Apply request throttling BEFORE importing any backend modules
-import requests
-
-_last_request_time = 0
-_min_request_interval = 1.5
-_original_post = requests.post
-
-def _throttled_post(*args, **kwargs):
-    """Wrapper around requests.post that adds global throttling"""
-    global _last_request_time
-    
-    # Only throttle Groq API requests
-    url = args[0] if args else kwargs.get('url', '')
-    if 'groq.com' in str(url):
-        elapsed = time.time() - _last_request_time
-        if elapsed < _min_request_interval:
-            time.sleep(_min_request_interval - elapsed)
-        _last_request_time = time.time()
-    
-    return _original_post(*args, **kwargs)
-
-requests.post = _throttled_post
+# Log records are handed to a background thread instead of blocking agents on I/O
+from backend.utils.logging_setup import setup_logging
+setup_logging()
 
+# Groq calls are paced by the per-key RPM/TPM token buckets installed by
+# the backend package (see backend/utils/rate_limiter.py)
 from backend.orchestrator import Orchestrator
 from backend.user_context import UserContextManager
 
@@ -1377,7 +1356,8 @@ def display_chatbot_section(context):
     from typing import List, Dict
     
     # Groq API configuration
-    GROQ_API_KEY = "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"
+    from backend.utils.api_key_manager import get_key_manager
+    GROQ_API_KEY = get_key_manager().get_next_key()
     
     SYSTEM_PROMPT = """You are a career guidance assistant specializing in helping students and professionals navigate their career paths. 
 You provide personalized advice on:
@@ -20,36 +20,18 @@ except ValueError as e:
     print("   cd e:\\agents")
     print("   .\\start_with_3_keys.ps1")
     print("\n📝 Or set your API keys manually:")
-    print("   $env:GROQ_API_KEY_1='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'")
-    print("   $env:GROQ_API_KEY_2='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'")
-    print("   $env:GROQ_API_KEY_3='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'")
+    print("   $env:GROQ_API_KEY_1='your_key_1'")
+    print("   $env:GROQ_API_KEY_2='your_key_2'")
+    print("   $env:GROQ_API_KEY_3='your_key_3'")
     print("   python main.py")
     sys.exit(1)
 
-# IMPORTANT: Apply request throttling BEFORE importing any backend modules
-import requests
-import time
-
-_last_request_time = 0
-_min_request_interval = 1.5
-_original_post = requests.post
-
-def _throttled_post(*args, **kwargs):
-    """Wrapper around requests.post that adds global throttling"""
-    global _last_request_time
-    
-    # Only throttle Groq API requests
-    url = args[0] if args else kwargs.get('url', '')
-    if 'groq.com' in str(url):
-        elapsed = time.time() - _last_request_time
-        if elapsed < _min_request_interval:
-            time.sleep(_min_request_interval - elapsed)
-        _last_request_time = time.time()
-    
-    return _original_post(*args, **kwargs)
-
-requests.post = _throttled_post
+# Log records are handed to a background thread instead of blocking agents on I/O
+from backend.utils.logging_setup import setup_logging
+setup_logging()
 
+# Groq calls are paced by the per-key RPM/TPM token buckets installed by
+# the backend package (see backend/utils/rate_limiter.py)
 from backend.orchestrator import Orchestrator
 
 
@@ -401,7 +383,6 @@ def interactive_progress_tracking(user_id, orch):
 
 
 def main_menu():
-    os.environ["GROQ_API_KEY"] = "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"
     """Main menu"""
     print_header("AGENTIC CAREER NAVIGATION SYSTEM")
     